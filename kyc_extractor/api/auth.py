@@ -60,6 +60,9 @@ def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: U
     )
     db.add(new_user)
     db.commit()
+    # Active user count on the admin dashboard
+    from kyc_extractor.services.stats_cache import stats_cache
+    stats_cache.invalidate()
     db.refresh(new_user)
     return new_user
 
@@ -0,0 +1,111 @@
+"""
+Asynchronous Extraction Routes
+"""
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import uuid
+
+from kyc_extractor.db.database import get_db
+from kyc_extractor.db.models import User
+from kyc_extractor.db import crud
+from kyc_extractor.schemas import JobResponse, JobStatusResponse, ExtractionResponse
+from kyc_extractor.api.deps import get_current_active_user
+from kyc_extractor.services.jobs import job_worker_pool
+from kyc_extractor.services.uploads import read_upload, UploadTooLargeError
+from kyc_extractor.validators import get_quality_grade
+
+router = APIRouter()
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    file: UploadFile = File(...),
+    use_cache: bool = Query(True, description="Set to false to bypass the extraction result cache"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Queue a document for extraction and return a job_id immediately.
+    Poll GET /jobs/{job_id} for the result.
+    Protected: Requires valid JWT token.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Filename is missing")
+
+    try:
+        upload = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
+
+    # The queue stores the document itself, so it is read back once here
+    try:
+        content = upload.read_bytes()
+    finally:
+        upload.close()
+
+    job = await run_in_threadpool(crud.create_job, db, {
+        "job_id": str(uuid.uuid4()),
+        "user_id": current_user.id,
+        "filename": file.filename,
+        "file_size_bytes": len(content),
+        "payload": content,
+        "use_cache": use_cache,
+    })
+    job_worker_pool.notify()
+
+    return JobResponse(job_id=job.job_id, status=job.status, created_at=job.created_at)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job_status(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get the status of a queued extraction; includes the result once completed
+    """
+    job = crud.get_job(db, job_id, user_id=current_user.id, role=current_user.role)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = None
+    if job.status == "completed" and job.request_id:
+        ext = crud.get_extraction_by_request_id(db, job.request_id, user_id=current_user.id, role=current_user.role)
+        if ext:
+            result = ExtractionResponse(
+                request_id=ext.request_id,
+                document_type=ext.document_type or "OTHER",
+                data={
+                    "company_name": ext.company_name,
+                    "trade_name": ext.trade_name,
+                    "identification_number": ext.identification_number,
+                    "address": ext.address_json,
+                    "issue_date": ext.issue_date,
+                    "approver_name": ext.approver_name
+                },
+                confidence=ext.confidence or 0.0,
+                confidence_reason=ext.confidence_reason,
+                validation_results=ext.validation_results,
+                data_quality_score=ext.data_quality_score,
+                quality_grade=get_quality_grade(ext.data_quality_score or 0),
+                processing_time_ms=ext.processing_time_ms,
+                uploaded_at=ext.uploaded_at,
+                image_quality=ext.image_quality,
+                extraction_path=ext.extraction_path,
+                model_tier=ext.model_tier,
+                escalation_reason=ext.escalation_reason
+            )
+
+    return JobStatusResponse(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.created_at,
+        filename=job.filename,
+        attempts=job.attempts or 0,
+        error=job.error,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=result
+    )
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from kyc_extractor.db.database import get_db
 from kyc_extractor.db.models import User
-from kyc_extractor.api.deps import get_current_active_user
-from kyc_extractor.db.crud import get_dashboard_stats
+from kyc_extractor.api.deps import get_current_active_user, get_current_admin_user
+from kyc_extractor.db.crud import get_dashboard_stats, get_usage_stats
 from kyc_extractor.schemas import ExtractionResponse
+from kyc_extractor.services.stats_cache import stats_cache
 
 router = APIRouter()
 
@@ -37,14 +38,48 @@ class DashboardStatsResponse(BaseModel):
     charts: DashboardCharts
     recent_activity: List[ExtractionResponse]
 
+class UsageAggregate(BaseModel):
+    documents: int
+    # Documents that needed a model call (not cache hits or local text-layer results)
+    model_documents: int
+    prompt_tokens: int
+    output_tokens: int
+    payload_bytes: int
+    retries: int
+    cost_usd: float
+    avg_upstream_latency_ms: Optional[int] = None
+
+class UserUsage(UsageAggregate):
+    user_id: Optional[int] = None
+    email: Optional[str] = None
+
+class DocumentTypeUsage(UsageAggregate):
+    document_type: str
+
+class DailyUsage(UsageAggregate):
+    date: str
+
+class UsageStatsResponse(BaseModel):
+    days: int
+    totals: UsageAggregate
+    by_user: List[UserUsage]
+    by_document_type: List[DocumentTypeUsage]
+    by_day: List[DailyUsage]
+
 @router.get("/dashboard", response_model=DashboardStatsResponse)
 def get_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get aggregated dashboard statistics
+    Get aggregated dashboard statistics (cached per role and user scope)
     """
+    return stats_cache.get_or_compute(
+        "dashboard", current_user.id, current_user.role,
+        lambda: _dashboard_response(db, current_user)
+    )
+
+def _dashboard_response(db: Session, current_user: User) -> dict:
     stats = get_dashboard_stats(db, user_id=current_user.id, role=current_user.role)
     
     # Transform recent_activity to match ExtractionResponse schema
@@ -69,7 +104,11 @@ def get_stats(
             data_quality_score=ext.data_quality_score,
             quality_grade=get_quality_grade(ext.data_quality_score or 0),
             processing_time_ms=ext.processing_time_ms,
-            uploaded_at=ext.uploaded_at
+            uploaded_at=ext.uploaded_at,
+            image_quality=ext.image_quality,
+            extraction_path=ext.extraction_path,
+            model_tier=ext.model_tier,
+            escalation_reason=ext.escalation_reason
         ))
     
     stats['recent_activity'] = transformed_activity
@@ -86,13 +125,86 @@ def get_avg_processing_time_endpoint(
     """
     from kyc_extractor.db.crud import get_avg_processing_time
     
-    avg_time = get_avg_processing_time(
-        db,
-        user_id=current_user.id,
-        role=current_user.role
+    def compute() -> dict:
+        avg_time = get_avg_processing_time(
+            db,
+            user_id=current_user.id,
+            role=current_user.role
+        )
+        return {
+            "avg_time_ms": avg_time,
+            "estimated_seconds": round(avg_time / 1000, 1)
+        }
+    
+    return stats_cache.get_or_compute("avg-processing-time", current_user.id, current_user.role, compute)
+
+@router.get("/usage", response_model=UsageStatsResponse)
+def get_usage_stats_endpoint(
+    days: int = Query(30, ge=1, le=366, description="Look-back window in days"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Gemini tokens, bytes sent, upstream latency, retries and cost,
+    per user, per document type and per day (users only see their own)
+    """
+    return stats_cache.get_or_compute(
+        "usage", current_user.id, current_user.role,
+        lambda: get_usage_stats(db, user_id=current_user.id, role=current_user.role, days=days),
+        days
     )
+
+@router.get("/cache")
+def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Extraction result cache hit/miss counters and eviction settings,
+    plus coalescing of identical in-flight uploads (Admin only)
+    """
+    from kyc_extractor.services.cache import extraction_cache
+    from kyc_extractor.services.singleflight import extraction_flights
+    
+    return {**extraction_cache.stats(), "single_flight": extraction_flights.stats()}
+
+@router.get("/response-cache")
+def get_response_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Cache of the dashboard, processing time and usage responses:
+    hit ratio, invalidations and time spent recomputing on a miss (Admin only)
+    """
+    return stats_cache.stats()
+
+@router.get("/packing")
+def get_packing_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Multi-document packing: bundles sent, documents per bundle and documents extracted on their own (Admin only)
+    """
+    from kyc_extractor.services.extraction import document_packer
+    
+    return document_packer.stats()
+
+@router.get("/upstream")
+def get_upstream_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Gemini rate limiter, retry and circuit breaker state (Admin only)
+    """
+    from kyc_extractor.core.gemini import gemini_client
+    
+    return gemini_client.guard.state()
+
+@router.get("/model-responses")
+def get_model_response_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Model reply parsing: parse-failure rate and how many malformed replies were repaired (Admin only)
+    """
+    from kyc_extractor.core.gemini import gemini_client
+    
+    return gemini_client.response_stats()
+
+@router.get("/image-pool")
+def get_image_pool_stats(current_user: User = Depends(get_current_admin_user)):
+    """
+    Image processing pool usage: queue wait vs compute time (Admin only)
+    """
+    from kyc_extractor.services.image_processor import image_processor
     
-    return {
-        "avg_time_ms": avg_time,
-        "estimated_seconds": round(avg_time / 1000, 1)
-    }
+    return image_processor.pool_stats()
@@ -5,7 +5,174 @@ load_dotenv()
 
 class Settings:
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
-    GEMINI_MODEL_NAME: str = "gemini-2.5-flash"
+    # Strong tier; always used when the cascade is off
+    GEMINI_MODEL_NAME: str = os.getenv("GEMINI_MODEL_NAME", "gemini-2.5-flash")
+    
+    # Model cascade: documents go to the cheaper fast tier first and are re-run on
+    # GEMINI_MODEL_NAME only when its answer looks unreliable
+    GEMINI_CASCADE_ENABLED: bool = os.getenv("GEMINI_CASCADE_ENABLED", "true").lower() == "true"
+    GEMINI_FAST_MODEL_NAME: str = os.getenv("GEMINI_FAST_MODEL_NAME", "gemini-2.5-flash-lite")
+    # Escalate when the fast tier's confidence is below this...
+    GEMINI_ESCALATION_MIN_CONFIDENCE: float = float(os.getenv("GEMINI_ESCALATION_MIN_CONFIDENCE", "0.85"))
+    # ...or its GSTIN/PAN/CIN is missing or fails validation
+    GEMINI_ESCALATE_ON_INVALID_ID: bool = os.getenv("GEMINI_ESCALATE_ON_INVALID_ID", "true").lower() == "true"
+    
+    # Two-stage extraction: classify first (locally from a PDF text layer, otherwise with a
+    # tiny prompt on a thumbnail), then extract with a short prompt for that document type.
+    # Off by default: it saves prompt tokens but adds a round trip (about +15% latency in
+    # scripts/benchmark_prompts.py); turn it on where cost matters more than latency
+    CLASSIFY_FIRST: bool = os.getenv("CLASSIFY_FIRST", "false").lower() == "true"
+    # Gemini bills images up to 384 px on both edges as a single 258-token tile
+    CLASSIFY_THUMBNAIL_MAX_EDGE: int = int(os.getenv("CLASSIFY_THUMBNAIL_MAX_EDGE", "384"))
+    
+    # Ask for JSON responses matching a schema derived from ExtractionResponse
+    GEMINI_JSON_MODE: bool = os.getenv("GEMINI_JSON_MODE", "true").lower() == "true"
+    
+    # USD per million tokens, for the cost recorded with each extraction (strong / fast tier)
+    GEMINI_INPUT_PRICE: float = float(os.getenv("GEMINI_INPUT_PRICE", "0.30"))
+    GEMINI_OUTPUT_PRICE: float = float(os.getenv("GEMINI_OUTPUT_PRICE", "2.50"))
+    GEMINI_FAST_INPUT_PRICE: float = float(os.getenv("GEMINI_FAST_INPUT_PRICE", "0.10"))
+    GEMINI_FAST_OUTPUT_PRICE: float = float(os.getenv("GEMINI_FAST_OUTPUT_PRICE", "0.40"))
+    
+    # Concurrency
+    # Max Gemini calls in flight per worker process (async path)
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "32"))
+    # Threads used to run PDF/image processing off the event loop
+    IMAGE_PROCESSOR_THREADS: int = int(os.getenv("IMAGE_PROCESSOR_THREADS", "4"))
+    # Worker processes for rasterization/re-encoding (0 keeps it on the threads above)
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+    # Tasks allowed to wait for a worker, and how long they wait before a 503
+    IMAGE_PROCESS_QUEUE_SIZE: int = int(os.getenv("IMAGE_PROCESS_QUEUE_SIZE", "16"))
+    IMAGE_PROCESS_QUEUE_TIMEOUT: float = float(os.getenv("IMAGE_PROCESS_QUEUE_TIMEOUT", "30"))
+    # Workers are replaced after this many tasks to release poppler/PIL memory
+    IMAGE_PROCESS_MAX_TASKS_PER_WORKER: int = int(os.getenv("IMAGE_PROCESS_MAX_TASKS_PER_WORKER", "50"))
+    IMAGE_PROCESS_START_METHOD: str = os.getenv("IMAGE_PROCESS_START_METHOD", "spawn")
+    
+    # PDF Rasterization (pdf2image / poppler)
+    # pages: send each page as its own image part | stitch: one tall canvas
+    PDF_PAGE_MODE: str = os.getenv("PDF_PAGE_MODE", "pages")
+    PDF_DPI: int = int(os.getenv("PDF_DPI", "200"))
+    # 1-based page selection, e.g. "1-3,5"; empty = all pages
+    PDF_PAGES: str = os.getenv("PDF_PAGES", "")
+    # Stop after this many pages; 0 = no limit
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "0"))
+    PDF_GRAYSCALE: bool = os.getenv("PDF_GRAYSCALE", "false").lower() == "true"
+    # Parallel poppler processes per PDF
+    PDF_THREAD_COUNT: int = int(os.getenv("PDF_THREAD_COUNT", "1"))
+    PDF_USE_PDFTOCAIRO: bool = os.getenv("PDF_USE_PDFTOCAIRO", "false").lower() == "true"
+    # Intermediate page format: ppm | png | jpeg
+    PDF_FORMAT: str = os.getenv("PDF_FORMAT", "ppm")
+    # Keep rasterized pages in a temp directory and decode them one at a time
+    PDF_RASTERIZE_TO_DISK: bool = os.getenv("PDF_RASTERIZE_TO_DISK", "false").lower() == "true"
+    
+    # Model Input Encoding (applied to every image before it is sent to Gemini)
+    # JPEG | WEBP | PNG | none (send the PIL image as-is)
+    MODEL_IMAGE_FORMAT: str = os.getenv("MODEL_IMAGE_FORMAT", "JPEG")
+    MODEL_IMAGE_QUALITY: int = int(os.getenv("MODEL_IMAGE_QUALITY", "80"))
+    # Longest edge in pixels; 0 disables downscaling
+    MODEL_IMAGE_MAX_EDGE: int = int(os.getenv("MODEL_IMAGE_MAX_EDGE", "3072"))
+    # auto (near-monochrome documents only) | always | never
+    MODEL_IMAGE_GRAYSCALE: str = os.getenv("MODEL_IMAGE_GRAYSCALE", "auto")
+    # Mean HSV saturation (0-255) below which 'auto' converts to grayscale
+    MODEL_IMAGE_GRAYSCALE_MAX_SATURATION: float = float(os.getenv("MODEL_IMAGE_GRAYSCALE_MAX_SATURATION", "20"))
+    # Crop to the document / its content and straighten small rotations before encoding
+    # (auto-crop is opt-in: it is heuristic and may cut off unusual page layouts)
+    MODEL_IMAGE_AUTOCROP: bool = os.getenv("MODEL_IMAGE_AUTOCROP", "false").lower() == "true"
+    MODEL_IMAGE_DESKEW: bool = os.getenv("MODEL_IMAGE_DESKEW", "true").lower() == "true"
+    MODEL_IMAGE_DESKEW_MIN_DEGREES: float = float(os.getenv("MODEL_IMAGE_DESKEW_MIN_DEGREES", "0.5"))
+    MODEL_IMAGE_DESKEW_MAX_DEGREES: float = float(os.getenv("MODEL_IMAGE_DESKEW_MAX_DEGREES", "15"))
+    
+    # Multi-page documents: drop near-blank pages (ink coverage fraction) and pages
+    # repeating an earlier one pixel for pixel
+    PAGE_FILTER_ENABLED: bool = os.getenv("PAGE_FILTER_ENABLED", "true").lower() == "true"
+    PAGE_BLANK_MAX_INK: float = float(os.getenv("PAGE_BLANK_MAX_INK", "0.0003"))
+    # Above 0, also drop near-duplicates (fraction of differing perceptual-hash bits, e.g. 0.05
+    # for rescans); this can drop same-template pages with different data
+    PAGE_DUPLICATE_MAX_DISTANCE: float = float(os.getenv("PAGE_DUPLICATE_MAX_DISTANCE", "0"))
+    
+    # Born-digital PDFs: read the text layer before rasterizing
+    TEXT_LAYER_ENABLED: bool = os.getenv("TEXT_LAYER_ENABLED", "true").lower() == "true"
+    # Build the result locally (no model call) when ID, name and address all parse and validate
+    TEXT_LAYER_LOCAL_ENABLED: bool = os.getenv("TEXT_LAYER_LOCAL_ENABLED", "true").lower() == "true"
+    TEXT_LAYER_LOCAL_CONFIDENCE: float = float(os.getenv("TEXT_LAYER_LOCAL_CONFIDENCE", "0.95"))
+    # Less text than this means a scanned PDF; more than MAX_CHARS is truncated in the text-only prompt
+    TEXT_LAYER_MIN_CHARS: int = int(os.getenv("TEXT_LAYER_MIN_CHARS", "200"))
+    TEXT_LAYER_MAX_CHARS: int = int(os.getenv("TEXT_LAYER_MAX_CHARS", "20000"))
+    TEXT_LAYER_MAX_PAGES: int = int(os.getenv("TEXT_LAYER_MAX_PAGES", "5"))
+    
+    # Pre-flight quality gate: reject (422) or flag unreadable scans before the model call
+    QUALITY_GATE_MODE: str = os.getenv("QUALITY_GATE_MODE", "reject")  # reject | flag | off
+    # Laplacian variance of the most detailed tiles, at 1024 px long edge
+    QUALITY_MIN_SHARPNESS: float = float(os.getenv("QUALITY_MIN_SHARPNESS", "100"))
+    QUALITY_MIN_SHORT_EDGE: int = int(os.getenv("QUALITY_MIN_SHORT_EDGE", "500"))
+    # Grey levels between paper and ink
+    QUALITY_MIN_CONTRAST: float = float(os.getenv("QUALITY_MIN_CONTRAST", "30"))
+    # Flag-only checks
+    QUALITY_MIN_DPI: int = int(os.getenv("QUALITY_MIN_DPI", "100"))
+    QUALITY_MAX_SKEW_DEGREES: float = float(os.getenv("QUALITY_MAX_SKEW_DEGREES", "5"))
+    
+    # Gemini Quota & Resilience (shared by all calls in a process; 0 disables a limit)
+    GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", "1000"))
+    GEMINI_TPM: int = int(os.getenv("GEMINI_TPM", "1000000"))
+    # Tokens charged against GEMINI_TPM per call (prompt + image + output)
+    GEMINI_TOKENS_PER_REQUEST: int = int(os.getenv("GEMINI_TOKENS_PER_REQUEST", "2000"))
+    GEMINI_CLASSIFY_TOKENS_PER_REQUEST: int = int(os.getenv("GEMINI_CLASSIFY_TOKENS_PER_REQUEST", "350"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+    GEMINI_RETRY_BASE_DELAY: float = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "1.0"))
+    GEMINI_RETRY_MAX_DELAY: float = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "30"))
+    GEMINI_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("GEMINI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    GEMINI_CIRCUIT_RESET_SECONDS: float = float(os.getenv("GEMINI_CIRCUIT_RESET_SECONDS", "30"))
+    
+    # Batch Extraction
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "200"))
+    # Files from one batch processed at the same time
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    
+    # Packing: /extract/batch and queued jobs send several small single-page documents
+    # in one model call (generic prompt, one JSON entry per document)
+    PACKING_ENABLED: bool = os.getenv("PACKING_ENABLED", "false").lower() == "true"
+    PACK_MAX_DOCUMENTS: int = int(os.getenv("PACK_MAX_DOCUMENTS", "8"))
+    # Only documents whose prepared image is at most this size are packed
+    PACK_MAX_DOCUMENT_BYTES: int = int(os.getenv("PACK_MAX_DOCUMENT_BYTES", str(300 * 1024)))
+    # Per call: inline image bytes (Gemini caps inline requests at 20 MB) and estimated
+    # prompt + image + output tokens
+    PACK_MAX_BYTES: int = int(os.getenv("PACK_MAX_BYTES", str(4 * 1024 * 1024)))
+    PACK_MAX_TOKENS: int = int(os.getenv("PACK_MAX_TOKENS", "12000"))
+    # How long the first document of a bundle waits for others
+    PACK_MAX_WAIT_MS: int = int(os.getenv("PACK_MAX_WAIT_MS", "200"))
+    
+    # Uploads are streamed in chunks; larger files spill from memory to a temp file
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    # Whole request body of /extract/batch (all files together); 0 disables
+    MAX_BATCH_UPLOAD_BYTES: int = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(256 * 1024)))
+    UPLOAD_SPOOL_MAX_MEMORY_BYTES: int = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY_BYTES", str(1024 * 1024)))
+    
+    # Extraction Result Cache (keyed by upload SHA-256 + model + prompt version + pipeline settings)
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_MAX_ENTRIES: int = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "1024"))
+    EXTRACTION_CACHE_TTL_SECONDS: int = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    # Also store results in the extraction_cache table
+    EXTRACTION_CACHE_PERSISTENT: bool = os.getenv("EXTRACTION_CACHE_PERSISTENT", "true").lower() == "true"
+    # How often each API process deletes expired extraction_cache rows; 0 disables
+    EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS: int = int(os.getenv("EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS", "3600"))
+    
+    # /stats Response Cache (dashboard, processing time, usage; per role and user scope)
+    STATS_CACHE_ENABLED: bool = os.getenv("STATS_CACHE_ENABLED", "true").lower() == "true"
+    # Bounds staleness from writes made by other API processes; local writes invalidate immediately
+    STATS_CACHE_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_TTL_SECONDS", "15"))
+    STATS_CACHE_MAX_ENTRIES: int = int(os.getenv("STATS_CACHE_MAX_ENTRIES", "1024"))
+    
+    # Async Job Queue (POST /jobs)
+    # Extraction workers per API process; 0 disables the pool
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Attempts while the model is unavailable (quota, outage, open circuit) before the job fails
+    JOB_MAX_UPSTREAM_ATTEMPTS: int = int(os.getenv("JOB_MAX_UPSTREAM_ATTEMPTS", "20"))
+    JOB_RETRY_DELAY_SECONDS: float = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))
+    # Jobs 'processing' for longer than this are assumed orphaned and requeued
+    JOB_STALE_AFTER_SECONDS: int = int(os.getenv("JOB_STALE_AFTER_SECONDS", "600"))
     
     # MySQL Configuration
     MYSQL_HOST: str = os.getenv("MYSQL_HOST", "localhost")
@@ -13,5 +180,7 @@ class Settings:
     MYSQL_USER: str = os.getenv("MYSQL_USER", "root")
     MYSQL_PASSWORD: str = os.getenv("MYSQL_PASSWORD", "")
     MYSQL_DATABASE: str = os.getenv("MYSQL_DATABASE", "kyc_extractor")
+    # Full SQLAlchemy URL; when set, overrides the MySQL settings above
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
 
 settings = Settings()
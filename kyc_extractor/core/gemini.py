@@ -1,8 +1,37 @@
 import google.generativeai as genai
 from PIL import Image
+import asyncio
 import json
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Union
 from kyc_extractor.core.config import settings
-from kyc_extractor.core.prompts import EXTRACTION_PROMPT
+from kyc_extractor.core.prompts import (
+    EXTRACTION_PROMPT, CLASSIFY_PROMPT, DOCUMENT_TYPES, TYPE_FIELDS, TYPED_PROMPTS, PACKED_PROMPT, PACKED_DOCUMENT_MARKER
+)
+from kyc_extractor.core.json_repair import repair_json
+from kyc_extractor.core.response_schema import extraction_schema, PACKED_SCHEMA
+from kyc_extractor.core.resilience import UpstreamGuard, RateLimiter, CircuitBreaker, CircuitOpenError, is_retryable
+
+def new_usage() -> dict:
+    """
+    Usage accumulator for one document. Every model call made for it
+    (classification, each cascade tier, retries) adds to it; model_name is
+    the model of the last extraction call.
+    """
+    return {
+        "model_name": None,
+        "model_calls": 0,
+        "prompt_tokens": 0,
+        "output_tokens": 0,
+        "payload_bytes": 0,
+        "upstream_ms": 0.0,
+        "retries": 0,
+        "cost_usd": 0.0,
+    }
+
+class MalformedReplyError(ValueError):
+    """The model answered, but not with usable JSON - a property of the reply, never retryable"""
 
 class GeminiClient:
     def __init__(self):
@@ -11,27 +40,362 @@ class GeminiClient:
         
         genai.configure(api_key=settings.GOOGLE_API_KEY)
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+        self.fast_model = genai.GenerativeModel(settings.GEMINI_FAST_MODEL_NAME) if settings.GEMINI_FAST_MODEL_NAME else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Reply parsing outcomes (clean / repaired / failed) and repair kinds, for response_stats
+        self._parse_outcomes = Counter()
+        self._repair_fixes = Counter()
+        
+        # Shared by every call in this process so we stay under quota
+        self.guard = UpstreamGuard(
+            limiter=RateLimiter(settings.GEMINI_RPM, settings.GEMINI_TPM),
+            breaker=CircuitBreaker(settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD, settings.GEMINI_CIRCUIT_RESET_SECONDS),
+            max_retries=settings.GEMINI_MAX_RETRIES,
+            base_delay=settings.GEMINI_RETRY_BASE_DELAY,
+            max_delay=settings.GEMINI_RETRY_MAX_DELAY
+        )
 
-    def extract_data(self, image: Image.Image) -> dict:
+    def extract_data(
+        self,
+        image: Union[Image.Image, dict, List],
+        id_is_valid: Optional[Callable[[dict], bool]] = None,
+        document_type: Optional[str] = None,
+        usage: Optional[dict] = None
+    ) -> dict:
         """
-        Sends the image to Gemini Flash and returns the extracted JSON.
+        Sends the image (PIL image or inline blob dict from
+        ImageProcessor.prepare_for_model, or a list of them for multi-page
+        documents) to Gemini and returns the extracted JSON, going through the
+        model cascade (see _escalation_reason). id_is_valid checks the
+        extracted ID of a result; invalid IDs are escalated. With a classified
+        document_type the short prompt for that type is used. Tokens, bytes,
+        latency, retries and cost of every call are added to usage (see
+        new_usage) when given.
+        Blocking wrapper around extract_data_async for scripts; request
+        handlers (and anything else on a running event loop) await that instead.
         """
+        return asyncio.run(self.extract_data_async(image, id_is_valid, document_type, usage))
+
+    async def extract_data_async(
+        self,
+        image: Union[Image.Image, dict, List],
+        id_is_valid: Optional[Callable[[dict], bool]] = None,
+        document_type: Optional[str] = None,
+        usage: Optional[dict] = None,
+        escalated_for: Optional[str] = None
+    ) -> dict:
+        """
+        Awaits the model without blocking the event loop (see extract_data);
+        in-flight calls are capped by GEMINI_MAX_CONCURRENCY.
+        With escalated_for, the fast tier already answered (in a packed call)
+        and the document goes straight to the strong model for that reason.
+        """
+        prompt = TYPED_PROMPTS.get(document_type, EXTRACTION_PROMPT)
+        contents = self._build_contents(image, prompt)
+        escalation_reason = escalated_for
+        tiers = self._tiers()[-1:] if escalated_for else self._tiers()
+        for tier, model in tiers:
+            attempts = 0
+
+            async def generate(model=model):
+                nonlocal attempts
+                attempts += 1
+                async with self._get_semaphore():
+                    return await model.generate_content_async(
+                        contents, generation_config=self._generation_config(extraction_schema(document_type))
+                    )
+
+            response = None
+            start = time.perf_counter()
+            try:
+                response = await self.guard.call(generate, settings.GEMINI_TOKENS_PER_REQUEST)
+                result = self._parse_response(response)
+            except Exception as e:
+                result = self._error_result(e)
+            self._record_usage(usage, tier, contents, response, time.perf_counter() - start, attempts, extraction=True)
+            result = self._complete_typed(result, document_type)
+            escalation_reason = self._finish_tier(result, tier, escalation_reason, id_is_valid)
+            if escalation_reason is None:
+                break
+        if result.get("wrong_type"):
+            if document_type is not None:
+                # Misclassified: extract again with the generic prompt
+                return await self.extract_data_async(image, id_is_valid, usage=usage)
+            # Only typed prompts ask for wrong_type; a generic reply setting it is stray
+            result.pop("wrong_type")
+        return result
+
+    async def extract_packed_async(
+        self,
+        payloads: List[Union[Image.Image, dict]],
+        id_is_valid: Optional[Callable[[dict], bool]] = None,
+        usages: Optional[List[dict]] = None,
+        estimated_tokens: Optional[int] = None
+    ) -> List[tuple]:
+        """
+        Extracts several single-page documents with one call: PACKED_PROMPT,
+        then a "Document <index>:" line and the image of each document.
+        Only the first cascade tier is called. Returns (result, escalation_reason)
+        per payload, in order; result is None for documents missing from the
+        reply (or all of them when the reply is unusable), which the caller
+        extracts on their own. An upstream failure is returned as the error
+        result for every document. The call's tokens and cost are split evenly
+        across usages.
+        """
+        tier, model = self._tiers()[0]
+        contents = [PACKED_PROMPT.format(count=len(payloads))]
+        for index, payload in enumerate(payloads, start=1):
+            contents += [PACKED_DOCUMENT_MARKER.format(index=index), payload]
+        attempts = 0
+
+        async def generate():
+            nonlocal attempts
+            attempts += 1
+            async with self._get_semaphore():
+                return await model.generate_content_async(contents, generation_config=self._generation_config(PACKED_SCHEMA))
+
+        response = None
+        start = time.perf_counter()
         try:
-            response = self.model.generate_content([EXTRACTION_PROMPT, image])
-            
-            # Basic cleanup to ensure JSON is parsed correctly
-            text_response = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if text_response.startswith("```json"):
-                text_response = text_response[7:]
-            if text_response.endswith("```"):
-                text_response = text_response[:-3]
-            
-            return json.loads(text_response.strip())
-            
+            response = await self.guard.call(generate, estimated_tokens or settings.GEMINI_TOKENS_PER_REQUEST * len(payloads))
+            reply = self._parse_response(response)
         except Exception as e:
-            print(f"Error during Gemini extraction: {e}")
-            return {"error": str(e), "status": "failed"}
+            reply = self._error_result(e)
+        if usages is not None:
+            shared = new_usage()
+            # Bytes are counted per document by _split_usage
+            self._record_usage(shared, tier, contents[:1], response, time.perf_counter() - start, attempts, extraction=True)
+            self._split_usage(shared, usages, payloads, attempts)
+
+        if "error" in reply:
+            return [(dict(reply) if reply.get("retryable") else None, None) for _ in payloads]
+
+        entries = {}
+        for entry in reply.get("documents") or []:
+            try:
+                entries.setdefault(int(entry.pop("index")), entry)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+        results = []
+        for index in range(1, len(payloads) + 1):
+            result = entries.get(index)
+            if not isinstance(result, dict) or not isinstance(result.get("data"), dict):
+                results.append((None, None))
+                continue
+            results.append((result, self._finish_tier(result, tier, None, id_is_valid)))
+        return results
+
+    async def classify_async(self, thumbnail: Union[Image.Image, dict], usage: Optional[dict] = None) -> Optional[str]:
+        """
+        Document type from a thumbnail, with a one-word answer from the fast
+        model. None when the answer is OTHER/unrecognized or the call fails;
+        the caller then extracts with the generic prompt.
+        """
+        tier, model = self._tiers()[0]
+        contents = [CLASSIFY_PROMPT, thumbnail]
+        attempts = 0
+
+        async def generate():
+            nonlocal attempts
+            attempts += 1
+            async with self._get_semaphore():
+                return await model.generate_content_async(contents)
+
+        response = None
+        start = time.perf_counter()
+        try:
+            response = await self.guard.call(generate, settings.GEMINI_CLASSIFY_TOKENS_PER_REQUEST)
+            answer = response.text.strip().strip("`.\"' ").upper()
+        except Exception as e:
+            print(f"⚠️ Document classification failed, using the generic prompt: {e}")
+            return None
+        finally:
+            self._record_usage(usage, tier, contents, response, time.perf_counter() - start, attempts)
+        return answer if answer in DOCUMENT_TYPES and answer != "OTHER" else None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def _complete_typed(self, result: dict, document_type: Optional[str]) -> dict:
+        """Typed prompts only return their type's fields; fill in the rest of the generic shape"""
+        if document_type not in TYPE_FIELDS or "error" in result or result.get("wrong_type"):
+            return result
+        data = result.setdefault("data", {})
+        for field in ("company_name", "trade_name", "identification_number", "issue_date", "approver_name"):
+            data.setdefault(field, None)
+        if not isinstance(data.get("address"), dict):
+            data["address"] = {}
+        for field in ("full_address", "address_line_1", "locality", "city", "state", "pincode"):
+            data["address"].setdefault(field, None)
+        result["document_type"] = document_type
+        return result
+
+    def _tiers(self) -> list:
+        """(tier, model) pairs in the order they are tried"""
+        if settings.GEMINI_CASCADE_ENABLED and self.fast_model is not None:
+            return [("fast", self.fast_model), ("strong", self.model)]
+        return [("strong", self.model)]
+
+    def _finish_tier(self, result: dict, tier: str, escalated_for: Optional[str], id_is_valid: Optional[Callable[[dict], bool]]) -> Optional[str]:
+        """
+        Records which tier produced the result (and why it was escalated to
+        it). Returns the reason to escalate to the next tier, or None to stop.
+        """
+        if "error" not in result:
+            result["model_tier"] = tier
+            result["escalation_reason"] = escalated_for
+        # A misclassified document goes back to the generic prompt, not the strong model
+        if tier != "fast" or result.get("wrong_type"):
+            return None
+        reason = self._escalation_reason(result, id_is_valid)
+        if reason:
+            print(f"⚠️ Escalating to {settings.GEMINI_MODEL_NAME}: {reason}")
+        return reason
+
+    def _escalation_reason(self, result: dict, id_is_valid: Optional[Callable[[dict], bool]]) -> Optional[str]:
+        """
+        Why a fast-tier answer should be re-run on the strong model, or None to
+        keep it. Upstream errors (quota, outage) are not escalated: the guard has
+        already retried them and the strong model shares its quota and circuit.
+        """
+        if "error" in result:
+            return None if result.get("retryable") else "invalid_response"
+        try:
+            confidence = float(result.get("confidence") or 0.0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence < settings.GEMINI_ESCALATION_MIN_CONFIDENCE:
+            return "low_confidence"
+        if settings.GEMINI_ESCALATE_ON_INVALID_ID and id_is_valid is not None and not id_is_valid(result):
+            return "invalid_id"
+        return None
+
+    def _record_usage(
+        self,
+        usage: Optional[dict],
+        tier: str,
+        contents: list,
+        response,
+        seconds: float,
+        attempts: int,
+        extraction: bool = False
+    ) -> None:
+        """Adds one guarded call (all of its attempts) to a new_usage() accumulator"""
+        if usage is None:
+            return
+        metadata = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(metadata, "prompt_token_count", 0) or 0
+        # total - prompt also covers thinking tokens, which are billed as output
+        output_tokens = max(
+            getattr(metadata, "candidates_token_count", 0) or 0,
+            (getattr(metadata, "total_token_count", 0) or 0) - prompt_tokens
+        )
+        input_price, output_price = (
+            (settings.GEMINI_FAST_INPUT_PRICE, settings.GEMINI_FAST_OUTPUT_PRICE) if tier == "fast"
+            else (settings.GEMINI_INPUT_PRICE, settings.GEMINI_OUTPUT_PRICE)
+        )
+
+        usage["model_calls"] += attempts
+        usage["retries"] += max(0, attempts - 1)
+        usage["prompt_tokens"] += prompt_tokens
+        usage["output_tokens"] += output_tokens
+        usage["payload_bytes"] += self._payload_bytes(contents[1:]) * attempts
+        usage["upstream_ms"] += seconds * 1000
+        usage["cost_usd"] += (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+        if extraction:
+            usage["model_name"] = settings.GEMINI_FAST_MODEL_NAME if tier == "fast" else settings.GEMINI_MODEL_NAME
+
+    def _split_usage(self, shared: dict, usages: List[dict], payloads: list, attempts: int) -> None:
+        """
+        Shares one packed call between its documents: tokens and cost evenly
+        (remainders to the first documents), each document's own bytes, and
+        the full latency and retries, which every document waited through.
+        """
+        count = len(usages)
+        for i, (usage, payload) in enumerate(zip(usages, payloads)):
+            for key in ("prompt_tokens", "output_tokens"):
+                usage[key] += shared[key] // count + (1 if i < shared[key] % count else 0)
+            usage["cost_usd"] += shared["cost_usd"] / count
+            usage["payload_bytes"] += self._payload_bytes([payload]) * attempts
+            usage["upstream_ms"] += shared["upstream_ms"]
+            usage["retries"] += shared["retries"]
+            usage["model_calls"] += shared["model_calls"]
+            usage["model_name"] = shared["model_name"]
+
+    def _payload_bytes(self, parts: list) -> int:
+        """Encoded size of the document parts (inline blobs and text); PIL images are not counted"""
+        total = 0
+        for part in parts:
+            if isinstance(part, dict):
+                total += len(part.get("data") or b"")
+            elif isinstance(part, str):
+                total += len(part.encode())
+        return total
+
+    def _build_contents(self, image, prompt: str = EXTRACTION_PROMPT) -> list:
+        # Multi-page documents are sent as one part per page, in page order
+        parts = image if isinstance(image, list) else [image]
+        return [prompt, *parts]
+
+    def response_stats(self) -> dict:
+        """
+        How often replies were not valid JSON (parse_failure_rate) and how many
+        of those the repair pass rescued (repair_rate), with the fixes applied.
+        """
+        clean, repaired, failed = (self._parse_outcomes[key] for key in ("clean", "repaired", "failed"))
+        total = clean + repaired + failed
+        malformed = repaired + failed
+        return {
+            "json_mode": settings.GEMINI_JSON_MODE,
+            "responses": total,
+            "clean": clean,
+            "repaired": repaired,
+            "failed": failed,
+            "parse_failure_rate": round(malformed / total, 4) if total else 0.0,
+            "repair_rate": round(repaired / malformed, 4) if malformed else None,
+            "fixes": dict(self._repair_fixes),
+        }
+
+    def _generation_config(self, schema: dict) -> Optional[dict]:
+        """JSON response mode with the schema matching the prompt"""
+        if not settings.GEMINI_JSON_MODE:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": schema}
+
+    def _parse_response(self, response) -> dict:
+        """
+        Parses the JSON reply. Anything that is not a JSON object goes through
+        the local repair pass (core/json_repair.py) before it counts as a failure.
+        """
+        text_response = response.text
+        try:
+            result = json.loads(text_response)
+        except json.JSONDecodeError:
+            result = None
+        if isinstance(result, dict):
+            self._parse_outcomes["clean"] += 1
+            return result
+
+        result, fixes = repair_json(text_response)
+        if result is None:
+            self._parse_outcomes["failed"] += 1
+            raise MalformedReplyError(f"Model reply is not valid JSON and could not be repaired: {text_response[:100]!r}")
+        self._parse_outcomes["repaired"] += 1
+        self._repair_fixes.update(fixes)
+        print(f"⚠️ Repaired malformed model JSON ({', '.join(fixes)})")
+        return result
+
+    def _error_result(self, e: Exception) -> dict:
+        print(f"Error during Gemini extraction: {e}")
+        result = {"error": str(e), "status": "failed"}
+        # Upstream trouble (quota, outage, open circuit) - the document itself is fine
+        if isinstance(e, CircuitOpenError):
+            result["retryable"] = True
+            result["retry_after"] = e.retry_after
+        elif not isinstance(e, MalformedReplyError) and is_retryable(e):
+            result["retryable"] = True
+        return result
 
 gemini_client = GeminiClient()
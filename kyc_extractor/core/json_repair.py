@@ -0,0 +1,161 @@
+"""
+Local repair pass for malformed model JSON.
+
+JSON response mode makes malformed replies rare, but a reply cut off at the
+output token limit or a model that ignores the mode still costs the user a
+re-upload if it is rejected outright. Before giving up, the reply is
+re-scanned once and the usual defects are fixed:
+- markdown fences and text around the object;
+- single-quoted strings and Python literals (None/True/False);
+- trailing commas before } or ];
+- raw newlines inside strings;
+- truncation: the open string is closed, an incomplete last member is dropped
+  and the open objects/arrays are closed.
+"""
+import json
+import re
+from typing import List, Optional, Tuple
+
+FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+LITERALS = {"None": "null", "True": "true", "False": "false", "NaN": "null", "null": "null", "true": "true", "false": "false"}
+CLOSERS = {"{": "}", "[": "]"}
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    """Removes a comma (and whitespace after it) at the end of out; True if there was one"""
+    end = len(out)
+    while end and out[end - 1].isspace():
+        end -= 1
+    if end and out[end - 1] == ",":
+        del out[end - 1:]
+        return True
+    return False
+
+def _scan(text: str) -> Tuple[str, list, list, Optional[str], set]:
+    """
+    Re-emits text as JSON syntax from the first { on. Returns the output, the
+    still-open brackets, comma checkpoints (output length and open brackets
+    at each comma outside a string), the open string quote if truncated inside
+    one, and the kinds of fixes applied.
+    """
+    fixes = set()
+    out: List[str] = []
+    stack: List[str] = []
+    checkpoints = []
+    quote = None
+    escape = False
+    i = text.find("{")
+    if i < 0:
+        return "", [], [], None, fixes
+    if text[:i].strip():
+        fixes.add("surrounding_text")
+
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                if ch == "'":
+                    # \' is not a JSON escape
+                    out[-1] = ch
+                else:
+                    out.append(ch)
+                escape = False
+            elif ch == "\\":
+                out.append(ch)
+                escape = True
+            elif ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                # Double quote inside a single-quoted string
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+                fixes.add("raw_newline")
+            else:
+                out.append(ch)
+        elif ch in "\"'":
+            if ch == "'":
+                fixes.add("single_quotes")
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            if _strip_trailing_comma(out):
+                fixes.add("trailing_comma")
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                if text[i + 1:].strip():
+                    fixes.add("surrounding_text")
+                break
+        elif ch == ",":
+            checkpoints.append((len(out), list(stack)))
+            out.append(ch)
+        elif ch.isdigit() or ch == "-":
+            j = i + 1
+            while j < len(text) and (text[j].isdigit() or text[j] in ".eE+-"):
+                j += 1
+            out.append(text[i:j])
+            i = j
+            continue
+        elif ch.isalpha():
+            j = i
+            while j < len(text) and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            if word not in ("null", "true", "false"):
+                fixes.add("python_literals")
+            out.append(LITERALS.get(word, "null"))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    return "".join(out), stack, checkpoints, quote, fixes
+
+def _close(body: str, stack: list) -> str:
+    body = body.rstrip()
+    if body.endswith(","):
+        body = body[:-1]
+    elif body.endswith(":"):
+        body += " null"
+    return body + "".join(CLOSERS[opener] for opener in reversed(stack))
+
+def repair_json(text: str) -> Tuple[Optional[dict], List[str]]:
+    """
+    Best-effort parse of a malformed JSON object reply.
+    Returns (object or None, sorted list of the fixes applied).
+    """
+    if FENCE.search(text):
+        text = FENCE.sub("", text)
+        fixes = {"fences"}
+    else:
+        fixes = set()
+
+    body, stack, checkpoints, quote, scan_fixes = _scan(text)
+    fixes |= scan_fixes
+    if not body:
+        return None, sorted(fixes)
+
+    candidates = []
+    if not stack and not quote:
+        candidates.append(body)
+    else:
+        fixes.add("truncated")
+        candidates.append(_close(body + ('"' if quote else ""), stack))
+        # Drop incomplete trailing members, most recent first
+        for length, open_brackets in reversed(checkpoints):
+            candidates.append(_close(body[:length], open_brackets))
+
+    for candidate in candidates:
+        try:
+            result = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(result, dict):
+            return result, sorted(fixes)
+    return None, sorted(fixes)
@@ -1,5 +1,10 @@
+# Bump whenever a prompt changes so cached results from the old prompt are not reused
+PROMPT_VERSION = "v5"
+
 EXTRACTION_PROMPT = """
 You are an expert Document Extraction AI. Your task is to extract structured company details from the provided document image.
+Multi-page documents are provided as several images in page order; treat them as a single document.
+Born-digital PDFs may be provided as their extracted text instead of images.
 
 **Supported Document Types:**
 - GST Certificate
@@ -47,3 +52,131 @@ Return ONLY a valid JSON object with the following structure:
   "confidence_reason": "string"
 }
 """
+
+# Sent after EXTRACTION_PROMPT instead of page images when a PDF has a usable text layer
+TEXT_LAYER_PROMPT = """
+The document is a born-digital PDF. Its text layer is given below instead of images;
+base the confidence score on how complete and unambiguous the text is.
+
+DOCUMENT TEXT:
+{text}
+"""
+
+# Two-stage extraction (CLASSIFY_FIRST): a tiny prompt on a thumbnail picks the
+# document type, then a short prompt for that type asks only for the fields it
+# carries. EXTRACTION_PROMPT above remains the fallback for OTHER/unclassified.
+DOCUMENT_TYPES = ["GST_CERTIFICATE", "PAN_CARD", "FSSAI", "INCORPORATION_CERT", "MSME", "SHOP_ESTABLISHMENT", "OTHER"]
+
+CLASSIFY_PROMPT = """Which Indian business document is this? Answer with exactly one word from:
+GST_CERTIFICATE, PAN_CARD, FSSAI, INCORPORATION_CERT, MSME, SHOP_ESTABLISHMENT, OTHER"""
+
+# (label, [(field, what to extract)]) per document type; fields not listed are returned as null
+TYPE_FIELDS = {
+    "GST_CERTIFICATE": ("GST registration certificate (Form GST REG-06)", [
+        ("company_name", "Legal Name of the business, not the Trade Name"),
+        ("trade_name", "Trade Name, if any"),
+        ("identification_number", "the 15-character GSTIN (Registration Number)"),
+        ("address", "Address of Principal Place of Business"),
+        ("issue_date", "Date of Liability"),
+        ("approver_name", "name of the approving authority, if visible"),
+    ]),
+    "PAN_CARD": ("company PAN card", [
+        ("company_name", "name of the company as printed"),
+        ("identification_number", "the 10-character PAN"),
+        ("issue_date", "Date of Incorporation/Formation"),
+    ]),
+    "FSSAI": ("FSSAI food business license or registration", [
+        ("company_name", "name of the licensee/food business operator"),
+        ("trade_name", "name of the premises or brand, if different"),
+        ("identification_number", "the 14-digit license/registration number"),
+        ("address", "address of the premises"),
+        ("issue_date", "date of issue"),
+        ("approver_name", "Designated Officer/Registering Authority, if visible"),
+    ]),
+    "INCORPORATION_CERT": ("MCA certificate of incorporation", [
+        ("company_name", "name of the company being incorporated"),
+        ("identification_number", "the 21-character Corporate Identity Number (CIN)"),
+        ("address", "registered office address, if printed"),
+        ("issue_date", "date of incorporation"),
+        ("approver_name", "Registrar of Companies who signed, if visible"),
+    ]),
+    "MSME": ("Udyam/MSME registration certificate", [
+        ("company_name", "Name of Enterprise"),
+        ("identification_number", "the Udyam Registration Number (UDYAM-XX-00-0000000)"),
+        ("address", "Official Address of Enterprise"),
+        ("issue_date", "Date of Udyam Registration"),
+    ]),
+    "SHOP_ESTABLISHMENT": ("Shop & Establishment Act registration certificate", [
+        ("company_name", "name of the employer/owner entity"),
+        ("trade_name", "name of the establishment, if different"),
+        ("identification_number", "the registration number"),
+        ("address", "postal address of the establishment"),
+        ("issue_date", "date of registration/issue"),
+        ("approver_name", "Inspector/registering authority, if visible"),
+    ]),
+}
+
+ADDRESS_JSON = """"address": {
+      "full_address": "string or null",
+      "address_line_1": "building, street, floor or null",
+      "locality": "area, landmark or null",
+      "city": "string or null",
+      "state": "string or null",
+      "pincode": "string or null"
+    }"""
+
+def build_typed_prompt(document_type: str) -> str:
+    """Short extraction prompt listing only the fields of one document type"""
+    label, fields = TYPE_FIELDS[document_type]
+    rules = "\n".join(f"- {name}: {description}" for name, description in fields)
+    schema = ",\n    ".join(
+        ADDRESS_JSON if name == "address" else f'"{name}": "{"YYYY-MM-DD" if name == "issue_date" else "string"} or null"'
+        for name, _ in fields
+    )
+    return (
+        f"Extract these fields from the {label}. Multi-page documents are given as several images in page order; "
+        "born-digital PDFs may be given as text.\n"
+        f"{rules}\n"
+        "confidence is 0.0-1.0 from clarity and field visibility; confidence_reason is one short sentence.\n"
+        f'If this is not a {label}, set "wrong_type" to true and leave the fields null.\n'
+        "Return ONLY valid JSON:\n"
+        f'{{\n  "data": {{\n    {schema}\n  }},\n  "confidence": float,\n  "confidence_reason": "string",\n  "wrong_type": boolean\n}}\n'
+    )
+
+TYPED_PROMPTS = {document_type: build_typed_prompt(document_type) for document_type in TYPE_FIELDS}
+
+# Packing (services/packing.py): several small single-page documents in one call,
+# each image preceded by a "Document <index>:" line; one JSON entry per document
+PACKED_PROMPT = EXTRACTION_PROMPT.split("**Output Format:**")[0] + """**Several Documents:**
+You are given {count} separate documents, each image preceded by a line "Document <index>:".
+Extract each document on its own; never combine fields from different documents.
+
+**Output Format:**
+Return ONLY a valid JSON object with one entry per document, in index order:
+{{
+  "documents": [
+    {{
+      "index": 1,
+      "document_type": "GST_CERTIFICATE | PAN_CARD | FSSAI | INCORPORATION_CERT | MSME | SHOP_ESTABLISHMENT | OTHER",
+      "data": {{
+        "company_name": "string or null",
+        "trade_name": "string or null",
+        "identification_number": "string or null",
+        "address": {{
+          "full_address": "string or null",
+          "address_line_1": "string or null",
+          "locality": "string or null",
+          "city": "string or null",
+          "state": "string or null",
+          "pincode": "string or null"
+        }},
+        "issue_date": "YYYY-MM-DD or null",
+        "approver_name": "string or null"
+      }},
+      "confidence": float,
+      "confidence_reason": "string"
+    }}
+  ]
+}}
+"""
+PACKED_DOCUMENT_MARKER = "Document {index}:"
@@ -0,0 +1,243 @@
+"""
+Rate limiting, retry and circuit breaking for upstream model calls.
+
+One UpstreamGuard is shared by every Gemini call in the process:
+- RateLimiter: token buckets for requests/minute and tokens/minute
+- retry with full-jitter exponential backoff for 429/5xx/timeouts
+- CircuitBreaker: fails fast while the upstream keeps failing
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_EXCEPTIONS = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        TimeoutError,
+        ConnectionError,
+    )
+except ImportError:
+    RETRYABLE_EXCEPTIONS = (TimeoutError, ConnectionError)
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True for rate-limit, server-side and transport errors worth retrying:
+    the typed exceptions above, or an error carrying one of those HTTP status
+    codes. The message is never inspected - it may quote the model's reply.
+    """
+    if isinstance(error, RETRYABLE_EXCEPTIONS):
+        return True
+    status = getattr(error, "code", None)
+    if status is None:
+        status = getattr(error, "status_code", None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS_CODES
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Upstream model unavailable, circuit open (retry in {retry_after:.0f}s)")
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes tokens immediately (the balance
+    may go negative) and returns how long the caller must wait before using them,
+    so it works for both sync and async callers.
+    """
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 10):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate_per_second * burst_seconds)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            elapsed = time.monotonic() - self._updated_at
+            return min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits; 0 disables a limit"""
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.throttled = 0
+
+    def reserve(self, estimated_tokens: int) -> float:
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            self.throttled += 1
+        return wait
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def state(self) -> dict:
+        return {
+            "requests_available": round(self.requests.available, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.available) if self.tokens else None,
+            "throttled_calls": self.throttled,
+        }
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds, letting one trial call through;
+    half_open -> closed on success, back to open on failure.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """
+        Raises CircuitOpenError if the call must not go upstream.
+        Returns True if the call is the half-open trial.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            raise CircuitOpenError(max(0.0, self.reset_timeout - elapsed))
+
+    def release_trial(self) -> None:
+        """The trial ended without an outcome (e.g. cancelled); lets the next call be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_after = None
+            if self.state == "open":
+                retry_after = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "retry_after_seconds": retry_after,
+                "rejected_calls": self.rejected,
+            }
+
+class UpstreamGuard:
+    """Runs upstream calls through the rate limiter, retry policy and circuit breaker"""
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        breaker: CircuitBreaker,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(self, fn: Callable[[], Awaitable], estimated_tokens: int = 0):
+        """Await fn() with limiting, retries and circuit breaking; re-raises the last error"""
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                await self.limiter.acquire(estimated_tokens)
+                self.calls += 1
+                response = await fn()
+            except Exception as e:
+                if not self._handle_failure(e, attempt):
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled (client disconnect, abandoned classification)
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return response
+
+    def _handle_failure(self, error: Exception, attempt: int) -> bool:
+        """Records the failure; returns True if the call should be retried"""
+        self.failures += 1
+        if not is_retryable(error):
+            # Bad request, safety block, etc. - the upstream itself is healthy
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.max_retries or self.breaker.state == "open":
+            return False
+        self.retries += 1
+        return True
+
+    def state(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "max_retries": self.max_retries,
+            "rate_limiter": self.limiter.state(),
+            "circuit_breaker": self.breaker.snapshot(),
+        }
@@ -0,0 +1,86 @@
+"""
+Gemini response schemas derived from the API's pydantic models.
+
+Extraction calls use JSON response mode with one of these schemas, so the
+model replies with bare JSON in the shape of ExtractionResponse/ExtractedData.
+Gemini accepts an OpenAPI subset: no $ref/anyOf/defaults/titles, and
+nullability is a "nullable" flag.
+"""
+from typing import Optional
+from kyc_extractor.schemas import ExtractionResponse
+from kyc_extractor.core.prompts import TYPE_FIELDS
+
+# ExtractionResponse fields produced by the model; the rest are added by the pipeline
+MODEL_FIELDS = ["document_type", "data", "confidence", "confidence_reason"]
+REQUIRED_FIELDS = ["document_type", "data", "confidence"]
+
+def to_gemini_schema(schema: dict, defs: Optional[dict] = None) -> dict:
+    """Converts a pydantic JSON schema to Gemini's schema subset"""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return to_gemini_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        converted = to_gemini_schema(options[0], defs)
+        if len(options) < len(schema["anyOf"]):
+            converted["nullable"] = True
+        return converted
+    if "enum" in schema:
+        return {"type": "string", "enum": [str(value) for value in schema["enum"]]}
+    if schema.get("type") == "object":
+        converted = {
+            "type": "object",
+            "properties": {name: to_gemini_schema(value, defs) for name, value in schema.get("properties", {}).items()},
+        }
+        if schema.get("required"):
+            converted["required"] = list(schema["required"])
+        return converted
+    if schema.get("type") == "array":
+        return {"type": "array", "items": to_gemini_schema(schema.get("items", {"type": "string"}), defs)}
+    return {"type": schema.get("type", "string")}
+
+def _build_schemas() -> dict:
+    full = to_gemini_schema(ExtractionResponse.model_json_schema())
+    generic = {
+        "type": "object",
+        "properties": {name: full["properties"][name] for name in MODEL_FIELDS},
+        "required": REQUIRED_FIELDS,
+    }
+
+    schemas = {None: generic}
+    data = generic["properties"]["data"]
+    for document_type, (_, fields) in TYPE_FIELDS.items():
+        # Per-type prompts: only that type's fields; the type itself comes from classification
+        schemas[document_type] = {
+            "type": "object",
+            "properties": {
+                "data": {"type": "object", "properties": {name: data["properties"][name] for name, _ in fields}},
+                "confidence": generic["properties"]["confidence"],
+                "confidence_reason": generic["properties"]["confidence_reason"],
+                "wrong_type": {"type": "boolean", "nullable": True},
+            },
+            "required": ["data", "confidence"],
+        }
+    return schemas
+
+EXTRACTION_SCHEMAS = _build_schemas()
+
+# Packed prompt: {"documents": [generic result + "index", ...]}
+PACKED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "documents": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"index": {"type": "integer"}, **EXTRACTION_SCHEMAS[None]["properties"]},
+                "required": ["index", *REQUIRED_FIELDS],
+            },
+        },
+    },
+    "required": ["documents"],
+}
+
+def extraction_schema(document_type: Optional[str] = None) -> dict:
+    """Response schema for the generic prompt (None/OTHER) or a per-type prompt"""
+    return EXTRACTION_SCHEMAS.get(document_type, EXTRACTION_SCHEMAS[None])
@@ -1,17 +1,33 @@
+import base64
+import json
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, desc
-from kyc_extractor.db.models import Extraction
-from typing import Optional, List
+from sqlalchemy import func, case, desc, or_
+from sqlalchemy.exc import IntegrityError
+from kyc_extractor.db.models import Extraction, ExtractionCacheEntry, ExtractionJob, ExtractionRollup, ROLLUP_ALL_TIME
+from kyc_extractor.services.stats_cache import stats_cache
+from typing import Optional, List, Tuple
+from collections import Counter
 from datetime import datetime, timedelta
 
 def create_extraction(db: Session, extraction_data: dict) -> Extraction:
-    """Create a new extraction record"""
-    db_extraction = Extraction(**extraction_data)
-    db.add(db_extraction)
+    """Create a new extraction record and add it to the statistics rollups"""
+    db_extraction = add_extraction(db, extraction_data)
     db.commit()
+    stats_cache.invalidate(db_extraction.user_id)
     db.refresh(db_extraction)
     return db_extraction
 
+def add_extraction(db: Session, extraction_data: dict) -> Extraction:
+    """Add an extraction record and its rollup updates to the session, without committing"""
+    db_extraction = Extraction(**extraction_data)
+    db.add(db_extraction)
+    if db_extraction.uploaded_at is None:
+        # Timestamp comes from the server default; read it back to pick the rollup hour
+        db.flush()
+        db.refresh(db_extraction, ["uploaded_at"])
+    update_rollups(db, db_extraction)
+    return db_extraction
+
 def get_extraction_by_request_id(db: Session, request_id: str, user_id: int = None, role: str = "user") -> Optional[Extraction]:
     """Get extraction by request_id with RBAC"""
     query = db.query(Extraction).filter(Extraction.request_id == request_id)
@@ -19,6 +35,21 @@ def get_extraction_by_request_id(db: Session, request_id: str, user_id: int = No
         query = query.filter(Extraction.user_id == user_id)
     return query.first()
 
+def encode_history_cursor(extraction: Extraction) -> str:
+    """Opaque /history cursor pointing just after this extraction in (uploaded_at, id) DESC order"""
+    uploaded_at = extraction.uploaded_at.isoformat() if extraction.uploaded_at else None
+    raw = json.dumps([uploaded_at, extraction.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """(uploaded_at, id) from a cursor made by encode_history_cursor; raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        uploaded_at, extraction_id = json.loads(raw)
+        return (datetime.fromisoformat(uploaded_at) if uploaded_at else None), int(extraction_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
 def get_extractions_history(
     db: Session,
     skip: int = 0,
@@ -26,9 +57,18 @@ def get_extractions_history(
     document_type: Optional[str] = None,
     days_ago: Optional[int] = None,
     user_id: Optional[int] = None,
-    role: str = "user"
-) -> tuple[List[Extraction], int]:
-    """Get extraction history with filters and RBAC"""
+    role: str = "user",
+    cursor: Optional[str] = None,
+    include_total: bool = True
+) -> Tuple[List[Extraction], Optional[int], Optional[str]]:
+    """
+    Get extraction history with filters and RBAC, newest first.
+    Pages by OFFSET skip, or by keyset when a cursor from a previous page is
+    given: deep pages then cost the same as the first one. Returns
+    (items, total or None without include_total, cursor of the next page or
+    None on the last page).
+    Raises ValueError for a malformed cursor.
+    """
     query = db.query(Extraction)
 
     # RBAC: If not admin, filter by user_id
@@ -44,13 +84,33 @@ def get_extractions_history(
         cutoff_date = datetime.utcnow() - timedelta(days=days_ago)
         query = query.filter(Extraction.uploaded_at >= cutoff_date)
 
-    # Order by most recent first
-    query = query.order_by(Extraction.uploaded_at.desc())
-    
-    # Get total count before pagination
-    total_count = query.count()
+    # Counting scans every matching row; clients paging with cursors can skip it
+    total_count = query.count() if include_total else None
+
+    # Most recent first; id breaks ties so pages never overlap. NULL timestamps sort last.
+    order = (Extraction.uploaded_at.desc(), Extraction.id.desc())
+    null_rows = query.filter(Extraction.uploaded_at.is_(None)).order_by(*order)
+    if cursor:
+        uploaded_at, extraction_id = decode_history_cursor(cursor)
+        if uploaded_at is None:
+            query = null_rows.filter(Extraction.id < extraction_id)
+        else:
+            # uploaded_at <= t is a range seek on ix_extractions_uploaded_at_id (an OR with IS NULL would not be)
+            query = query.filter(
+                Extraction.uploaded_at <= uploaded_at,
+                or_(Extraction.uploaded_at < uploaded_at, Extraction.id < extraction_id)
+            ).order_by(*order)
+    else:
+        query = query.order_by(*order).offset(skip)
 
-    return query.offset(skip).limit(limit).all(), total_count
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if cursor and uploaded_at is not None and len(rows) <= limit:
+        # Timestamped rows ran out; continue into the NULL ones
+        rows += null_rows.limit(limit + 1 - len(rows)).all()
+    items = rows[:limit]
+    next_cursor = encode_history_cursor(items[-1]) if items and len(rows) > limit else None
+    return items, total_count, next_cursor
 
 def update_extraction(db: Session, request_id: str, update_data: dict) -> Optional[Extraction]:
     """Update an extraction record"""
@@ -58,13 +118,279 @@ def update_extraction(db: Session, request_id: str, update_data: dict) -> Option
     if not extraction:
         return None
     
+    # Move the extraction's contribution to the rollups along with it
+    update_rollups(db, extraction, sign=-1)
     for key, value in update_data.items():
         setattr(extraction, key, value)
+    update_rollups(db, extraction)
     
     db.commit()
+    stats_cache.invalidate(extraction.user_id)
     db.refresh(extraction)
     return extraction
 
+# ============== Statistics Rollups ==============
+
+QUALITY_GRADE_FLOORS = (('A', 90), ('B', 75), ('C', 60), ('D', 40))  # aligned with scoring.py; below 40 (or unscored) is F
+
+# Upper bounds (ms) of the processing-time histogram columns; slower documents go to processing_30s_plus
+PROCESSING_TIME_BUCKETS = (
+    (1000, "processing_under_1s"),
+    (2000, "processing_under_2s"),
+    (5000, "processing_under_5s"),
+    (10000, "processing_under_10s"),
+    (30000, "processing_under_30s"),
+)
+
+def rollup_hour(uploaded_at: datetime) -> datetime:
+    return uploaded_at.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+def rollup_increments(extraction) -> dict:
+    """Counter increments one extraction (or row with the same attributes) adds to its rollups"""
+    score = extraction.data_quality_score
+    if score is None:
+        grade = "unscored"
+    else:
+        grade = next((f"grade_{letter.lower()}" for letter, floor in QUALITY_GRADE_FLOORS if score >= floor), "grade_f")
+    increments = {
+        "documents": 1,
+        "confidence_sum": extraction.confidence or 0.0,
+        "confidence_count": 1 if extraction.confidence is not None else 0,
+        grade: 1,
+    }
+    processing_time_ms = extraction.processing_time_ms
+    if processing_time_ms and processing_time_ms > 0:
+        increments["processing_count"] = 1
+        increments["processing_ms_sum"] = processing_time_ms
+        bucket = next((column for bound, column in PROCESSING_TIME_BUCKETS if processing_time_ms < bound), "processing_30s_plus")
+        increments[bucket] = 1
+    return increments
+
+def rollup_keys(extraction) -> List[dict]:
+    """The lifetime row and, when the upload time is known, the hourly row"""
+    base = {"user_id": extraction.user_id or 0, "document_type": extraction.document_type or "OTHER"}
+    keys = [{**base, "hour": ROLLUP_ALL_TIME}]
+    if extraction.uploaded_at is not None:
+        keys.append({**base, "hour": rollup_hour(extraction.uploaded_at)})
+    return keys
+
+def _upsert_rollup(db: Session, key: dict, increments: dict) -> None:
+    table = ExtractionRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("mysql", "sqlite"):
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(table).values(**key, **increments)
+            statement = statement.on_duplicate_key_update({
+                column: table.c[column] + statement.inserted[column] for column in increments
+            })
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            statement = insert(table).values(**key, **increments)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "hour", "document_type"],
+                set_={column: table.c[column] + statement.excluded[column] for column in increments}
+            )
+        db.execute(statement)
+        return
+    updated = db.execute(
+        table.update().where(*[table.c[column] == value for column, value in key.items()]).values({
+            column: table.c[column] + value for column, value in increments.items()
+        })
+    ).rowcount
+    if not updated:
+        db.execute(table.insert().values(**key, **increments))
+
+def update_rollups(db: Session, extraction: Extraction, sign: int = 1) -> None:
+    """
+    Adds (sign=-1: removes) an extraction to its rollup rows. Does not
+    commit: callers commit it together with the extraction itself.
+    """
+    increments = {column: value * sign for column, value in rollup_increments(extraction).items()}
+    for key in rollup_keys(extraction):
+        _upsert_rollup(db, key, increments)
+
+def rebuild_rollups(db: Session, chunk_size: int = 10000) -> int:
+    """
+    Recomputes every rollup row from the extractions table, returns the rows
+    written. Extractions stored while this runs may be missed or counted
+    twice, so run it while uploads are paused.
+    """
+    rollups = {}
+    rows = db.query(
+        Extraction.user_id,
+        Extraction.document_type,
+        Extraction.uploaded_at,
+        Extraction.confidence,
+        Extraction.data_quality_score,
+        Extraction.processing_time_ms
+    ).yield_per(chunk_size)
+    for row in rows:
+        increments = rollup_increments(row)
+        for key in rollup_keys(row):
+            rollups.setdefault(tuple(key.items()), Counter()).update(increments)
+
+    counters = [column.name for column in ExtractionRollup.__table__.columns if column.name not in ("id", "user_id", "document_type", "hour")]
+    db.query(ExtractionRollup).delete(synchronize_session=False)
+    values = [{**dict(key), **{column: counts.get(column, 0) for column in counters}} for key, counts in rollups.items()]
+    for start in range(0, len(values), chunk_size):
+        db.execute(ExtractionRollup.__table__.insert(), values[start:start + chunk_size])
+    db.commit()
+    stats_cache.clear()
+    return len(values)
+
+# ============== Extraction Cache CRUD ==============
+
+def get_cache_entry(
+    db: Session,
+    content_sha256: str,
+    model_name: str,
+    prompt_version: str,
+    pipeline: str = "",
+    created_after: Optional[datetime] = None
+) -> Optional[ExtractionCacheEntry]:
+    """Get a cached model result, ignoring entries older than created_after"""
+    query = db.query(ExtractionCacheEntry).filter(
+        ExtractionCacheEntry.content_sha256 == content_sha256,
+        ExtractionCacheEntry.model_name == model_name,
+        ExtractionCacheEntry.prompt_version == prompt_version,
+        ExtractionCacheEntry.pipeline == pipeline
+    )
+    if created_after:
+        query = query.filter(ExtractionCacheEntry.created_at >= created_after)
+    return query.first()
+
+def record_cache_hit(db: Session, entry: ExtractionCacheEntry) -> None:
+    """Bump hit counters on a cache entry"""
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_hit_at = datetime.utcnow()
+    db.commit()
+
+def upsert_cache_entry(db: Session, content_sha256: str, model_name: str, prompt_version: str, result: dict, pipeline: str = "") -> None:
+    """Insert or refresh a cached model result"""
+    entry = get_cache_entry(db, content_sha256, model_name, prompt_version, pipeline)
+    if entry:
+        entry.result_json = result
+        entry.created_at = datetime.utcnow()
+    else:
+        db.add(ExtractionCacheEntry(
+            content_sha256=content_sha256,
+            model_name=model_name,
+            prompt_version=prompt_version,
+            pipeline=pipeline,
+            result_json=result,
+            hit_count=0,
+            created_at=datetime.utcnow()
+        ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same key first
+        db.rollback()
+
+def delete_expired_cache_entries(db: Session, created_before: datetime) -> int:
+    """Delete cache entries older than created_before, returns rows deleted"""
+    deleted = db.query(ExtractionCacheEntry).filter(
+        ExtractionCacheEntry.created_at < created_before
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+# ============== Extraction Job Queue CRUD ==============
+
+def create_job(db: Session, job_data: dict) -> ExtractionJob:
+    """Queue a new extraction job"""
+    now = datetime.utcnow()
+    db_job = ExtractionJob(status="queued", attempts=0, created_at=now, available_at=now, **job_data)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: str, user_id: int = None, role: str = "user") -> Optional[ExtractionJob]:
+    """Get job by job_id with RBAC"""
+    query = db.query(ExtractionJob).filter(ExtractionJob.job_id == job_id)
+    if role != "admin" and user_id:
+        query = query.filter(ExtractionJob.user_id == user_id)
+    return query.first()
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[ExtractionJob]:
+    """
+    Atomically move the oldest available queued job to 'processing'.
+    The conditional UPDATE makes this safe across workers and processes.
+    """
+    now = datetime.utcnow()
+    candidate_ids = [row.id for row in db.query(ExtractionJob.id).filter(
+        ExtractionJob.status == "queued",
+        ExtractionJob.available_at <= now
+    ).order_by(ExtractionJob.available_at, ExtractionJob.id).limit(5).all()]
+
+    for job_id in candidate_ids:
+        claimed = db.query(ExtractionJob).filter(
+            ExtractionJob.id == job_id,
+            ExtractionJob.status == "queued"
+        ).update({
+            ExtractionJob.status: "processing",
+            ExtractionJob.worker_id: worker_id,
+            ExtractionJob.started_at: now,
+            ExtractionJob.attempts: ExtractionJob.attempts + 1
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+    return None
+
+def complete_job(db: Session, job_id: str, extraction_data: dict) -> Extraction:
+    """
+    Store a job's extraction, mark the job completed and drop its payload, in one
+    transaction: a crash in between cannot leave the extraction stored while the
+    job is requeued (and extracted and stored again)
+    """
+    db_extraction = add_extraction(db, extraction_data)
+    db.query(ExtractionJob).filter(ExtractionJob.job_id == job_id).update({
+        ExtractionJob.status: "completed",
+        ExtractionJob.request_id: db_extraction.request_id,
+        ExtractionJob.error: None,
+        ExtractionJob.payload: None,
+        ExtractionJob.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    stats_cache.invalidate(db_extraction.user_id)
+    return db_extraction
+
+def fail_job(db: Session, job_id: str, error: str) -> None:
+    """Mark a job permanently failed and drop its payload"""
+    db.query(ExtractionJob).filter(ExtractionJob.job_id == job_id).update({
+        ExtractionJob.status: "failed",
+        ExtractionJob.error: error,
+        ExtractionJob.payload: None,
+        ExtractionJob.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+def requeue_job(db: Session, job_id: str, error: str, delay_seconds: float = 0) -> None:
+    """Put a job back on the queue after a retryable failure"""
+    db.query(ExtractionJob).filter(ExtractionJob.job_id == job_id).update({
+        ExtractionJob.status: "queued",
+        ExtractionJob.error: error,
+        ExtractionJob.worker_id: None,
+        ExtractionJob.available_at: datetime.utcnow() + timedelta(seconds=delay_seconds)
+    }, synchronize_session=False)
+    db.commit()
+
+def requeue_stale_jobs(db: Session, started_before: datetime) -> int:
+    """Requeue jobs stuck in 'processing' (e.g. worker crashed), returns rows updated"""
+    updated = db.query(ExtractionJob).filter(
+        ExtractionJob.status == "processing",
+        ExtractionJob.started_at < started_before
+    ).update({
+        ExtractionJob.status: "queued",
+        ExtractionJob.worker_id: None,
+        ExtractionJob.available_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return updated
+
 # ============== User Management CRUD ==============
 
 def get_user_by_id(db: Session, user_id: int):
@@ -93,6 +419,8 @@ def update_user(db: Session, user_id: int, update_data: dict):
             setattr(user, key, value)
     
     db.commit()
+    # Active user count on the admin dashboard
+    stats_cache.invalidate()
     db.refresh(user)
     return user
 
@@ -104,6 +432,7 @@ def deactivate_user(db: Session, user_id: int):
     
     user.is_active = False
     db.commit()
+    stats_cache.invalidate()
     db.refresh(user)
     return user
 
@@ -115,6 +444,7 @@ def activate_user(db: Session, user_id: int):
     
     user.is_active = True
     db.commit()
+    stats_cache.invalidate()
     db.refresh(user)
     return user
 
@@ -129,48 +459,63 @@ def update_user_password(db: Session, user_id: int, hashed_password: str):
     db.refresh(user)
     return user
 
+DASHBOARD_TREND_DAYS = 7
+
 def get_dashboard_stats(db: Session, user_id: int = None, role: str = "user"):
     """
     Calculate dashboard statistics:
     - Summary cards (Total, Success Rate, Avg Confidence, Pending)
     - Daily volume trend (Last 7 days)
     - Quality distribution
+    Read from the rollups: the lifetime rows for the totals and grades, and
+    the hourly rows of the trend window, so the cost does not grow with the
+    number of extractions.
     """
-    from kyc_extractor.db.models import Extraction, User
+    from kyc_extractor.db.models import User
     
-    # Base query
-    query = db.query(Extraction)
+    rollups = db.query(ExtractionRollup)
     if role != "admin" and user_id:
-        query = query.filter(Extraction.user_id == user_id)
+        rollups = rollups.filter(ExtractionRollup.user_id == user_id)
     
-    # Define quality grade expression (aligned with scoring.py)
-    quality_grade_expr = case(
-        (Extraction.data_quality_score >= 90, 'A'),
-        (Extraction.data_quality_score >= 75, 'B'),
-        (Extraction.data_quality_score >= 60, 'C'),
-        (Extraction.data_quality_score >= 40, 'D'),
-        else_='F'
-    )
+    grade_columns = [ExtractionRollup.grade_a, ExtractionRollup.grade_b, ExtractionRollup.grade_c, ExtractionRollup.grade_d, ExtractionRollup.grade_f]
+    totals = rollups.filter(ExtractionRollup.hour == ROLLUP_ALL_TIME).with_entities(
+        func.sum(ExtractionRollup.documents).label('documents'),
+        func.sum(ExtractionRollup.confidence_sum).label('confidence_sum'),
+        func.sum(ExtractionRollup.confidence_count).label('confidence_count'),
+        func.sum(ExtractionRollup.unscored).label('unscored'),
+        *[func.sum(column).label(column.key) for column in grade_columns]
+    ).one()
+    
+    today = datetime.utcnow().date()
+    first_day = today - timedelta(days=DASHBOARD_TREND_DAYS - 1)
+    day_starts = [datetime.combine(first_day + timedelta(days=i), datetime.min.time()) for i in range(DASHBOARD_TREND_DAYS + 1)]
+    trend = rollups.with_entities(*[
+        func.sum(case((ExtractionRollup.hour < day_starts[i + 1], ExtractionRollup.documents), else_=0)).label(f"day_{i}")
+        for i in range(DASHBOARD_TREND_DAYS)
+    ]).filter(
+        ExtractionRollup.hour >= day_starts[0],
+        ExtractionRollup.hour < day_starts[-1]
+    ).one()
+    # Cumulative "before the end of day i" counts -> per-day counts
+    cumulative = [int(getattr(trend, f"day_{i}") or 0) for i in range(DASHBOARD_TREND_DAYS)]
+    day_counts = [count - previous for count, previous in zip(cumulative, [0] + cumulative[:-1])]
+    
+    grade_counts = {column.key[-1].upper(): int(getattr(totals, column.key) or 0) for column in grade_columns}
     
     # 1. Summary Metrics
-    total_count = query.count()
+    total_count = int(totals.documents or 0)
     
     # Success Rate (Grade A or B -> Score >= 75)
-    success_count = query.filter(Extraction.data_quality_score >= 75).count()
+    success_count = grade_counts['A'] + grade_counts['B']
     success_rate = (success_count / total_count * 100) if total_count > 0 else 0
     
-    # Avg Confidence
-    avg_confidence = query.with_entities(func.avg(Extraction.confidence)).scalar() or 0.0
+    avg_confidence = (totals.confidence_sum / totals.confidence_count) if totals.confidence_count else 0.0
     
-    # Pending Reviews (Grade C, D, or F -> Score < 75)
-    pending_count = query.filter(Extraction.data_quality_score < 75).count()
+    # Pending Reviews (Grade C, D or F -> Score < 75)
+    pending_count = grade_counts['C'] + grade_counts['D'] + grade_counts['F']
     
     # Today's Volume & Trend
-    today = datetime.utcnow().date()
-    yesterday = today - timedelta(days=1)
-    
-    today_count = query.filter(func.date(Extraction.uploaded_at) == today).count()
-    yesterday_count = query.filter(func.date(Extraction.uploaded_at) == yesterday).count()
+    today_count, yesterday_count = day_counts[-1], day_counts[-2]
     
     volume_trend = 0
     if yesterday_count > 0:
@@ -184,44 +529,22 @@ def get_dashboard_stats(db: Session, user_id: int = None, role: str = "user"):
         active_users_count = db.query(User).filter(User.is_active == True).count()
         
     # 2. Charts Data
+    daily_trend = [
+        {"date": (first_day + timedelta(days=i)).strftime("%b %d"), "count": count}  # e.g. "Nov 30"
+        for i, count in enumerate(day_counts)
+    ]
     
-    # Daily Trend (Last 7 days)
-    seven_days_ago = today - timedelta(days=6)
-    daily_stats = query.with_entities(
-        func.date(Extraction.uploaded_at).label('date'),
-        func.count(Extraction.id).label('count')
-    ).filter(
-        func.date(Extraction.uploaded_at) >= seven_days_ago
-    ).group_by(
-        func.date(Extraction.uploaded_at)
-    ).all()
-    
-    # Fill missing days
-    daily_trend = []
-    stats_map = {str(s.date): s.count for s in daily_stats}
-    
-    for i in range(7):
-        d = seven_days_ago + timedelta(days=i)
-        d_str = str(d)
-        daily_trend.append({
-            "date": d.strftime("%b %d"), # e.g. "Nov 30"
-            "count": stats_map.get(d_str, 0)
-        })
-        
-    # Quality Distribution
-    quality_stats = query.with_entities(
-        quality_grade_expr.label('grade'),
-        func.count(Extraction.id)
-    ).group_by(
-        quality_grade_expr
-    ).all()
-    
+    # Quality Distribution (grades with at least one document; unscored ones are shown as F)
+    grade_counts['F'] += int(totals.unscored or 0)
     quality_distribution = [
-        {"name": f"Grade {s[0]}", "value": s[1]} for s in quality_stats if s[0]
+        {"name": f"Grade {grade}", "value": count} for grade, count in grade_counts.items() if count
     ]
     
     # 3. Recent Activity (Last 5)
-    recent_activity = query.order_by(desc(Extraction.uploaded_at)).limit(5).all()
+    recent = db.query(Extraction)
+    if role != "admin" and user_id:
+        recent = recent.filter(Extraction.user_id == user_id)
+    recent_activity = recent.order_by(desc(Extraction.uploaded_at)).limit(5).all()
     
     return {
         "summary": {
@@ -242,12 +565,12 @@ def get_dashboard_stats(db: Session, user_id: int = None, role: str = "user"):
 
 def get_avg_processing_time(db: Session, user_id: int = None, role: str = "user", limit: int = 7):
     """
-    Get average processing time from recent successful extractions
+    Get average processing time of the last `limit` extractions with a processing time
     Returns time in milliseconds
     """
     from kyc_extractor.db.models import Extraction
     
-    query = db.query(Extraction).filter(
+    query = db.query(Extraction.processing_time_ms).filter(
         Extraction.processing_time_ms.isnot(None),
         Extraction.processing_time_ms > 0
     )
@@ -256,11 +579,70 @@ def get_avg_processing_time(db: Session, user_id: int = None, role: str = "user"
     if role != "admin" and user_id:
         query = query.filter(Extraction.user_id == user_id)
     
-    # Get last N extractions
+    # Last N extractions: read backwards along the (user_id,) uploaded_at index, stops after N rows
     recent = query.order_by(desc(Extraction.uploaded_at)).limit(limit).all()
     
     if not recent:
         return 3000  # Default 3 seconds
     
-    avg_time = sum(e.processing_time_ms for e in recent) / len(recent)
-    return int(avg_time)
+    return int(sum(row.processing_time_ms for row in recent) / len(recent))
+
+def get_usage_stats(db: Session, user_id: int = None, role: str = "user", days: int = 30):
+    """
+    Gemini usage and cost of extractions uploaded in the last `days` days,
+    in total and grouped per user, per document type and per day.
+    Non-admins only see their own extractions.
+    """
+    from kyc_extractor.db.models import Extraction, User
+    
+    metrics = [
+        func.count(Extraction.id).label('documents'),
+        func.sum(case((Extraction.model_name.isnot(None), 1), else_=0)).label('model_documents'),
+        func.sum(Extraction.prompt_tokens).label('prompt_tokens'),
+        func.sum(Extraction.output_tokens).label('output_tokens'),
+        func.sum(Extraction.payload_bytes).label('payload_bytes'),
+        func.sum(Extraction.retry_count).label('retries'),
+        func.sum(Extraction.cost_usd).label('cost_usd'),
+        # Over documents that called the model; cache hits and local text-layer results would skew it
+        func.avg(case((Extraction.model_name.isnot(None), Extraction.upstream_latency_ms))).label('avg_upstream_latency_ms'),
+    ]
+    
+    def grouped(*keys):
+        query = db.query(*keys, *metrics).filter(
+            Extraction.uploaded_at >= datetime.utcnow() - timedelta(days=days)
+        )
+        if role != "admin" and user_id:
+            query = query.filter(Extraction.user_id == user_id)
+        return query
+    
+    def to_dict(row, **keys) -> dict:
+        return {
+            **keys,
+            "documents": row.documents,
+            "model_documents": int(row.model_documents or 0),
+            "prompt_tokens": int(row.prompt_tokens or 0),
+            "output_tokens": int(row.output_tokens or 0),
+            "payload_bytes": int(row.payload_bytes or 0),
+            "retries": int(row.retries or 0),
+            "cost_usd": round(row.cost_usd or 0.0, 6),
+            "avg_upstream_latency_ms": round(row.avg_upstream_latency_ms) if row.avg_upstream_latency_ms is not None else None,
+        }
+    
+    totals = grouped().one()
+    
+    day = func.date(Extraction.uploaded_at)
+    by_user = grouped(Extraction.user_id, User.email).outerjoin(
+        User, User.id == Extraction.user_id
+    ).group_by(Extraction.user_id, User.email).order_by(desc('cost_usd')).all()
+    by_document_type = grouped(Extraction.document_type).group_by(
+        Extraction.document_type
+    ).order_by(desc('cost_usd')).all()
+    by_day = grouped(day.label('date')).group_by(day).order_by(day).all()
+    
+    return {
+        "days": days,
+        "totals": to_dict(totals),
+        "by_user": [to_dict(row, user_id=row.user_id, email=row.email) for row in by_user],
+        "by_document_type": [to_dict(row, document_type=row.document_type or "OTHER") for row in by_document_type],
+        "by_day": [to_dict(row, date=str(row.date)) for row in by_day],
+    }
@@ -7,18 +7,25 @@ from urllib.parse import quote_plus
 # URL-encode password to handle special characters like @, #, /, etc.
 encoded_password = quote_plus(settings.MYSQL_PASSWORD)
 
-# Create database URL
-SQLALCHEMY_DATABASE_URL = (
+# Create database URL (DATABASE_URL overrides MySQL settings, e.g. sqlite:///./kyc.db)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or (
     f"mysql+pymysql://{settings.MYSQL_USER}:{encoded_password}"
     f"@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
 )
 
 # Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,   # Recycle connections after 1 hour
-)
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # Sessions are handed to threadpool workers
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+    )
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_pre_ping=True,  # Verify connections before using
+        pool_recycle=3600,   # Recycle connections after 1 hour
+    )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
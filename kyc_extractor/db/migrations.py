@@ -0,0 +1,155 @@
+"""
+Versioned schema migrations for MySQL and SQLite.
+
+Each migration is a numbered function that gets a connection; applied
+versions are recorded in the schema_migrations table and run_migrations()
+applies the pending ones in order. Migrations go through the SQLAlchemy
+inspector instead of dialect-specific SQL (SHOW COLUMNS, ALTER ... AFTER),
+and every step checks first, so a migration is safe to re-run: MySQL commits
+DDL implicitly, so one that failed half-way is simply run again, and
+databases built by Base.metadata.create_all or the old one-off scripts are
+brought under version control without changes.
+
+Schema changes to db/models.py need a new migration at the end of MIGRATIONS.
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from kyc_extractor.db.database import Base
+from kyc_extractor.db import models  # noqa: F401 (registers tables)
+
+version_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+# Idempotent steps, resolved against the tables declared in db/models.py
+
+def create_table(connection: Connection, table_name: str) -> None:
+    table = Base.metadata.tables[table_name]
+    if not inspect(connection).has_table(table_name):
+        print(f"➕ Creating table '{table_name}'...")
+        table.create(bind=connection)
+
+def add_column(connection: Connection, table_name: str, column_name: str) -> bool:
+    """Adds a nullable column as declared in the model; returns False if it already exists"""
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    if column_name in existing:
+        return False
+    column = Base.metadata.tables[table_name].c[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    print(f"➕ Adding '{table_name}.{column_name}' ({column_type})...")
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+    return True
+
+def create_index(connection: Connection, table_name: str, index_name: str) -> None:
+    index = next(index for index in Base.metadata.tables[table_name].indexes if index.name == index_name)
+    existing = {index["name"] for index in inspect(connection).get_indexes(table_name)}
+    if index_name not in existing:
+        print(f"➕ Creating index '{index_name}' on {table_name} ({', '.join(column.name for column in index.columns)})...")
+        index.create(bind=connection)
+
+# Migrations
+
+def _initial_tables(connection: Connection) -> None:
+    create_table(connection, "users")
+    create_table(connection, "extractions")
+
+def _users_last_login(connection: Connection) -> None:
+    add_column(connection, "users", "last_login")
+
+def _extractions_user_id(connection: Connection) -> None:
+    if add_column(connection, "extractions", "user_id") and connection.dialect.name != "sqlite":
+        # SQLite cannot add constraints to an existing table
+        connection.execute(text("ALTER TABLE extractions ADD CONSTRAINT fk_user_id FOREIGN KEY (user_id) REFERENCES users(id)"))
+
+def _extraction_cache(connection: Connection) -> None:
+    create_table(connection, "extraction_cache")
+
+def _extraction_jobs(connection: Connection) -> None:
+    create_table(connection, "extraction_jobs")
+
+def _extraction_pipeline_columns(connection: Connection) -> None:
+    for column_name in ("pages_dropped", "image_quality", "extraction_path", "model_tier", "escalation_reason"):
+        add_column(connection, "extractions", column_name)
+
+def _extraction_usage_columns(connection: Connection) -> None:
+    for column_name in ("model_name", "prompt_tokens", "output_tokens", "payload_bytes", "upstream_latency_ms", "retry_count", "cost_usd"):
+        add_column(connection, "extractions", column_name)
+
+def _history_index(connection: Connection) -> None:
+    create_index(connection, "extractions", "ix_extractions_uploaded_at_id")
+
+def _user_and_type_indexes(connection: Connection) -> None:
+    create_index(connection, "extractions", "ix_extractions_user_id_uploaded_at")
+    create_index(connection, "extractions", "ix_extractions_document_type_uploaded_at")
+
+def _extraction_rollups(connection: Connection) -> None:
+    from kyc_extractor.db.crud import rebuild_rollups
+    create_table(connection, "extraction_rollups")
+    print("🔄 Backfilling extraction_rollups from extractions...")
+    # Joins the migration's transaction
+    rebuild_rollups(Session(bind=connection))
+
+def _extraction_cache_pipeline_key(connection: Connection) -> None:
+    # The unique key gains a column; the table only holds cached model
+    # results, so it is recreated instead of rebuilt in place
+    inspector = inspect(connection)
+    if inspector.has_table("extraction_cache"):
+        if "pipeline" in {column["name"] for column in inspector.get_columns("extraction_cache")}:
+            return
+        print("🔄 Recreating 'extraction_cache' with the pipeline key (cached results are dropped)...")
+        Base.metadata.tables["extraction_cache"].drop(bind=connection)
+    create_table(connection, "extraction_cache")
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_tables", _initial_tables),
+    Migration(2, "users_last_login", _users_last_login),
+    Migration(3, "extractions_user_id", _extractions_user_id),
+    Migration(4, "extraction_cache", _extraction_cache),
+    Migration(5, "extraction_jobs", _extraction_jobs),
+    Migration(6, "extraction_pipeline_columns", _extraction_pipeline_columns),
+    Migration(7, "extraction_usage_columns", _extraction_usage_columns),
+    Migration(8, "history_index", _history_index),
+    Migration(9, "user_and_type_indexes", _user_and_type_indexes),
+    Migration(10, "extraction_rollups", _extraction_rollups),
+    Migration(11, "extraction_cache_pipeline_key", _extraction_cache_pipeline_key),
+]
+
+def applied_versions(engine: Engine) -> set:
+    with engine.begin() as connection:
+        schema_migrations.create(bind=connection, checkfirst=True)
+        return {row.version for row in connection.execute(schema_migrations.select())}
+
+def pending_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [
+        migration for migration in MIGRATIONS
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """Applies pending migrations up to `target` (default: all) in order; returns the ones applied"""
+    applied = []
+    for migration in pending_migrations(engine, target):
+        print(f"🔄 Applying migration {migration.version}: {migration.name}...")
+        # One transaction per migration, so a failure leaves earlier ones recorded
+        with engine.begin() as connection:
+            migration.apply(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+            ))
+        applied.append(migration)
+    return applied
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, JSON, Float, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from kyc_extractor.db.database import Base
+from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
@@ -19,6 +21,14 @@ class User(Base):
 
 class Extraction(Base):
     __tablename__ = "extractions"
+    __table_args__ = (
+        # /history order and keyset cursor
+        Index("ix_extractions_uploaded_at_id", "uploaded_at", "id"),
+        # Per-user history and stats (non-admins always filter on user_id)
+        Index("ix_extractions_user_id_uploaded_at", "user_id", "uploaded_at"),
+        # History filtered by document type
+        Index("ix_extractions_document_type_uploaded_at", "document_type", "uploaded_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     request_id = Column(String(36), unique=True, index=True, nullable=False)
@@ -43,6 +53,19 @@ class Extraction(Base):
     validation_results = Column(JSON)
     
     processing_time_ms = Column(Integer)
+    pages_dropped = Column(Integer, nullable=True)  # Blank/duplicate PDF pages not sent to the model
+    image_quality = Column(JSON, nullable=True)  # Pre-flight quality gate metrics (services/quality.py)
+    extraction_path = Column(String(20), nullable=True)  # image | text_prompt | text_local | cache
+    model_tier = Column(String(10), nullable=True)  # Cascade tier that answered: fast | strong (NULL without a model call)
+    escalation_reason = Column(String(30), nullable=True)  # Why the fast tier was overruled: low_confidence | invalid_id | invalid_response
+    # Gemini usage summed over every call made for the document (classification, cascade tiers, retries); 0 for cache hits
+    model_name = Column(String(50), nullable=True)  # Model of the final extraction call (NULL without a model call)
+    prompt_tokens = Column(Integer, nullable=True)
+    output_tokens = Column(Integer, nullable=True)
+    payload_bytes = Column(Integer, nullable=True)  # Image/text bytes sent, per attempt
+    upstream_latency_ms = Column(Integer, nullable=True)  # Time spent in model calls, including retry backoff
+    retry_count = Column(Integer, nullable=True)
+    cost_usd = Column(Float, nullable=True)  # From the GEMINI_*_PRICE settings at the time of the call
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="extractions")
@@ -50,3 +73,105 @@ class Extraction(Base):
     
     def __repr__(self):
         return f"<Extraction(id={self.id}, request_id={self.request_id}, company={self.company_name})>"
+
+# ExtractionRollup.hour of the lifetime totals rows
+ROLLUP_ALL_TIME = datetime(1970, 1, 1)
+
+class ExtractionRollup(Base):
+    """
+    Extraction statistics per (user, document type, hour), kept up to date by
+    crud.create_extraction in the same transaction and rebuilt from
+    extractions by crud.rebuild_rollups. Rows with hour == ROLLUP_ALL_TIME
+    hold lifetime totals, so all-time figures never have to sum the hours.
+    """
+    __tablename__ = "extraction_rollups"
+    __table_args__ = (
+        # Upsert key; also serves per-user hour ranges
+        Index("ux_extraction_rollups_user_hour_type", "user_id", "hour", "document_type", unique=True),
+        # All-user (admin) hour ranges
+        Index("ix_extraction_rollups_hour", "hour"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # 0 for extractions without a user, "OTHER" without a document type: NULLs would defeat the unique key
+    user_id = Column(Integer, nullable=False)
+    document_type = Column(String(50), nullable=False)
+    hour = Column(DateTime, nullable=False)  # Start of the hour, as stored in extractions.uploaded_at
+    
+    documents = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    # Quality grade histogram (validators/scoring.py); unscored documents count as F on the dashboard
+    grade_a = Column(Integer, nullable=False, default=0)
+    grade_b = Column(Integer, nullable=False, default=0)
+    grade_c = Column(Integer, nullable=False, default=0)
+    grade_d = Column(Integer, nullable=False, default=0)
+    grade_f = Column(Integer, nullable=False, default=0)
+    unscored = Column(Integer, nullable=False, default=0)
+    # Documents with a processing time, its sum and histogram
+    processing_count = Column(Integer, nullable=False, default=0)
+    processing_ms_sum = Column(BigInteger, nullable=False, default=0)
+    processing_under_1s = Column(Integer, nullable=False, default=0)
+    processing_under_2s = Column(Integer, nullable=False, default=0)
+    processing_under_5s = Column(Integer, nullable=False, default=0)
+    processing_under_10s = Column(Integer, nullable=False, default=0)
+    processing_under_30s = Column(Integer, nullable=False, default=0)
+    processing_30s_plus = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ExtractionRollup(user_id={self.user_id}, document_type={self.document_type}, hour={self.hour}, documents={self.documents})>"
+
+class ExtractionCacheEntry(Base):
+    """Persistent tier of the extraction result cache (see services/cache.py)"""
+    __tablename__ = "extraction_cache"
+    __table_args__ = (
+        UniqueConstraint("content_sha256", "model_name", "prompt_version", "pipeline", name="uq_extraction_cache_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    model_name = Column(String(50), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    # Fingerprint of the other settings that shape the result (cascade, classify-first, JSON mode)
+    pipeline = Column(String(16), nullable=False, default="")
+    
+    # Raw model output, before normalization/validation
+    result_json = Column(JSON, nullable=False)
+    
+    hit_count = Column(Integer, default=0)
+    # Indexed for purging expired entries
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<ExtractionCacheEntry(sha256={self.content_sha256[:12]}, model={self.model_name}, prompt={self.prompt_version}, pipeline={self.pipeline})>"
+
+class ExtractionJob(Base):
+    """Queued asynchronous extraction (POST /jobs), processed by services/jobs.py workers"""
+    __tablename__ = "extraction_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(36), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
+    filename = Column(String(255))
+    file_size_bytes = Column(Integer)
+    # Uploaded document, cleared once the job finishes
+    payload = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True)
+    use_cache = Column(Boolean, default=True)
+    
+    # queued -> processing -> completed | failed
+    status = Column(String(20), default="queued", index=True)
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    worker_id = Column(String(64), nullable=True)
+    # Extraction produced by this job
+    request_id = Column(String(36), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True))
+    available_at = Column(DateTime(timezone=True), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<ExtractionJob(job_id={self.job_id}, status={self.status}, attempts={self.attempts})>"
@@ -1,28 +1,78 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from starlette.formparsers import MultiPartParser
 from kyc_extractor.schemas import ExtractionResponse, HistoryResponse, BatchExtractionResponse
-from kyc_extractor.services.image_processor import image_processor
-from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.services.extraction import extract_document_data, build_extraction_record, ExtractionError, UpstreamUnavailableError
+from kyc_extractor.core.config import settings
 from kyc_extractor.db.database import get_db
 from kyc_extractor.db import crud
 from kyc_extractor.db.models import User
-from kyc_extractor.validators import validate_extraction, calculate_data_quality_score, get_quality_grade
+from kyc_extractor.validators import get_quality_grade
 from kyc_extractor.api.auth import router as auth_router
 from kyc_extractor.api.stats import router as stats_router
+from kyc_extractor.api.jobs import router as jobs_router
+from kyc_extractor.services.jobs import job_worker_pool
+from kyc_extractor.services.uploads import read_upload, UploadTooLargeError, BodySizeLimitMiddleware
+from kyc_extractor.services.image_processor import image_processor
+from kyc_extractor.services.cache import extraction_cache
+from kyc_extractor.services.quality import QualityRejectedError
 from kyc_extractor.api.deps import get_current_user, get_current_active_user
 from sqlalchemy.orm import Session
+import asyncio
 import time
 import uuid
-from datetime import datetime, timezone, timedelta
 from typing import Optional, List
 
 app = FastAPI(title="Company Name Cleaning (CC) API", version="0.3.0")
 
-# IST Timezone (UTC+5:30)
-IST = timezone(timedelta(hours=5, minutes=30))
-
 # Include Auth Router
 app.include_router(auth_router, tags=["Authentication"])
 app.include_router(stats_router, prefix="/stats", tags=["Statistics"])
+app.include_router(jobs_router, tags=["Jobs"])
+
+# Multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Starlette spools each multipart file in memory up to this size, then in a temp file
+MultiPartParser.spool_max_size = settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES
+
+def upload_body_limit(path: str) -> int:
+    """Request body cap for POSTs to `path` (0: none); per-file sizes are enforced by read_upload"""
+    if path == "/extract/batch":
+        return settings.MAX_BATCH_UPLOAD_BYTES
+    if path in ("/extract", "/jobs") and settings.MAX_UPLOAD_BYTES:
+        return settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    return 0
+
+app.add_middleware(BodySizeLimitMiddleware, limit_for=upload_body_limit)
+
+@app.on_event("startup")
+async def start_job_workers():
+    if settings.JOB_WORKERS > 0:
+        await job_worker_pool.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_worker_pool.stop()
+    image_processor.shutdown()
+
+_cache_purge_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_cache_purge():
+    global _cache_purge_task
+    if extraction_cache.enabled and extraction_cache.persistent and settings.EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS > 0:
+        _cache_purge_task = asyncio.create_task(
+            extraction_cache.purge_periodically(settings.EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS)
+        )
+
+@app.on_event("shutdown")
+async def stop_cache_purge():
+    global _cache_purge_task
+    if _cache_purge_task is not None:
+        _cache_purge_task.cancel()
+        await asyncio.gather(_cache_purge_task, return_exceptions=True)
+        _cache_purge_task = None
 
 @app.get("/")
 def read_root():
@@ -35,6 +85,7 @@ def health_check():
 @app.post("/extract", response_model=ExtractionResponse)
 async def extract_document(
     file: UploadFile = File(...), 
+    use_cache: bool = Query(True, description="Set to false to bypass the extraction result cache"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -47,97 +98,39 @@ async def extract_document(
 
     start_time = time.time()
     request_id = str(uuid.uuid4())
+    upload = None
     
     try:
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-        
-        # Process Image (Convert PDF -> Img / Load Img)
-        image = image_processor.process_file(content, file.filename)
-        
-        # Extract Data using Gemini
-        result = gemini_client.extract_data(image)
-        
-        if "error" in result:
-             raise HTTPException(status_code=500, detail=f"Extraction failed: {result['error']}")
-
-        # Run validation
-        # Normalize document type
-        raw_doc_type = result.get('document_type', 'OTHER')
-        
-        # DEBUG LOGGING
-        with open("debug_doc_type.log", "a") as f:
-            f.write(f"File: {file.filename}, Raw Type: '{raw_doc_type}'\n")
-            
-        document_type = raw_doc_type
-        
-        # Map common variations to schema-allowed values
-        if raw_doc_type in ["MSME Certificate", "MSME_CERTIFICATE", "MSME_Certificate", "UDYAM", "UDYAM_REGISTRATION", "Udyam Registration Certificate", "Udyam Registration"]:
-            document_type = "MSME"
-        elif raw_doc_type in ["GST Certificate", "GST_REGISTRATION"]:
-            document_type = "GST_CERTIFICATE"
-        elif raw_doc_type in ["PAN Card", "PAN_CARD"]:
-            document_type = "PAN_CARD"
-            
-        # Update result object with normalized type
-        result['document_type'] = document_type
-
-        identification_number = result.get('data', {}).get('identification_number')
-        address = result.get('data', {}).get('address', {})
-        pincode = address.get('pincode') if isinstance(address, dict) else None
-        
-        validation_results = validate_extraction(
-            document_type=document_type,
-            identification_number=identification_number,
-            pincode=pincode
-        )
+        # Stream the upload (hashed and size-checked as it is read)
+        upload = await read_upload(file)
+        file_size = upload.size
         
-        # Calculate quality score
-        confidence = result.get('confidence', 0.0)
-        data_quality_score = calculate_data_quality_score(
-            extracted_data=result.get('data', {}),
-            validation_results=validation_results,
-            confidence=confidence
-        )
-        quality_grade = get_quality_grade(data_quality_score)
+        # Process -> Extract -> Validate -> Score
+        result = await extract_document_data(upload.source, file.filename, use_cache=use_cache, content_sha256=upload.sha256)
         
         # Calculate processing time
         processing_time_ms = int((time.time() - start_time) * 1000)
         
-            # Save to database
-        db_data = {
-            "request_id": request_id,
-            "user_id": current_user.id,
-            "filename": file.filename,
-            "file_size_bytes": file_size,
-            "document_type": document_type,
-            "company_name": result.get('data', {}).get('company_name'),
-            "trade_name": result.get('data', {}).get('trade_name'),
-            "identification_number": identification_number,
-            "address_json": address,
-            "issue_date": result.get('data', {}).get('issue_date'),
-            "approver_name": result.get('data', {}).get('approver_name'),
-            "confidence": confidence,
-            "confidence_reason": result.get('confidence_reason'),
-            "data_quality_score": data_quality_score,
-            "validation_results": validation_results,
-            "processing_time_ms": processing_time_ms,
-            "uploaded_at": datetime.now(IST),
-        }
-        
-        db_extraction = crud.create_extraction(db, db_data)
+        # Save to database
+        db_data = build_extraction_record(result, request_id, current_user.id, file.filename, file_size, processing_time_ms)
+        db_extraction = await run_in_threadpool(crud.create_extraction, db, db_data)
         
         # Prepare response
         result['request_id'] = request_id
-        result['validation_results'] = validation_results
-        result['data_quality_score'] = data_quality_score
-        result['quality_grade'] = quality_grade
         result['processing_time_ms'] = processing_time_ms
         result['uploaded_at'] = db_extraction.uploaded_at
 
         return result
 
+    except UpstreamUnavailableError as e:
+        headers = {"Retry-After": str(int(e.retry_after or 30))}
+        raise HTTPException(status_code=503, detail=f"Extraction service temporarily unavailable: {str(e)}", headers=headers)
+    except ExtractionError as e:
+        raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QualityRejectedError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "image_quality": e.report})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -150,130 +143,75 @@ async def extract_document(
             
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
     finally:
+        if upload:
+            upload.close()
         await file.close()
 
 @app.post("/extract/batch", response_model=BatchExtractionResponse)
 async def extract_batch(
     files: List[UploadFile] = File(...), 
+    use_cache: bool = Query(True, description="Set to false to bypass the extraction result cache"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Extracts details from multiple documents in a single request.
+    Files are processed concurrently (up to BATCH_CONCURRENCY at a time);
+    results and errors keep the upload order. With PACKING_ENABLED, small
+    single-page documents share model calls.
     Protected: Requires valid JWT token.
     """
-    MAX_BATCH_SIZE = 10
-    if len(files) > MAX_BATCH_SIZE:
-        raise HTTPException(status_code=400, detail=f"Batch size exceeds limit of {MAX_BATCH_SIZE} files")
+    if len(files) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch size exceeds limit of {settings.MAX_BATCH_SIZE} files")
 
-    results = []
-    errors = []
-    
-    for file in files:
-        try:
-            # Reuse the logic from extract_document (refactored for reusability would be better, but keeping it simple for now)
-            # We need to process each file sequentially
-            
-            if not file.filename:
-                errors.append({"filename": "unknown", "error": "Filename missing"})
-                continue
-                
-            start_time = time.time()
-            request_id = str(uuid.uuid4())
-            
-            # Read file content
-            content = await file.read()
-            file_size = len(content)
-            
-            # Process Image
-            image = image_processor.process_file(content, file.filename)
-            
-            # Extract Data
-            result = gemini_client.extract_data(image)
-            
-            if "error" in result:
-                errors.append({"filename": file.filename, "error": result['error']})
-                continue
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    # The request's DB session is shared, so inserts are serialized
+    db_lock = asyncio.Lock()
 
-            # Validation
-            # Normalize document type
-            raw_doc_type = result.get('document_type', 'OTHER')
-            
-            # DEBUG LOGGING
-            with open("debug_doc_type.log", "a") as f:
-                f.write(f"File: {file.filename}, Raw Type: '{raw_doc_type}'\n")
-            
-            document_type = raw_doc_type
-            
-            # Map common variations to schema-allowed values
-            if raw_doc_type in ["MSME Certificate", "MSME_CERTIFICATE", "MSME_Certificate", "UDYAM", "UDYAM_REGISTRATION", "Udyam Registration Certificate", "Udyam Registration"]:
-                document_type = "MSME"
-            elif raw_doc_type in ["GST Certificate", "GST_REGISTRATION"]:
-                document_type = "GST_CERTIFICATE"
-            elif raw_doc_type in ["PAN Card", "PAN_CARD"]:
-                document_type = "PAN_CARD"
-            
-            # Update result object with normalized type
-            result['document_type'] = document_type
-                
-            identification_number = result.get('data', {}).get('identification_number')
-            address = result.get('data', {}).get('address', {})
-            pincode = address.get('pincode') if isinstance(address, dict) else None
-            
-            validation_results = validate_extraction(
-                document_type=document_type,
-                identification_number=identification_number,
-                pincode=pincode
-            )
-            
-            # Scoring
-            confidence = result.get('confidence', 0.0)
-            data_quality_score = calculate_data_quality_score(
-                extracted_data=result.get('data', {}),
-                validation_results=validation_results,
-                confidence=confidence
-            )
-            quality_grade = get_quality_grade(data_quality_score)
-            
-            processing_time_ms = int((time.time() - start_time) * 1000)
-            
-            # Save to DB
-            db_data = {
-                "request_id": request_id,
-                "user_id": current_user.id,
-                "filename": file.filename,
-                "file_size_bytes": file_size,
-                "document_type": document_type,
-                "company_name": result.get('data', {}).get('company_name'),
-                "trade_name": result.get('data', {}).get('trade_name'),
-                "identification_number": identification_number,
-                "address_json": address,
-                "issue_date": result.get('data', {}).get('issue_date'),
-                "approver_name": result.get('data', {}).get('approver_name'),
-                "confidence": confidence,
-                "confidence_reason": result.get('confidence_reason'),
-                "data_quality_score": data_quality_score,
-                "validation_results": validation_results,
-                "processing_time_ms": processing_time_ms,
-                "uploaded_at": datetime.now(IST),
-            }
-            
-            db_extraction = crud.create_extraction(db, db_data)
-            
-            # Prepare result object
-            result['request_id'] = request_id
-            result['validation_results'] = validation_results
-            result['data_quality_score'] = data_quality_score
-            result['quality_grade'] = quality_grade
-            result['processing_time_ms'] = processing_time_ms
-            result['uploaded_at'] = db_extraction.uploaded_at
-            
-            results.append(result)
-            
-        except Exception as e:
-            errors.append({"filename": file.filename, "error": str(e)})
-        finally:
+    async def process_one(file: UploadFile):
+        """Returns (result, error) for a single file"""
+        if not file.filename:
             await file.close()
+            return None, {"filename": "unknown", "error": "Filename missing"}
+
+        async with semaphore:
+            upload = None
+            try:
+                start_time = time.time()
+                request_id = str(uuid.uuid4())
+                
+                # Stream the upload (hashed and size-checked as it is read)
+                upload = await read_upload(file)
+                file_size = upload.size
+                
+                result = await extract_document_data(
+                    upload.source, file.filename, use_cache=use_cache, content_sha256=upload.sha256, pack=settings.PACKING_ENABLED
+                )
+                
+                processing_time_ms = int((time.time() - start_time) * 1000)
+                
+                # Save to DB
+                db_data = build_extraction_record(result, request_id, current_user.id, file.filename, file_size, processing_time_ms)
+                async with db_lock:
+                    db_extraction = await run_in_threadpool(crud.create_extraction, db, db_data)
+                
+                # Prepare result object
+                result['request_id'] = request_id
+                result['processing_time_ms'] = processing_time_ms
+                result['uploaded_at'] = db_extraction.uploaded_at
+                return result, None
+                
+            except Exception as e:
+                return None, {"filename": file.filename, "error": str(e)}
+            finally:
+                if upload:
+                    upload.close()
+                await file.close()
+
+    outcomes = await asyncio.gather(*(process_one(file) for file in files))
+
+    results = [result for result, _ in outcomes if result is not None]
+    errors = [error for _, error in outcomes if error is not None]
             
     return BatchExtractionResponse(
         total_processed=len(files),
@@ -314,7 +252,11 @@ def get_extraction(
         data_quality_score=extraction.data_quality_score,
         quality_grade=get_quality_grade(extraction.data_quality_score or 0),
         processing_time_ms=extraction.processing_time_ms,
-        uploaded_at=extraction.uploaded_at
+        uploaded_at=extraction.uploaded_at,
+        image_quality=extraction.image_quality,
+        extraction_path=extraction.extraction_path,
+        model_tier=extraction.model_tier,
+        escalation_reason=extraction.escalation_reason
     )
 
 @app.get("/history", response_model=HistoryResponse)
@@ -323,21 +265,33 @@ def get_history(
     limit: int = Query(10, le=100),
     document_type: Optional[str] = None,
     days_ago: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; replaces skip"),
+    include_total: Optional[bool] = Query(None, description="Count matching rows (default: only without a cursor)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get extraction history with optional filters
+    Get extraction history with optional filters.
+    Page with skip/limit, or follow next_cursor: cursor pages take the same
+    time at any depth, and skip the total count unless include_total=true.
     """
-    extractions, total_count = crud.get_extractions_history(
-        db=db,
-        skip=skip,
-        limit=limit,
-        document_type=document_type,
-        days_ago=days_ago,
-        user_id=current_user.id,
-        role=current_user.role
-    )
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+    
+    try:
+        extractions, total_count, next_cursor = crud.get_extractions_history(
+            db=db,
+            skip=skip,
+            limit=limit,
+            document_type=document_type,
+            days_ago=days_ago,
+            user_id=current_user.id,
+            role=current_user.role,
+            cursor=cursor,
+            include_total=include_total if include_total is not None else not cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     items = []
     for ext in extractions:
@@ -358,8 +312,12 @@ def get_history(
             data_quality_score=ext.data_quality_score,
             quality_grade=get_quality_grade(ext.data_quality_score or 0),
             processing_time_ms=ext.processing_time_ms,
-            uploaded_at=ext.uploaded_at
+            uploaded_at=ext.uploaded_at,
+            image_quality=ext.image_quality,
+            extraction_path=ext.extraction_path,
+            model_tier=ext.model_tier,
+            escalation_reason=ext.escalation_reason
         ))
     
-    return HistoryResponse(total=total_count, items=items)
+    return HistoryResponse(total=total_count, items=items, next_cursor=next_cursor)
 
@@ -39,10 +39,25 @@ class ExtractionResponse(BaseModel):
     quality_grade: Optional[str] = None
     processing_time_ms: Optional[int] = None
     uploaded_at: Optional[datetime] = None
+    cache_hit: Optional[bool] = None
+    # Size of the image sent to the model vs. the decoded original (None on cache hits)
+    payload_stats: Optional[dict] = None
+    # Pre-flight image quality metrics; status 'flagged' when issues were found but not rejected
+    image_quality: Optional[dict] = None
+    # How the result was produced: image | text_prompt | text_local | cache
+    extraction_path: Optional[str] = None
+    # Model cascade tier that produced the answer (fast | strong) and why it escalated
+    model_tier: Optional[str] = None
+    escalation_reason: Optional[str] = None
+    # Gemini tokens, bytes sent, latency, retries and cost for this document (zero on cache hits)
+    usage: Optional[dict] = None
 
 class HistoryResponse(BaseModel):
-    total: int
+    # None when the count was skipped (include_total=false, the default with a cursor)
+    total: Optional[int] = None
     items: List[ExtractionResponse]
+    # Pass as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 class BatchExtractionResponse(BaseModel):
     total_processed: int
@@ -51,6 +66,20 @@ class BatchExtractionResponse(BaseModel):
     results: List[ExtractionResponse]
     errors: List[dict]
 
+# Job Schemas
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "processing", "completed", "failed"]
+    created_at: Optional[datetime] = None
+
+class JobStatusResponse(JobResponse):
+    filename: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ExtractionResponse] = None
+
 # Auth Schemas
 class UserBase(BaseModel):
     email: str # Simplified from EmailStr to avoid extra dependency for now, or use EmailStr if pydantic[email] is installed
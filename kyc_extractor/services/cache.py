@@ -0,0 +1,223 @@
+"""
+Content-addressed cache for model extraction results.
+
+Entries are keyed by the SHA-256 of the uploaded bytes plus the model name,
+prompt version and a fingerprint of the other settings that shape the model
+output (cascade tier and escalation rules, classify-first, JSON mode), so a
+changed prompt, model or pipeline never serves stale output.
+Two tiers: an in-process LRU, backed by the extraction_cache table that lives
+next to extractions. Expired rows are deleted by purge_periodically (started
+with the app) or scripts/purge_cache.py. Only the raw model output is cached;
+validation, scoring and the extractions row are redone for every request.
+"""
+import asyncio
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Union
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.prompts import PROMPT_VERSION
+from kyc_extractor.db.database import SessionLocal
+from kyc_extractor.db import crud
+
+@dataclass(frozen=True)
+class CacheKey:
+    content_sha256: str
+    model_name: str
+    prompt_version: str
+    pipeline: str = ""
+
+def hash_content(content: Union[bytes, str]) -> str:
+    """SHA-256 hex digest of the raw upload bytes (or of the file at that path)"""
+    if isinstance(content, str):
+        digest = hashlib.sha256()
+        with open(content, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    return hashlib.sha256(content).hexdigest()
+
+def describe_pipeline() -> str:
+    """The settings besides model and prompt that change what the model returns"""
+    parts = []
+    if settings.GEMINI_CASCADE_ENABLED:
+        parts.append(f"cascade={settings.GEMINI_FAST_MODEL_NAME}")
+        parts.append(f"escalate_below={settings.GEMINI_ESCALATION_MIN_CONFIDENCE}")
+        parts.append(f"escalate_on_invalid_id={settings.GEMINI_ESCALATE_ON_INVALID_ID}")
+    else:
+        parts.append("cascade=off")
+    parts.append(f"classify_first={settings.CLASSIFY_FIRST}")
+    parts.append(f"json_mode={settings.GEMINI_JSON_MODE}")
+    return ";".join(parts)
+
+def pipeline_fingerprint(description: str) -> str:
+    return hashlib.sha256(description.encode()).hexdigest()[:16]
+
+class ExtractionCache:
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        ttl_seconds: int = 7 * 24 * 3600,
+        persistent: bool = True,
+        session_factory=SessionLocal
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.session_factory = session_factory
+
+        # key -> (stored_at monotonic, result)
+        self._entries: "OrderedDict[CacheKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, content_sha256: str, model_name: Optional[str] = None) -> CacheKey:
+        return CacheKey(
+            content_sha256=content_sha256,
+            model_name=model_name or settings.GEMINI_MODEL_NAME,
+            prompt_version=PROMPT_VERSION,
+            pipeline=pipeline_fingerprint(describe_pipeline())
+        )
+
+    async def get(self, key: CacheKey) -> Optional[dict]:
+        """
+        Returns a copy of the cached model result, or None on a miss.
+        A persistent-tier hit is promoted into the in-process LRU.
+        """
+        if not self.enabled:
+            return None
+
+        result = self._get_memory(key)
+        if result is not None:
+            self.memory_hits += 1
+            return copy.deepcopy(result)
+
+        if self.persistent:
+            try:
+                result = await asyncio.to_thread(self._get_persistent, key)
+            except Exception as e:
+                print(f"Warning: extraction cache lookup failed: {e}")
+                result = None
+
+            if result is not None:
+                self.persistent_hits += 1
+                self._set_memory(key, result)
+                return copy.deepcopy(result)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: CacheKey, result: dict) -> None:
+        """Stores a model result in both tiers. Persistent-tier failures are logged, not raised."""
+        if not self.enabled:
+            return
+
+        result = copy.deepcopy(result)
+        self._set_memory(key, result)
+
+        if self.persistent:
+            try:
+                await asyncio.to_thread(self._set_persistent, key, result)
+            except Exception as e:
+                print(f"Warning: extraction cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Drops expired rows from the persistent tier, returns rows deleted"""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            return crud.delete_expired_cache_entries(db, cutoff)
+        finally:
+            db.close()
+
+    async def purge_periodically(self, interval_seconds: float) -> None:
+        """Runs purge_expired every interval_seconds until cancelled"""
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.purge_expired)
+                if deleted:
+                    print(f"🧹 Purged {deleted} expired extraction cache entries")
+            except Exception as e:
+                print(f"Warning: extraction cache purge failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def clear(self) -> None:
+        """Empties the in-process tier"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persistent": self.persistent,
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "prompt_version": PROMPT_VERSION,
+            "pipeline": describe_pipeline(),
+        }
+
+    def _get_memory(self, key: CacheKey) -> Optional[dict]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            stored_at, result = item
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def _set_memory(self, key: CacheKey, result: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _get_persistent(self, key: CacheKey) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            entry = crud.get_cache_entry(db, key.content_sha256, key.model_name, key.prompt_version, key.pipeline, created_after=cutoff)
+            if entry is None:
+                return None
+            result = entry.result_json
+            crud.record_cache_hit(db, entry)
+            return result
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: CacheKey, result: dict) -> None:
+        db = self.session_factory()
+        try:
+            crud.upsert_cache_entry(db, key.content_sha256, key.model_name, key.prompt_version, result, key.pipeline)
+        finally:
+            db.close()
+
+extraction_cache = ExtractionCache(
+    enabled=settings.EXTRACTION_CACHE_ENABLED,
+    max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+    persistent=settings.EXTRACTION_CACHE_PERSISTENT
+)
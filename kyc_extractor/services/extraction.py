@@ -0,0 +1,255 @@
+"""
+Extraction pipeline shared by the API endpoints:
+image_processor -> classification -> gemini -> document type normalization -> validators -> scoring
+"""
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from kyc_extractor.services.image_processor import image_processor, FileSource
+from kyc_extractor.core.gemini import gemini_client, new_usage
+from kyc_extractor.services.cache import extraction_cache, hash_content
+from kyc_extractor.services.singleflight import extraction_flights
+from kyc_extractor.services.process_pool import PoolBusyError
+from kyc_extractor.services import text_layer
+from kyc_extractor.services.packing import DocumentPacker
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.prompts import TEXT_LAYER_PROMPT
+from kyc_extractor.validators import validate_extraction, calculate_data_quality_score, get_quality_grade
+
+# IST Timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Common model variations mapped to schema-allowed values
+MSME_ALIASES = ["MSME Certificate", "MSME_CERTIFICATE", "MSME_Certificate", "UDYAM", "UDYAM_REGISTRATION", "Udyam Registration Certificate", "Udyam Registration"]
+GST_ALIASES = ["GST Certificate", "GST_REGISTRATION"]
+PAN_ALIASES = ["PAN Card", "PAN_CARD"]
+
+class ExtractionError(Exception):
+    """Raised when the model call fails or returns an error payload"""
+
+class UpstreamUnavailableError(ExtractionError):
+    """Model quota exhausted, upstream unhealthy after retries or local workers saturated; the document can be resubmitted"""
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def normalize_document_type(raw_doc_type: str) -> str:
+    """Map common variations of the model's document_type to schema-allowed values"""
+    if raw_doc_type in MSME_ALIASES:
+        return "MSME"
+    elif raw_doc_type in GST_ALIASES:
+        return "GST_CERTIFICATE"
+    elif raw_doc_type in PAN_ALIASES:
+        return "PAN_CARD"
+    return raw_doc_type
+
+def has_valid_id(result: dict) -> bool:
+    """
+    False when a GST/PAN/incorporation result's ID is missing or fails
+    validation; the model cascade re-runs those on the strong model.
+    """
+    document_type = normalize_document_type(result.get('document_type', 'OTHER'))
+    if document_type not in ("GST_CERTIFICATE", "PAN_CARD", "INCORPORATION_CERT"):
+        return True
+    identification_number = (result.get('data') or {}).get('identification_number')
+    return validate_extraction(document_type, identification_number, None)['identification_number']['valid']
+
+# Cascade escalation of packed answers uses the same ID check as single documents
+document_packer = DocumentPacker(id_is_valid=has_valid_id)
+
+async def classify_from_thumbnail(source, usage: Optional[dict] = None) -> Optional[str]:
+    """Document type from a thumbnail of an upload or of a prepared model payload (None when unsure)"""
+    thumbnail = await asyncio.to_thread(image_processor.thumbnail, source)
+    return await gemini_client.classify_async(thumbnail, usage=usage)
+
+async def extract_document_data(
+    content: FileSource,
+    filename: str,
+    use_cache: bool = True,
+    content_sha256: Optional[str] = None,
+    pack: bool = False
+) -> dict:
+    """
+    Runs a single document through the pipeline and returns the result dict
+    with validation_results, data_quality_score and quality_grade filled in.
+    content is the upload bytes or the path of a spooled upload; pass
+    content_sha256 when it was already computed while streaming.
+    With use_cache=False the cache lookup is skipped (the fresh result is still stored).
+    With pack=True (batch uploads and queued jobs) a small single-page document
+    may be extracted in one model call together with concurrent ones (services/packing.py).
+    Raises ValueError for unreadable files and ExtractionError for model failures
+    (UpstreamUnavailableError when the failure is on the model side and worth retrying).
+    """
+    cache_key = extraction_cache.make_key(content_sha256 or hash_content(content))
+    result = await extraction_cache.get(cache_key) if use_cache else None
+    cache_hit = result is not None
+
+    payload_stats = None
+    extraction_path = "cache"
+    usage = new_usage()
+
+    if not cache_hit:
+        ran_model = False
+
+        async def run_model() -> tuple:
+            nonlocal ran_model
+            ran_model = True
+            # Born-digital PDFs: use the text layer instead of page images when possible
+            path, text = text_layer.IMAGE, None
+            if settings.TEXT_LAYER_ENABLED and filename.lower().endswith('.pdf'):
+                path, text, local_result = await asyncio.to_thread(text_layer.choose_path, content)
+                if path == text_layer.TEXT_LOCAL:
+                    await extraction_cache.set(cache_key, local_result)
+                    return local_result, {"extraction_path": path, "text_chars": len(text)}
+
+            classification = None
+            if path == text_layer.TEXT_PROMPT:
+                payload = TEXT_LAYER_PROMPT.format(text=text)
+                stats = {"extraction_path": path, "text_chars": len(text), "sent_bytes": len(payload.encode())}
+            else:
+                quality = None
+                if settings.CLASSIFY_FIRST and not pack and not filename.lower().endswith('.pdf'):
+                    # Quality gate first, so rejected uploads never pay for the classification call;
+                    # then classify from a thumbnail of the upload while the full-size payload is prepared
+                    quality = await image_processor.check_quality_async(content, filename)
+                    classification = asyncio.create_task(classify_from_thumbnail(content, usage))
+                # Process Image (Convert PDF -> Img / Load Img), then downscale/re-encode for the model
+                try:
+                    payload, stats = await image_processor.process_for_model_async(content, filename, quality)
+                except BaseException as e:
+                    if classification:
+                        classification.cancel()
+                    if isinstance(e, PoolBusyError):
+                        raise UpstreamUnavailableError(str(e), retry_after=5)
+                    raise
+                stats["extraction_path"] = path
+
+            if pack and text is None and document_packer.accepts(payload, stats):
+                # Small single-page document: shares a model call with others (generic prompt, no classification)
+                model_result = await document_packer.extract(payload, stats, usage)
+            else:
+                # Two-stage extraction: classify, then extract with that type's short prompt
+                document_type = None
+                if settings.CLASSIFY_FIRST:
+                    start = time.perf_counter()
+                    if text is not None:
+                        document_type, source = text_layer.classify_text(text), "text_layer"
+                    else:
+                        # PDFs are classified from their first prepared page
+                        document_type, source = await (classification or classify_from_thumbnail(payload, usage)), "thumbnail"
+                    stats["classification"] = {
+                        "document_type": document_type,
+                        "source": source,
+                        # Time the extraction call waited for the classification
+                        "wait_ms": round((time.perf_counter() - start) * 1000, 1),
+                    }
+
+                # Extract Data using Gemini
+                model_result = await gemini_client.extract_data_async(
+                    payload, id_is_valid=has_valid_id, document_type=document_type, usage=usage
+                )
+            if "error" not in model_result:
+                await extraction_cache.set(cache_key, model_result)
+            return model_result, stats
+
+        # Identical documents already in flight share that model call
+        result, payload_stats = await extraction_flights.do(cache_key, run_model)
+        extraction_path = payload_stats["extraction_path"]
+        if not ran_model:
+            # Coalesced onto another request's call: that request is billed for it
+            usage = new_usage()
+
+        if "error" in result:
+            if result.get("retryable"):
+                raise UpstreamUnavailableError(result['error'], retry_after=result.get('retry_after'))
+            raise ExtractionError(result['error'])
+
+    # Normalize document type
+    raw_doc_type = result.get('document_type', 'OTHER')
+
+    # DEBUG LOGGING
+    with open("debug_doc_type.log", "a") as f:
+        f.write(f"File: {filename}, Raw Type: '{raw_doc_type}'\n")
+
+    document_type = normalize_document_type(raw_doc_type)
+    result['document_type'] = document_type
+
+    identification_number = result.get('data', {}).get('identification_number')
+    address = result.get('data', {}).get('address', {})
+    pincode = address.get('pincode') if isinstance(address, dict) else None
+
+    # Run validation
+    validation_results = validate_extraction(
+        document_type=document_type,
+        identification_number=identification_number,
+        pincode=pincode
+    )
+
+    # Calculate quality score
+    confidence = result.get('confidence', 0.0)
+    data_quality_score = calculate_data_quality_score(
+        extracted_data=result.get('data', {}),
+        validation_results=validation_results,
+        confidence=confidence
+    )
+
+    result['validation_results'] = validation_results
+    result['data_quality_score'] = data_quality_score
+    result['quality_grade'] = get_quality_grade(data_quality_score)
+    result['cache_hit'] = cache_hit
+    result['payload_stats'] = payload_stats
+    result['image_quality'] = (payload_stats or {}).get('quality')
+    result['extraction_path'] = extraction_path
+    result['usage'] = {**usage, "upstream_ms": round(usage["upstream_ms"], 1), "cost_usd": round(usage["cost_usd"], 8)}
+    return result
+
+def usage_columns(usage: Optional[dict]) -> dict:
+    """Extraction columns for a pipeline result's usage (see gemini.new_usage)"""
+    usage = usage or new_usage()
+    return {
+        "model_name": usage["model_name"],
+        "prompt_tokens": usage["prompt_tokens"],
+        "output_tokens": usage["output_tokens"],
+        "payload_bytes": usage["payload_bytes"],
+        "upstream_latency_ms": round(usage["upstream_ms"]),
+        "retry_count": usage["retries"],
+        "cost_usd": usage["cost_usd"],
+    }
+
+def build_extraction_record(
+    result: dict,
+    request_id: str,
+    user_id: Optional[int],
+    filename: str,
+    file_size: int,
+    processing_time_ms: int
+) -> dict:
+    """Build the kwargs for crud.create_extraction from a pipeline result"""
+    data = result.get('data', {})
+    return {
+        "request_id": request_id,
+        "user_id": user_id,
+        "filename": filename,
+        "file_size_bytes": file_size,
+        "document_type": result['document_type'],
+        "company_name": data.get('company_name'),
+        "trade_name": data.get('trade_name'),
+        "identification_number": data.get('identification_number'),
+        "address_json": data.get('address', {}),
+        "issue_date": data.get('issue_date'),
+        "approver_name": data.get('approver_name'),
+        "confidence": result.get('confidence', 0.0),
+        "confidence_reason": result.get('confidence_reason'),
+        "data_quality_score": result['data_quality_score'],
+        "validation_results": result['validation_results'],
+        "processing_time_ms": processing_time_ms,
+        # Unknown for cache hits: no pages were processed
+        "pages_dropped": (result.get('payload_stats') or {}).get('pages_dropped'),
+        "image_quality": result.get('image_quality'),
+        "extraction_path": result.get('extraction_path'),
+        "model_tier": result.get('model_tier'),
+        "escalation_reason": result.get('escalation_reason'),
+        **usage_columns(result.get('usage')),
+        "uploaded_at": datetime.now(IST),
+    }
@@ -1,55 +1,616 @@
-from PIL import Image
-from pdf2image import convert_from_bytes
+from PIL import Image, ImageStat
+from pdf2image import convert_from_bytes, convert_from_path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
+import asyncio
 import io
+import numpy as np
+import os
+import tempfile
+from kyc_extractor.core.config import settings
+from kyc_extractor.services.page_filter import PageFilter
+from kyc_extractor.services.process_pool import ProcessPool
+from kyc_extractor.services.quality import analyze_image, working_gray, estimate_skew, QualityRejectedError, REJECT_ISSUES
+
+# Raw upload bytes, or the path of an upload spooled to disk
+FileSource = Union[bytes, str]
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+def parse_page_selection(selection: str) -> List[Tuple[int, Optional[int]]]:
+    """
+    Parses a 1-based page selection like "1-3,5,8-" into (first_page, last_page)
+    ranges for pdf2image. An empty selection means every page: [(1, None)].
+    """
+    if not selection or not selection.strip():
+        return [(1, None)]
+
+    ranges = []
+    for part in selection.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            first_page = int(first) if first.strip() else 1
+            last_page = int(last) if last.strip() else None
+        else:
+            first_page = last_page = int(part)
+        if first_page < 1 or (last_page is not None and last_page < first_page):
+            raise ValueError(f"Invalid PDF page selection: {part}")
+        ranges.append((first_page, last_page))
+    return ranges
+
+class PageSequence:
+    """
+    Lazily loaded pages of a rasterized PDF. Pages live as files in a temp
+    directory and are decoded one at a time while iterating, so peak memory is
+    one page rather than the whole document. close() (or `with`) deletes them.
+    """
+    def __init__(self, paths: List[str], tmp_dir: tempfile.TemporaryDirectory):
+        self.paths = paths
+        self._tmp_dir = tmp_dir
+        # Quality gate report for the first page
+        self.quality: Optional[dict] = None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __iter__(self):
+        for path in self.paths:
+            with Image.open(path) as page:
+                page.load()
+                yield page
+
+    def close(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 class ImageProcessor:
-    def process_file(self, file_content: bytes, filename: str) -> Image.Image:
+    def __init__(self):
+        # Dedicated pool so rasterization never starves the default executor
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSOR_THREADS,
+            thread_name_prefix="image-processor"
+        )
+        # CPU-bound model preparation goes to worker processes when enabled
+        self._process_pool = None
+        if settings.IMAGE_PROCESS_WORKERS > 0:
+            self._process_pool = ProcessPool(
+                max_workers=settings.IMAGE_PROCESS_WORKERS,
+                queue_size=settings.IMAGE_PROCESS_QUEUE_SIZE,
+                queue_timeout=settings.IMAGE_PROCESS_QUEUE_TIMEOUT,
+                max_tasks_per_worker=settings.IMAGE_PROCESS_MAX_TASKS_PER_WORKER,
+                start_method=settings.IMAGE_PROCESS_START_METHOD,
+            )
+
+    async def process_for_model_async(
+        self,
+        source: FileSource,
+        filename: str,
+        quality: Optional[dict] = None
+    ) -> Tuple[Union[Image.Image, dict, list], dict]:
+        """
+        process_file + prepare_for_model in one hop, on the process pool when
+        IMAGE_PROCESS_WORKERS > 0 (queue wait and compute time are added to the
+        stats), otherwise on the image processor thread pool.
+        Pass the report from check_quality_async to skip the quality gate.
+        Raises PoolBusyError when the process pool queue is full.
+        """
+        if self._process_pool is not None:
+            (payload, stats), timings = await self._process_pool.run(_process_for_model, source, filename, quality)
+            stats.update(timings)
+            return payload, stats
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.process_for_model, source, filename, quality)
+
+    async def check_quality_async(self, source: FileSource, filename: str) -> Optional[dict]:
+        """
+        Runs only the quality gate on an image upload (thread pool), so work that
+        costs a model call can wait for it. Returns the report (None when the gate
+        is off); raises QualityRejectedError like process_file.
+        """
+        if settings.QUALITY_GATE_MODE.lower() == "off":
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._check_image_quality, source)
+
+    def _check_image_quality(self, source: FileSource) -> dict:
+        image = self._process_image(source)
+        try:
+            self._check_quality(image)
+            return image.info["quality"]
+        finally:
+            image.close()
+
+    def pool_stats(self) -> dict:
+        if self._process_pool is None:
+            return {"mode": "threads", "threads": settings.IMAGE_PROCESSOR_THREADS}
+        return {"mode": "processes", **self._process_pool.stats()}
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+        self._executor.shutdown(wait=False)
+
+    def process_for_model(
+        self,
+        source: FileSource,
+        filename: str,
+        quality: Optional[dict] = None
+    ) -> Tuple[Union[Image.Image, dict, list], dict]:
+        return self.prepare_for_model(self.process_file(source, filename, quality))
+
+    def prepare_for_model(self, image: Union[Image.Image, PageSequence]) -> Tuple[Union[Image.Image, dict, list], dict]:
         """
-        Processes the input file content (PDF or Image) and returns a PIL Image.
+        Shrinks the image before it is sent to Gemini: caps the longest edge (per page for stitched PDFs),
+        converts near-monochrome documents to grayscale and encodes to
+        MODEL_IMAGE_FORMAT at MODEL_IMAGE_QUALITY.
+        Returns (payload, stats); payload is an inline blob dict for generate_content,
+        or the untouched image when MODEL_IMAGE_FORMAT is 'none'. A PageSequence
+        yields a list with one payload per page, encoded one page at a time.
+        """
+        if isinstance(image, PageSequence):
+            return self._prepare_pages(image)
+        pages_dropped = image.info.get("pages_dropped", 0)
+        quality = image.info.get("quality")
+        payload, stats = self._prepare_image(image)
+        stats["pages_dropped"] = pages_dropped
+        stats["quality"] = quality
+        return payload, stats
+
+    def thumbnail(self, source: Union[FileSource, Image.Image, dict, list], max_edge: Optional[int] = None) -> dict:
+        """
+        Small grayscale JPEG for the classification prompt, from an image
+        upload (bytes or path) or the first page of a prepare_for_model
+        payload. JPEGs are decoded in draft mode, so this costs a few
+        milliseconds.
+        """
+        max_edge = max_edge or settings.CLASSIFY_THUMBNAIL_MAX_EDGE
+        first = source[0] if isinstance(source, list) else source
+        if isinstance(first, dict):
+            image = Image.open(io.BytesIO(first["data"]))
+        elif isinstance(first, Image.Image):
+            image = first.copy()
+        else:
+            image = Image.open(first if isinstance(first, str) else io.BytesIO(first))
+        image.draft("L", (max_edge, max_edge))
+        image = image.convert("L")
+        image.thumbnail((max_edge, max_edge), Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=70)
+        return {"mime_type": MIME_TYPES["JPEG"], "data": buffer.getvalue()}
+
+    def _prepare_pages(self, pages: PageSequence) -> Tuple[list, dict]:
+        parts = []
+        page_stats = []
+        page_filter = self._page_filter(len(pages))
+        with pages:
+            for page in pages:
+                if page_filter and page_filter.check(page):
+                    continue
+                self._append_page(page, parts, page_stats)
+            if not parts:
+                # Every page looked blank or repeated; send the first one anyway
+                self._append_page(next(iter(pages)), parts, page_stats)
+
+        sent_bytes = [stats["sent_bytes"] for stats in page_stats]
+        total_sent = sum(sent_bytes) if None not in sent_bytes else None
+        return parts, {
+            "pages": len(parts),
+            "pages_dropped": len(pages) - len(parts),
+            "pages_dropped_by_reason": dict(page_filter.dropped) if page_filter else {},
+            "quality": pages.quality,
+            # Rendered PDF pages have no upload-sized baseline (see _prepare_image)
+            "original_bytes": None,
+            "sent_bytes": total_sent,
+            "bytes_saved": None,
+            "page_stats": page_stats,
+        }
+
+    def _append_page(self, page: Image.Image, parts: list, page_stats: list) -> None:
+        payload, stats = self._prepare_image(page)
+        if isinstance(payload, Image.Image):
+            # The page is closed once we move on
+            payload = payload.copy()
+        parts.append(payload)
+        page_stats.append(stats)
+
+    def _page_filter(self, page_count: int) -> Optional[PageFilter]:
+        """Blank/duplicate page filter for multi-page documents, if enabled"""
+        if settings.PAGE_FILTER_ENABLED and page_count > 1:
+            return PageFilter.from_settings()
+        return None
+
+    def _prepare_image(self, image: Image.Image) -> Tuple[Union[Image.Image, dict], dict]:
+        original_size = image.size
+        # What used to go out for an image upload: its own bytes. Rendered PDF pages were
+        # encoded by the SDK instead, which is not worth re-running just for the stats.
+        original_bytes = image.info.get("upload_bytes")
+        image_format = settings.MODEL_IMAGE_FORMAT.upper()
+
+        if image_format == "NONE":
+            return image, {
+                "original_size": list(original_size),
+                "sent_size": list(original_size),
+                "original_bytes": original_bytes,
+                "sent_bytes": None,
+                "bytes_saved": None,
+            }
+
+        self._draft_for_model(image, self._model_scale(image))
+
+        # Crop to the document and straighten it (single pages only)
+        preprocess = None
+        if image.info.get("page_count", 1) == 1 and (settings.MODEL_IMAGE_AUTOCROP or settings.MODEL_IMAGE_DESKEW):
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image, preprocess = self._crop_and_deskew(image)
+
+        # Color mode (before resizing - fewer channels to resample)
+        if self._should_use_grayscale(image):
+            image = image.convert("L")
+        elif image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        # Downscale
+        scale = self._model_scale(image)
+        if scale < 1.0:
+            new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(new_size, Image.LANCZOS, reducing_gap=2.0)
+
+        buffer = io.BytesIO()
+        if image_format == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=image_format, quality=settings.MODEL_IMAGE_QUALITY)
+        data = buffer.getvalue()
+
+        stats = {
+            "original_size": list(original_size),
+            "sent_size": list(image.size),
+            "mode": image.mode,
+            "format": image_format,
+            "original_bytes": original_bytes,
+            "sent_bytes": len(data),
+            "bytes_saved": original_bytes - len(data) if original_bytes is not None else None,
+            "preprocess": preprocess,
+        }
+        return {"mime_type": MIME_TYPES[image_format], "data": data}, stats
+
+    def _crop_and_deskew(self, image: Image.Image) -> Tuple[Image.Image, dict]:
+        """
+        Crops away background around the document (e.g. the table under a phone
+        photo) and blank margins, and straightens small rotations.
+        Returns the new image and what was done, including the pixel reduction.
+        """
+        pixels_before = image.width * image.height
+        fill = 255 if image.mode == "L" else (255, 255, 255)
+        angle = None
+
+        if settings.MODEL_IMAGE_AUTOCROP:
+            image = image.crop(self._scaled_box(image, self._paper_box))
+
+        if settings.MODEL_IMAGE_DESKEW:
+            skew = estimate_skew(working_gray(image), max_angle=settings.MODEL_IMAGE_DESKEW_MAX_DEGREES)
+            if skew is not None and settings.MODEL_IMAGE_DESKEW_MIN_DEGREES <= abs(skew) <= settings.MODEL_IMAGE_DESKEW_MAX_DEGREES:
+                # Same canvas size: for small angles only background/margin corners are lost
+                image = image.rotate(-skew, resample=Image.BILINEAR, fillcolor=fill)
+                angle = skew
+
+        if settings.MODEL_IMAGE_AUTOCROP:
+            if angle is not None:
+                # Background corners rotated into view; crop to the now upright page
+                image = image.crop(self._scaled_box(image, self._paper_box))
+            image = image.crop(self._scaled_box(image, self._content_box))
+
+        pixels_after = image.width * image.height
+        return image, {
+            "deskew_degrees": angle,
+            "cropped_size": list(image.size),
+            "pixel_reduction": round(1 - pixels_after / pixels_before, 3),
+        }
+
+    def _scaled_box(self, image: Image.Image, find_box) -> Tuple[int, int, int, int]:
+        """Runs a box finder on the working thumbnail and maps the box back to full resolution"""
+        gray = working_gray(image)
+        top, bottom, left, right = find_box(gray)
+        sy, sx = image.height / gray.shape[0], image.width / gray.shape[1]
+        return (
+            max(0, int(left * sx)), max(0, int(top * sy)),
+            min(image.width, int(np.ceil(right * sx))), min(image.height, int(np.ceil(bottom * sy)))
+        )
+
+    def _paper_box(self, gray: np.ndarray) -> Tuple[int, int, int, int]:
+        """
+        Bounding box (top, bottom, left, right) of the bright paper against a darker
+        background: Otsu threshold, then the rows/columns that are mostly paper.
+        """
+        if gray.max() - gray.min() < 10:
+            return 0, gray.shape[0], 0, gray.shape[1]
+        histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+        levels = np.arange(256)
+        weight = np.cumsum(histogram)
+        mean = np.cumsum(histogram * levels)
+        total_weight, total_mean = weight[-1], mean[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            between = (total_mean * weight - mean * total_weight) ** 2 / (weight * (total_weight - weight))
+        threshold = int(np.nanargmax(between))
+
+        paper = gray > threshold
+        rows = np.flatnonzero(paper.mean(axis=1) >= 0.5 * paper.mean(axis=1).max())
+        cols = np.flatnonzero(paper.mean(axis=0) >= 0.5 * paper.mean(axis=0).max())
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+        # Only cut strips that are background (a table), not part of the page
+        # such as a dark header band with light text on it
+        h, w = gray.shape
+        if not self._is_background(gray[:top]):
+            top = 0
+        if not self._is_background(gray[bottom:]):
+            bottom = h
+        if not self._is_background(gray[top:bottom, :left]):
+            left = 0
+        if not self._is_background(gray[top:bottom, right:]):
+            right = w
+        return top, bottom, left, right
+
+    def _is_background(self, strip: np.ndarray, max_text_rows: float = 0.01) -> bool:
+        """
+        True if a strip has no text on it: text rows have many sharp light/dark
+        transitions, while table texture is soft and a tilted page corner adds
+        at most a couple per row.
+        """
+        if strip.shape[0] == 0 or strip.shape[1] < 2:
+            return True
+        transitions = (np.abs(np.diff(strip, axis=1)) >= 64).sum(axis=1)
+        return (transitions >= 6).mean() <= max_text_rows
+
+    def _content_box(self, gray: np.ndarray, padding: float = 0.02) -> Tuple[int, int, int, int]:
+        """
+        Bounding box of the ink (darker or lighter than the paper) plus a small
+        margin. The whole image if there is no ink, or if faint marks (light
+        print, pale stamps) lie outside the box.
+        """
+        h, w = gray.shape
+        deviation = np.abs(gray - np.median(gray))
+        ink = deviation > 40
+        # Ignore isolated specks: a row/column needs a couple of ink pixels
+        rows = np.flatnonzero(ink.sum(axis=1) >= 2)
+        cols = np.flatnonzero(ink.sum(axis=0) >= 2)
+        if rows.size == 0 or cols.size == 0:
+            return 0, h, 0, w
+        pad = int(max(h, w) * padding)
+        top, bottom = max(0, rows[0] - pad), min(h, rows[-1] + 1 + pad)
+        left, right = max(0, cols[0] - pad), min(w, cols[-1] + 1 + pad)
+
+        faint = deviation > 20
+        outside = int(faint.sum()) - int(faint[top:bottom, left:right].sum())
+        if outside > 0.001 * h * w:
+            return 0, h, 0, w
+        return top, bottom, left, right
+
+    def _model_scale(self, image: Image.Image) -> float:
+        """Downscale factor for MODEL_IMAGE_MAX_EDGE; stitched PDFs cap each page, not the whole canvas"""
+        page_count = image.info.get("page_count", 1)
+        longest = max(image.width, image.height / page_count)
+        max_edge = settings.MODEL_IMAGE_MAX_EDGE
+        if max_edge and longest > max_edge:
+            return max_edge / longest
+        return 1.0
+
+    def _draft_for_model(self, image: Image.Image, scale: float) -> None:
+        """Let the JPEG decoder do most of the downscaling (no-op once the image is loaded)"""
+        if scale < 1.0 and image.format == "JPEG":
+            image.draft("RGB", (round(image.width * scale), round(image.height * scale)))
+
+    def _should_use_grayscale(self, image: Image.Image) -> bool:
+        setting = settings.MODEL_IMAGE_GRAYSCALE.lower()
+        if image.mode in ("L", "1"):
+            return True
+        if setting == "always":
+            return True
+        if setting != "auto":
+            return False
+        # Near-monochrome scans: low mean saturation on a small thumbnail
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail((256, 256))
+        saturation = ImageStat.Stat(thumbnail.convert("HSV")).mean[1]
+        return saturation < settings.MODEL_IMAGE_GRAYSCALE_MAX_SATURATION
+
+    def process_file(
+        self,
+        source: FileSource,
+        filename: str,
+        quality: Optional[dict] = None
+    ) -> Union[Image.Image, PageSequence]:
+        """
+        Processes the input file (PDF or Image, as bytes or a path) and returns a PIL Image,
+        or a PageSequence for PDFs when PDF_PAGE_MODE is 'pages'.
+        Raises QualityRejectedError when the quality gate rejects the document.
+        An image that already passed the gate (quality = its report) is not checked again.
         """
         if filename.lower().endswith('.pdf'):
-            return self._process_pdf(file_content)
+            document = self._process_pdf(source)
+            self._check_quality(document, dpi=settings.PDF_DPI)
         else:
-            return self._process_image(file_content)
+            document = self._process_image(source)
+            if quality is None:
+                self._check_quality(document)
+            else:
+                self._draft_for_model(document, self._model_scale(document))
+                document.info["quality"] = quality
+        return document
 
-    def _process_pdf(self, file_content: bytes) -> Image.Image:
+    def _check_quality(self, document: Union[Image.Image, PageSequence], dpi: Optional[float] = None) -> None:
         """
-        Converts all pages of a PDF to images and stitches them vertically.
+        Pre-flight quality gate (QUALITY_GATE_MODE). The report is attached to the
+        image (info["quality"]) or the PageSequence (first page only).
+        In 'reject' mode unreadable documents raise QualityRejectedError.
         """
-        try:
-            images = convert_from_bytes(file_content)
-            if not images:
-                raise ValueError("Could not convert PDF to image.")
-            
-            if len(images) == 1:
-                return images[0]
+        mode = settings.QUALITY_GATE_MODE.lower()
+        if mode == "off":
+            return
 
-            # Stitch images vertically
-            total_width = max(img.width for img in images)
-            total_height = sum(img.height for img in images)
-            
-            stitched_image = Image.new('RGB', (total_width, total_height), (255, 255, 255))
-            
-            y_offset = 0
-            for img in images:
-                # Center the image if widths differ (unlikely for standard PDFs but good practice)
-                x_offset = (total_width - img.width) // 2
-                stitched_image.paste(img, (x_offset, y_offset))
-                y_offset += img.height
-                
-            return stitched_image
+        if isinstance(document, PageSequence):
+            with Image.open(document.paths[0]) as page:
+                report = analyze_image(page, dpi=dpi)
+            document.quality = report
+        else:
+            size = document.size
+            self._draft_for_model(document, self._model_scale(document))
+            report = analyze_image(document, dpi=dpi, size=size)
+            document.info["quality"] = report
+
+        if report["status"] == "rejected" and mode != "reject":
+            report["status"] = "flagged"
+        if report["status"] == "rejected":
+            if isinstance(document, PageSequence):
+                document.close()
+            issues = ", ".join(issue.replace("_", " ") for issue in report["issues"] if issue in REJECT_ISSUES)
+            raise QualityRejectedError(
+                f"Document quality too low to extract ({issues}). Please upload a sharper, higher-resolution scan.",
+                report
+            )
+
+    def _process_pdf(self, source: FileSource) -> Union[Image.Image, PageSequence]:
+        """
+        Converts the selected pages of a PDF to images. In 'pages' mode they are
+        returned as a lazy PageSequence; in 'stitch' mode they are stitched vertically.
+        """
+        try:
+            if settings.PDF_PAGE_MODE.lower() == "pages":
+                return self._rasterize_pages(source)
+            if settings.PDF_RASTERIZE_TO_DISK:
+                # Pages stay on disk and are decoded one at a time while filtering and stitching
+                with tempfile.TemporaryDirectory(prefix="kyc-pdf-") as output_folder:
+                    return self._stitch_pages(self._rasterize_pdf(source, output_folder, paths_only=True))
+            return self._stitch_pages(self._rasterize_pdf(source))
             
         except Exception as e:
             raise ValueError(f"PDF processing failed: {str(e)}")
 
-    def _process_image(self, file_content: bytes) -> Image.Image:
+    def _rasterize_pages(self, source: FileSource) -> PageSequence:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="kyc-pdf-")
+        try:
+            paths = self._rasterize_pdf(source, tmp_dir.name, paths_only=True)
+            return PageSequence(paths, tmp_dir)
+        except Exception:
+            tmp_dir.cleanup()
+            raise
+
+    def _rasterize_pdf(self, source: FileSource, output_folder: Optional[str] = None, paths_only: bool = False) -> list:
+        """
+        Rasterizes the pages selected by PDF_PAGES / PDF_MAX_PAGES with the PDF_* settings.
+        With an output_folder the returned images are lazy, file-backed handles
+        (or file paths when paths_only is set).
+        """
+        options = {
+            "dpi": settings.PDF_DPI,
+            "fmt": settings.PDF_FORMAT,
+            "thread_count": settings.PDF_THREAD_COUNT,
+            "grayscale": settings.PDF_GRAYSCALE,
+            "use_pdftocairo": settings.PDF_USE_PDFTOCAIRO,
+            "output_folder": output_folder,
+            "paths_only": paths_only,
+        }
+        max_pages = settings.PDF_MAX_PAGES
+
+        images = []
+        for first_page, last_page in parse_page_selection(settings.PDF_PAGES):
+            if max_pages:
+                remaining = max_pages - len(images)
+                if remaining <= 0:
+                    break
+                last_allowed = first_page + remaining - 1
+                last_page = min(last_page, last_allowed) if last_page else last_allowed
+            if isinstance(source, str):
+                images.extend(convert_from_path(source, first_page=first_page, last_page=last_page, **options))
+            else:
+                images.extend(convert_from_bytes(source, first_page=first_page, last_page=last_page, **options))
+
+        if not images:
+            raise ValueError("Could not convert PDF to image.")
+        return images
+
+    def _stitch_pages(self, pages: List[Union[Image.Image, str]]) -> Image.Image:
         """
-        Opens an image from bytes.
+        Drops blank/repeated pages, then stitches the rest vertically into one canvas.
+        Pages are images or, when rasterized to disk, file paths; those are decoded
+        one at a time to be checked and again to be pasted, so only the canvas and
+        one page are in memory. Each page is closed once checked or pasted.
+        """
+        page_filter = self._page_filter(len(pages))
+        kept = []
+        first_dropped = None
+        for page in pages:
+            image = Image.open(page) if isinstance(page, str) else page
+            dropped = page_filter is not None and page_filter.check(image)
+            if dropped and first_dropped is None:
+                # Sent anyway if every page is dropped
+                first_dropped = page
+            if isinstance(page, str) or (dropped and page is not first_dropped):
+                image.close()
+            if not dropped:
+                kept.append(page)
+        if not kept:
+            kept = [first_dropped]
+        elif isinstance(first_dropped, Image.Image):
+            first_dropped.close()
+        pages_dropped = len(pages) - len(kept)
+
+        if len(kept) == 1:
+            image = Image.open(kept[0]) if isinstance(kept[0], str) else kept[0]
+            image.load()
+            image.info["pages_dropped"] = pages_dropped
+            return image
+
+        # Stitch images vertically (opening a file only reads its header)
+        sizes, modes = [], set()
+        for page in kept:
+            image = Image.open(page) if isinstance(page, str) else page
+            sizes.append(image.size)
+            modes.add(image.mode)
+            if isinstance(page, str):
+                image.close()
+        total_width = max(width for width, _ in sizes)
+        total_height = sum(height for _, height in sizes)
+        mode = "L" if modes == {"L"} else "RGB"
+        
+        stitched_image = Image.new(mode, (total_width, total_height), "white")
+        stitched_image.info["page_count"] = len(kept)
+        stitched_image.info["pages_dropped"] = pages_dropped
+        
+        y_offset = 0
+        for page, (width, height) in zip(kept, sizes):
+            img = Image.open(page) if isinstance(page, str) else page
+            # Center the image if widths differ (unlikely for standard PDFs but good practice)
+            x_offset = (total_width - width) // 2
+            stitched_image.paste(img, (x_offset, y_offset))
+            y_offset += height
+            img.close()
+            
+        return stitched_image
+
+    def _process_image(self, source: FileSource) -> Image.Image:
+        """
+        Opens an image from bytes, or lazily from a file path. info["upload_bytes"]
+        is the upload's size, the baseline for the payload stats.
         """
         try:
-            image = Image.open(io.BytesIO(file_content))
+            image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+            image.info["upload_bytes"] = os.path.getsize(source) if isinstance(source, str) else len(source)
             return image
         except Exception as e:
             raise ValueError(f"Image processing failed: {str(e)}")
 
 image_processor = ImageProcessor()
+
+def _process_for_model(source: FileSource, filename: str, quality: Optional[dict] = None) -> tuple:
+    """Entry point in pool worker processes (must be a picklable module-level function)"""
+    return image_processor.process_for_model(source, filename, quality)
@@ -0,0 +1,189 @@
+"""
+Worker pool for the asynchronous extraction flow (POST /jobs).
+
+Jobs live in the extraction_jobs table, which doubles as the queue. Each
+worker claims the oldest queued job with a conditional UPDATE, runs it
+through the same pipeline as /extract and saves the extraction row.
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from kyc_extractor.core.config import settings
+from kyc_extractor.db.database import SessionLocal
+from kyc_extractor.db import crud
+from kyc_extractor.services.extraction import extract_document_data, build_extraction_record, ExtractionError, UpstreamUnavailableError
+
+class JobWorkerPool:
+    def __init__(
+        self,
+        num_workers: int = 4,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        max_upstream_attempts: int = 20,
+        retry_delay: float = 30,
+        stale_after: int = 600,
+        session_factory=SessionLocal
+    ):
+        self.num_workers = num_workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_upstream_attempts = max_upstream_attempts
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.session_factory = session_factory
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Requeue orphaned jobs and spawn the workers"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+
+        requeued = await asyncio.to_thread(self._requeue_stale)
+        if requeued:
+            print(f"Requeued {requeued} stale extraction job(s)")
+
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self._prefix}-{i}"))
+            for i in range(self.num_workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers. In-flight jobs are picked up again once they go stale."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was queued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self, worker_id: str = "inline") -> bool:
+        """Claim and run a single job. Returns False if the queue was empty."""
+        job = await asyncio.to_thread(self._claim, worker_id)
+        if job is None:
+            return False
+        await self._run_job(job)
+        return True
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                if await self.run_once(worker_id):
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # DB hiccup while claiming - back off and keep the worker alive
+                print(f"Job worker {worker_id} error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_job(self, job: dict) -> None:
+        start_time = time.time()
+        try:
+            result = await extract_document_data(
+                job["payload"], job["filename"], use_cache=job["use_cache"], pack=settings.PACKING_ENABLED
+            )
+        except ValueError as e:
+            # Unreadable document - retrying won't help
+            await asyncio.to_thread(self._fail, job["job_id"], str(e))
+            return
+        except UpstreamUnavailableError as e:
+            # Quota or outage - keep the document queued until the upstream recovers,
+            # within its own (larger) budget so a job cannot be retried forever
+            error = f"Extraction failed: {str(e)}"
+            if job["attempts"] < self.max_upstream_attempts:
+                delay = max(self.retry_delay, e.retry_after or 0)
+                await asyncio.to_thread(self._requeue, job["job_id"], error, delay)
+            else:
+                await asyncio.to_thread(self._fail, job["job_id"], error)
+            return
+        except Exception as e:
+            error = f"Extraction failed: {str(e)}" if isinstance(e, ExtractionError) else str(e)
+            if job["attempts"] < self.max_attempts:
+                await asyncio.to_thread(self._requeue, job["job_id"], error, self.retry_delay * job["attempts"])
+            else:
+                await asyncio.to_thread(self._fail, job["job_id"], error)
+            return
+
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        request_id = str(uuid.uuid4())
+        db_data = build_extraction_record(
+            result, request_id, job["user_id"], job["filename"], job["file_size_bytes"], processing_time_ms
+        )
+        await asyncio.to_thread(self._save, job["job_id"], db_data)
+
+    # ---- DB helpers, run in threads with their own session ----
+
+    def _claim(self, worker_id: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            job = crud.claim_next_job(db, worker_id)
+            if job is None:
+                return None
+            return {
+                "job_id": job.job_id,
+                "user_id": job.user_id,
+                "filename": job.filename,
+                "file_size_bytes": job.file_size_bytes,
+                "payload": job.payload,
+                "use_cache": job.use_cache if job.use_cache is not None else True,
+                "attempts": job.attempts,
+            }
+        finally:
+            db.close()
+
+    def _save(self, job_id: str, db_data: dict) -> None:
+        db = self.session_factory()
+        try:
+            crud.complete_job(db, job_id, db_data)
+        finally:
+            db.close()
+
+    def _fail(self, job_id: str, error: str) -> None:
+        db = self.session_factory()
+        try:
+            crud.fail_job(db, job_id, error)
+        finally:
+            db.close()
+
+    def _requeue(self, job_id: str, error: str, delay_seconds: float) -> None:
+        db = self.session_factory()
+        try:
+            crud.requeue_job(db, job_id, error, delay_seconds)
+        finally:
+            db.close()
+
+    def _requeue_stale(self) -> int:
+        db = self.session_factory()
+        try:
+            return crud.requeue_stale_jobs(db, datetime.utcnow() - timedelta(seconds=self.stale_after))
+        finally:
+            db.close()
+
+job_worker_pool = JobWorkerPool(
+    num_workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    max_upstream_attempts=settings.JOB_MAX_UPSTREAM_ATTEMPTS,
+    retry_delay=settings.JOB_RETRY_DELAY_SECONDS,
+    stale_after=settings.JOB_STALE_AFTER_SECONDS
+)
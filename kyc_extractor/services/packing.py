@@ -0,0 +1,170 @@
+"""
+Multi-document packing for batch uploads and queued jobs.
+
+Small single-page documents (PAN cards, MSME certificates) cost little to
+extract, so per-call overhead - connection, upstream queueing, the prompt's
+own tokens - dominates. Concurrent extractions hand their prepared payload to
+the packer, which sends up to PACK_MAX_DOCUMENTS of them in one
+generate_content call (GeminiClient.extract_packed_async) and fans the JSON
+entries back out to their callers. A bundle is sent when it is full, when the
+next document would push it over PACK_MAX_BYTES or the PACK_MAX_TOKENS
+estimate, or PACK_MAX_WAIT_MS after its first document arrived.
+
+Documents left out of the reply, and bundles of one, are extracted on their
+own; packed answers that need the cascade's strong model are re-run
+individually on it.
+"""
+import asyncio
+import io
+import math
+from typing import Callable, List, Optional, Union
+from PIL import Image
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client, new_usage
+from kyc_extractor.core.prompts import PACKED_PROMPT
+
+CHARS_PER_TOKEN = 4
+# Gemini bills an image up to 384 px as one tile, larger ones per 768x768 tile
+TOKENS_PER_IMAGE_TILE = 258
+# JSON entry per document in the reply
+OUTPUT_TOKENS_PER_DOCUMENT = 300
+PROMPT_TOKENS = len(PACKED_PROMPT) // CHARS_PER_TOKEN
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    if width <= 384 and height <= 384:
+        return TOKENS_PER_IMAGE_TILE
+    return math.ceil(width / 768) * math.ceil(height / 768) * TOKENS_PER_IMAGE_TILE
+
+def _sent_size(payload: dict, stats: dict) -> tuple:
+    """Pixel size of the prepared image, from the image processor stats when available"""
+    page_stats = stats.get("page_stats") or [stats]
+    size = page_stats[0].get("sent_size")
+    if size:
+        return tuple(size)
+    return Image.open(io.BytesIO(payload["data"])).size
+
+class _Slot:
+    """One document waiting in a bundle"""
+    def __init__(self, payload: dict, size: int, tokens: int, usage: dict):
+        self.payload = payload
+        self.size = size
+        self.tokens = tokens
+        self.usage = usage
+        self.future = asyncio.get_running_loop().create_future()
+        self.bundle_size = 1
+
+class DocumentPacker:
+    """id_is_valid is the cascade's ID check for packed answers (see GeminiClient.extract_data)"""
+    def __init__(self, id_is_valid: Optional[Callable[[dict], bool]] = None):
+        self.id_is_valid = id_is_valid
+        self._bundle: List[_Slot] = []
+        self._bytes = 0
+        self._tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.bundles = 0
+        self.packed_documents = 0
+        # Extracted on their own: bundles of one, entries missing from the reply, unusable replies
+        self.individual = 0
+        self.escalated = 0
+
+    def accepts(self, payload: Union[Image.Image, dict, list], stats: dict) -> bool:
+        """Single-page inline images no larger than PACK_MAX_DOCUMENT_BYTES"""
+        if isinstance(payload, list):
+            if len(payload) != 1:
+                return False
+            payload = payload[0]
+        if not isinstance(payload, dict):
+            return False
+        return len(payload["data"]) <= settings.PACK_MAX_DOCUMENT_BYTES
+
+    async def extract(
+        self,
+        payload: Union[dict, list],
+        stats: dict,
+        usage: Optional[dict] = None
+    ) -> dict:
+        """
+        Extracts an accepted payload as part of the next bundle and returns its
+        result, like GeminiClient.extract_data_async. stats["packed_with"] is
+        set to the number of documents in the call that produced the result.
+        """
+        if isinstance(payload, list):
+            payload = payload[0]
+        usage = usage if usage is not None else new_usage()
+        tokens = estimate_image_tokens(*_sent_size(payload, stats)) + OUTPUT_TOKENS_PER_DOCUMENT
+        slot = _Slot(payload, len(payload["data"]), tokens, usage)
+
+        if self._bundle and (
+            self._bytes + slot.size > settings.PACK_MAX_BYTES
+            or PROMPT_TOKENS + self._tokens + slot.tokens > settings.PACK_MAX_TOKENS
+        ):
+            self._flush()
+        self._bundle.append(slot)
+        self._bytes += slot.size
+        self._tokens += slot.tokens
+        if len(self._bundle) >= settings.PACK_MAX_DOCUMENTS:
+            self._flush()
+        elif len(self._bundle) == 1:
+            self._timer = asyncio.get_running_loop().call_later(settings.PACK_MAX_WAIT_MS / 1000, self._flush)
+
+        result, escalation_reason = await slot.future
+        stats["packed_with"] = slot.bundle_size
+        if result is None:
+            self.individual += 1
+            stats["packed_with"] = 1
+            return await gemini_client.extract_data_async(payload, id_is_valid=self.id_is_valid, usage=usage)
+        if escalation_reason:
+            self.escalated += 1
+            return await gemini_client.extract_data_async(
+                payload, id_is_valid=self.id_is_valid, usage=usage, escalated_for=escalation_reason
+            )
+        return result
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        bundle, self._bundle = self._bundle, []
+        self._bytes = self._tokens = 0
+        if not bundle:
+            return
+        if len(bundle) == 1:
+            # The packed prompt only pays off for two or more documents
+            bundle[0].future.set_result((None, None))
+            return
+        task = asyncio.get_running_loop().create_task(self._send(bundle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, bundle: List[_Slot]) -> None:
+        self.bundles += 1
+        self.packed_documents += len(bundle)
+        try:
+            results = await gemini_client.extract_packed_async(
+                [slot.payload for slot in bundle],
+                id_is_valid=self.id_is_valid,
+                usages=[slot.usage for slot in bundle],
+                estimated_tokens=PROMPT_TOKENS + sum(slot.tokens for slot in bundle)
+            )
+        except Exception as e:
+            for slot in bundle:
+                if not slot.future.done():
+                    slot.future.set_exception(e)
+            return
+        for slot, outcome in zip(bundle, results):
+            slot.bundle_size = len(bundle)
+            if not slot.future.done():
+                slot.future.set_result(outcome)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.PACKING_ENABLED,
+            "bundles": self.bundles,
+            "packed_documents": self.packed_documents,
+            "avg_bundle_size": round(self.packed_documents / self.bundles, 2) if self.bundles else None,
+            "individual": self.individual,
+            "escalated": self.escalated,
+            "waiting": len(self._bundle),
+        }
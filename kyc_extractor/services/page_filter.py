@@ -0,0 +1,110 @@
+"""
+Page filtering for multi-page documents.
+
+Drops near-blank pages (ink coverage) and repeats of an earlier page before
+they are encoded and sent to the model. The blank check runs on a small
+grayscale thumbnail of each page, so it costs a few milliseconds regardless of
+the rasterization DPI. By default a page only counts as a repeat when its
+pixels match an earlier page exactly: pages built from the same template (GST
+REG-06 annexures, say) look alike to a perceptual hash but carry different
+data. Matching rescans by difference hash is opt-in (duplicate_max_distance).
+"""
+import hashlib
+from typing import List, Optional
+import numpy as np
+from PIL import Image
+from kyc_extractor.core.config import settings
+
+BLANK = "blank"
+DUPLICATE = "duplicate"
+
+def page_thumbnail(image: Image.Image, max_edge: int = 256) -> np.ndarray:
+    """Grayscale thumbnail of the page as a float32 array in 0..255"""
+    factor = max(1, max(image.size) // max_edge)
+    thumbnail = image.reduce(factor) if factor > 1 else image
+    if thumbnail.mode != "L":
+        thumbnail = thumbnail.convert("L")
+    return np.asarray(thumbnail, dtype=np.float32)
+
+def ink_coverage(gray: np.ndarray, margin: float = 0.05, contrast: float = 25) -> float:
+    """
+    Fraction of pixels noticeably darker than the paper. The paper level is the
+    median, so tinted or grey scans of an empty page still read as blank;
+    the outer margin is ignored because scanner edges and punch holes are dark.
+    """
+    h, w = gray.shape
+    dy, dx = int(h * margin), int(w * margin)
+    body = gray[dy:h - dy or None, dx:w - dx or None]
+    if body.size == 0:
+        return 0.0
+    return float(np.count_nonzero(body < np.median(body) - contrast)) / body.size
+
+def difference_hash(gray: np.ndarray, hash_size: int = 16, tolerance: float = 1.0) -> np.ndarray:
+    """
+    dHash as a flat boolean array of hash_size**2 bits: whether each cell of a
+    (hash_size x hash_size+1) box-averaged grid is brighter than its right neighbour.
+    Differences within `tolerance` grey levels count as equal, so scanner noise
+    on empty paper doesn't flip bits.
+    """
+    rows = np.array_split(np.arange(gray.shape[0]), hash_size)
+    cols = np.array_split(np.arange(gray.shape[1]), hash_size + 1)
+    row_sums = np.add.reduceat(gray, [r[0] for r in rows], axis=0)
+    grid = np.add.reduceat(row_sums, [c[0] for c in cols], axis=1)
+    grid /= np.outer([len(r) for r in rows], [len(c) for c in cols])
+    return (grid[:, 1:] - grid[:, :-1] > tolerance).ravel()
+
+class PageFilter:
+    """
+    Stateful per-document filter: check() each page in order and it returns
+    the reason to drop it, or None to keep it.
+    """
+    def __init__(
+        self,
+        blank_max_ink: float = 0.0003,
+        duplicate_max_distance: float = 0.0,
+        hash_size: int = 16,
+        thumbnail_edge: int = 256
+    ):
+        self.blank_max_ink = blank_max_ink
+        self.duplicate_max_distance = duplicate_max_distance
+        self.hash_size = hash_size
+        self.thumbnail_edge = thumbnail_edge
+        self._kept_digests = set()
+        self._kept_hashes: List[np.ndarray] = []
+        self.dropped = {BLANK: 0, DUPLICATE: 0}
+
+    @classmethod
+    def from_settings(cls) -> "PageFilter":
+        return cls(
+            blank_max_ink=settings.PAGE_BLANK_MAX_INK,
+            duplicate_max_distance=settings.PAGE_DUPLICATE_MAX_DISTANCE,
+        )
+
+    def check(self, image: Image.Image) -> Optional[str]:
+        gray = page_thumbnail(image, self.thumbnail_edge)
+
+        if ink_coverage(gray) <= self.blank_max_ink:
+            self.dropped[BLANK] += 1
+            return BLANK
+
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+        if digest in self._kept_digests:
+            self.dropped[DUPLICATE] += 1
+            return DUPLICATE
+
+        if self.duplicate_max_distance > 0:
+            page_hash = difference_hash(gray, self.hash_size)
+            if self._kept_hashes:
+                # Normalized Hamming distance to every kept page in one pass
+                distances = np.count_nonzero(np.stack(self._kept_hashes) != page_hash, axis=1) / page_hash.size
+                if distances.min() <= self.duplicate_max_distance:
+                    self.dropped[DUPLICATE] += 1
+                    return DUPLICATE
+            self._kept_hashes.append(page_hash)
+
+        self._kept_digests.add(digest)
+        return None
+
+    @property
+    def dropped_total(self) -> int:
+        return self.dropped[BLANK] + self.dropped[DUPLICATE]
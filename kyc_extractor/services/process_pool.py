@@ -0,0 +1,123 @@
+"""
+Process pool for CPU-bound image work (rasterization, filtering, re-encoding).
+
+Running these in threads holds the GIL for long stretches and slows down
+request handling in the same uvicorn worker; in separate processes they use
+other cores instead. The pool admits at most workers + queue_size tasks;
+callers beyond that wait up to queue_timeout and then get PoolBusyError.
+Workers are replaced after max_tasks_per_worker tasks so memory held by
+poppler/PIL fragmentation is returned to the OS.
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+class PoolBusyError(RuntimeError):
+    """Queue is full; the caller should retry later"""
+
+def _timed_call(fn: Callable, args: tuple) -> tuple:
+    """Runs in the worker process; reports when the task actually started"""
+    started_at = time.time()
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, started_at, time.perf_counter() - start
+
+class ProcessPool:
+    def __init__(
+        self,
+        max_workers: int = 2,
+        queue_size: int = 8,
+        queue_timeout: float = 30.0,
+        max_tasks_per_worker: int = 50,
+        start_method: str = "spawn",
+        sample_size: int = 500
+    ):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.start_method = start_method
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        # Recent (queue_wait, compute) samples in seconds
+        self._samples = deque(maxlen=sample_size)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            options = {"max_workers": self.max_workers, "mp_context": multiprocessing.get_context(self.start_method)}
+            if self.max_tasks_per_worker and sys.version_info >= (3, 11):
+                options["max_tasks_per_child"] = self.max_tasks_per_worker
+            self._executor = ProcessPoolExecutor(**options)
+        return self._executor
+
+    async def run(self, fn: Callable, *args) -> tuple:
+        """
+        Runs fn(*args) in a worker process; fn and its arguments must be picklable.
+        Returns (result, timings) where timings has queue_wait_ms and compute_ms.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.queue_size)
+
+        submitted_at = time.time()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout or None)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolBusyError(f"Image processing queue is full ({self.max_workers + self.queue_size} tasks)")
+
+        self.submitted += 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, started_at, compute = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self.completed += 1
+        queue_wait = max(0.0, started_at - submitted_at)
+        self._samples.append((queue_wait, compute))
+        return result, {"queue_wait_ms": round(queue_wait * 1000, 1), "compute_ms": round(compute * 1000, 1)}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        def summary(values) -> dict:
+            if not values:
+                return {"avg_ms": None, "p95_ms": None, "max_ms": None}
+            ordered = sorted(values)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+
+        return {
+            "max_workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "max_tasks_per_worker": self.max_tasks_per_worker,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_wait": summary([wait for wait, _ in self._samples]),
+            "compute": summary([compute for _, compute in self._samples]),
+        }
@@ -0,0 +1,136 @@
+"""
+Pre-flight image quality analysis.
+
+Cheap local checks run before a document is sent to the model: sharpness
+(variance of the Laplacian), resolution and estimated DPI, contrast and skew.
+Everything is computed with NumPy on a grayscale working copy whose long edge
+is at most 1024 px, so scores are comparable across input sizes and a page
+costs a few tens of milliseconds.
+"""
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image
+from kyc_extractor.core.config import settings
+
+# Long edge of an A4 page in inches, used when the file carries no DPI
+A4_LONG_EDGE_INCHES = 11.69
+
+# Issues that make a document unreadable (rejected in 'reject' mode);
+# the rest are only flagged
+REJECT_ISSUES = {"blurry", "low_resolution", "low_contrast"}
+
+class QualityRejectedError(ValueError):
+    """Document failed the quality gate; not worth a model call"""
+    def __init__(self, message: str, report: Optional[dict] = None):
+        super().__init__(message)
+        self.report = report
+
+    def __reduce__(self):
+        # Keep the report when raised in an image pool worker process
+        return (self.__class__, (str(self), self.report))
+
+def working_gray(image: Image.Image, max_edge: int = 1024) -> np.ndarray:
+    """Grayscale copy as float32, box-downscaled so the long edge is at most max_edge"""
+    # Integer reduce first so the color conversion runs on fewer pixels
+    reduce_factor = int(max(image.size) // max_edge)
+    gray = image.reduce(reduce_factor) if reduce_factor > 1 else image
+    gray = gray if gray.mode == "L" else gray.convert("L")
+    factor = max(gray.size) / max_edge
+    if factor > 1:
+        gray = gray.resize((max(1, round(gray.width / factor)), max(1, round(gray.height / factor))), Image.BOX)
+    return np.asarray(gray, dtype=np.float32)
+
+def sharpness(gray: np.ndarray, tile: int = 32) -> float:
+    """
+    Variance of the Laplacian, averaged over the 10% most detailed tiles.
+    Documents are mostly empty paper, so a whole-image variance would mostly
+    measure how much text there is rather than how sharp it is.
+    """
+    if min(gray.shape) < 3:
+        return 0.0
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4 * gray[1:-1, 1:-1]
+    )
+    h, w = laplacian.shape
+    tile = min(tile, h, w)
+    th, tw = h // tile, w // tile
+    tiles = laplacian[:th * tile, :tw * tile].reshape(th, tile, tw, tile).var(axis=(1, 3)).ravel()
+    top = np.sort(tiles)[-max(1, tiles.size // 10):]
+    return float(top.mean())
+
+def contrast(gray: np.ndarray) -> float:
+    """Grey levels between the paper (median) and the darkest 0.1% of pixels"""
+    return float(np.median(gray) - np.percentile(gray, 0.1))
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 15.0, max_points: int = 20000) -> Optional[float]:
+    """
+    Text line angle in degrees (positive = counter-clockwise) by projection
+    profiles: ink pixels are projected onto the vertical axis for each candidate
+    angle and the angle with the most peaked histogram wins. All angles are
+    scored in one vectorized bincount, then refined around the best one.
+    Returns None when there is too little ink to tell.
+    """
+    ys, xs = np.nonzero(gray < np.median(gray) - 40)
+    if ys.size < 50:
+        return None
+    if ys.size > max_points:
+        keep = np.random.default_rng(0).choice(ys.size, max_points, replace=False)
+        ys, xs = ys[keep], xs[keep]
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32) - gray.shape[1] / 2
+
+    def best_angle(angles: np.ndarray) -> float:
+        radians = np.deg2rad(angles)[:, None]
+        projected = np.rint(ys[None, :] * np.cos(radians) + xs[None, :] * np.sin(radians)).astype(np.int64)
+        projected -= projected.min()
+        bins = int(projected.max()) + 1
+        offsets = np.arange(len(angles))[:, None] * bins
+        counts = np.bincount((projected + offsets).ravel(), minlength=len(angles) * bins).reshape(len(angles), bins)
+        return float(angles[np.argmax((counts.astype(np.float64) ** 2).sum(axis=1))])
+
+    coarse = best_angle(np.arange(-max_angle, max_angle + 0.01, 1.0))
+    # + 0.0 turns -0.0 into 0.0
+    return round(best_angle(np.arange(coarse - 1.0, coarse + 1.01, 0.1)), 1) + 0.0
+
+def analyze_image(image: Image.Image, dpi: Optional[float] = None, size: Optional[Tuple[int, int]] = None) -> dict:
+    """
+    Quality metrics and issues for one page. dpi is the known rendering DPI
+    (PDF rasterization); otherwise it comes from the file or is estimated
+    assuming an A4 page. size overrides image.size when the image was opened
+    in JPEG draft mode.
+    """
+    width, height = size or image.size
+    dpi_source = "rasterized"
+    if dpi is None:
+        file_dpi = image.info.get("dpi")
+        if file_dpi and file_dpi[0] and float(file_dpi[0]) >= 50:
+            dpi, dpi_source = float(file_dpi[0]), "file"
+        else:
+            dpi, dpi_source = max(width, height) / A4_LONG_EDGE_INCHES, "estimated_a4"
+
+    gray = working_gray(image)
+    metrics = {
+        "width": width,
+        "height": height,
+        "dpi": round(float(dpi)),
+        "dpi_source": dpi_source,
+        "sharpness": round(sharpness(gray), 1),
+        "contrast": round(contrast(gray), 1),
+        "skew_degrees": estimate_skew(gray),
+    }
+
+    issues = []
+    if metrics["sharpness"] < settings.QUALITY_MIN_SHARPNESS:
+        issues.append("blurry")
+    if min(width, height) < settings.QUALITY_MIN_SHORT_EDGE:
+        issues.append("low_resolution")
+    if metrics["dpi"] < settings.QUALITY_MIN_DPI:
+        issues.append("low_dpi")
+    if metrics["contrast"] < settings.QUALITY_MIN_CONTRAST:
+        issues.append("low_contrast")
+    if metrics["skew_degrees"] is not None and abs(metrics["skew_degrees"]) > settings.QUALITY_MAX_SKEW_DEGREES:
+        issues.append("skewed")
+
+    metrics["issues"] = issues
+    metrics["status"] = "rejected" if REJECT_ISSUES.intersection(issues) else ("flagged" if issues else "ok")
+    return metrics
@@ -0,0 +1,76 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one execution of the
+underlying coroutine; the first caller runs it, the rest await its outcome.
+Used in front of the Gemini call so identical in-flight uploads (double
+clicks, duplicate files in a batch) cost one model invocation.
+"""
+import asyncio
+import copy
+from typing import Awaitable, Callable, Dict, Hashable
+
+class LeaderCancelled(Exception):
+    """Set on a flight whose running caller was cancelled; waiting callers retry"""
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.takeovers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        Run fn() unless a call for `key` is already in flight, in which case
+        wait for that call instead. Every caller gets its own deep copy of the
+        result (or the same exception), so callers may mutate what they receive.
+        If the caller running fn() is cancelled (e.g. its client disconnected),
+        the waiting callers are not: one of them runs its own fn() instead.
+        """
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except LeaderCancelled:
+                # Waiters that retried after the running caller was cancelled
+                self.takeovers += 1
+                continue
+            except Exception:
+                self.coalesced += 1
+                raise
+            self.coalesced += 1
+            return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Wake the waiters without cancelling them
+            future.set_exception(LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so asyncio doesn't warn when nobody was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "takeovers": self.takeovers,
+        }
+
+extraction_flights = SingleFlight()
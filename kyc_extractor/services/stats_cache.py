@@ -0,0 +1,214 @@
+"""
+Short-lived cache for the /stats responses (dashboard, processing time, usage).
+
+Entries are keyed by endpoint, role and user scope (one user, or "all" for
+admins), so every admin shares one dashboard while users only ever get their
+own figures. crud.create_extraction and update_extraction invalidate the
+written row's user scope and the "all" scope once they commit, so the TTL only
+bounds staleness from writes made by other API processes. Concurrent misses
+for the same key are coalesced: one caller runs the query, the rest wait for
+its result.
+
+Storage goes through a backend object (get / set / delete_scope / clear /
+__len__); MemoryStatsBackend keeps entries in-process, a shared backend can
+be passed to StatsCache instead.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from kyc_extractor.core.config import settings
+
+ALL_SCOPE = "all"
+
+@dataclass(frozen=True)
+class StatsKey:
+    endpoint: str
+    role: str
+    scope: Hashable
+    params: Tuple = ()
+
+def stats_scope(user_id: Optional[int], role: str) -> Hashable:
+    """The rows a caller sees, as crud applies RBAC: admins (and callers without a user) see all"""
+    return user_id if role != "admin" and user_id else ALL_SCOPE
+
+class MemoryStatsBackend:
+    """In-process LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (expires_at monotonic, value)
+        self._entries: "OrderedDict[StatsKey, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: StatsKey) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: StatsKey, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_scope(self, scope: Hashable) -> int:
+        """Drops every entry of `scope`, returns entries dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if key.scope == scope]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+class StatsCache:
+    def __init__(
+        self,
+        enabled: bool = True,
+        ttl_seconds: float = 15,
+        backend=None,
+        sample_size: int = 256
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend if backend is not None else MemoryStatsBackend()
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[StatsKey, _Flight] = {}
+        # Bumped on invalidation (per scope) and clear (epoch); a recompute
+        # that overlapped either is returned but not stored
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        # Recompute durations in seconds
+        self._samples = deque(maxlen=sample_size)
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def make_key(self, endpoint: str, user_id: Optional[int], role: str, *params) -> StatsKey:
+        return StatsKey(endpoint=endpoint, role=role, scope=stats_scope(user_id, role), params=params)
+
+    def get_or_compute(self, endpoint: str, user_id: Optional[int], role: str, compute: Callable[[], Any], *params):
+        """
+        Returns the cached response for (endpoint, role, scope, params), or runs
+        compute() and caches what it returns. While one caller is computing a
+        key, other callers for it block until that result (or exception) is ready.
+        Cached values are shared between callers and must not be mutated.
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.make_key(endpoint, user_id, role, *params)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is None:
+                # Stored by a recompute that finished since the lookup above
+                value = self.backend.get(key)
+                if value is None:
+                    leader = _Flight()
+                    self._in_flight[key] = leader
+                    generation = self._generation(key.scope)
+
+        if flight is not None:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except BaseException as e:
+            leader.error = e
+            raise
+        else:
+            self._samples.append(time.perf_counter() - start)
+            leader.value = value
+            with self._lock:
+                if self._generation(key.scope) == generation:
+                    self.backend.set(key, value, self.ttl_seconds)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            leader.done.set()
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drops the responses that include rows of `user_id`: that user's own and the "all" scope"""
+        scopes = [ALL_SCOPE] + ([user_id] if user_id else [])
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+                self.backend.delete_scope(scope)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drops every response, e.g. after the rollups were rebuilt"""
+        with self._lock:
+            self._epoch += 1
+            self.backend.clear()
+        self.invalidations += 1
+
+    def _generation(self, scope: Hashable) -> tuple:
+        return self._epoch, self._generations.get(scope, 0)
+
+    def stats(self) -> dict:
+        # Coalesced callers are answered without running their own query
+        served = self.hits + self.coalesced
+        lookups = served + self.misses
+        ordered = sorted(self._samples)
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self.backend),
+            "in_flight": len(self._in_flight),
+            "ttl_seconds": self.ttl_seconds,
+            "recompute": {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else None,
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1) if ordered else None,
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            },
+        }
+
+stats_cache = StatsCache(
+    enabled=settings.STATS_CACHE_ENABLED,
+    ttl_seconds=settings.STATS_CACHE_TTL_SECONDS,
+    backend=MemoryStatsBackend(max_entries=settings.STATS_CACHE_MAX_ENTRIES)
+)
@@ -0,0 +1,240 @@
+"""
+Text-layer fast path for born-digital PDFs.
+
+GST certificates and MCA incorporation certificates are usually generated
+PDFs with a full text layer. Reading that text takes milliseconds, so the
+pipeline tries it before rasterizing:
+- text_local: the ID (matched with the IDValidator patterns), company name
+  and address with a valid pincode are all found, so the result is built
+  locally without a model call;
+- text_prompt: there is enough text, but not everything could be parsed, so
+  the text alone is sent to the model (far fewer tokens than page images);
+- image: no usable text layer; the normal rasterize-and-send path.
+"""
+import io
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pypdf import PdfReader
+from kyc_extractor.core.config import settings
+from kyc_extractor.validators import IDValidator
+
+TEXT_LOCAL = "text_local"
+TEXT_PROMPT = "text_prompt"
+IMAGE = "image"
+
+def _unanchored(pattern: str) -> re.Pattern:
+    """IDValidator patterns match a whole value; find them inside running text instead"""
+    return re.compile(r"\b" + pattern.lstrip("^").rstrip("$") + r"\b")
+
+GSTIN_SEARCH = _unanchored(IDValidator.GSTIN_PATTERN)
+PAN_SEARCH = _unanchored(IDValidator.PAN_PATTERN)
+CIN_SEARCH = _unanchored(IDValidator.CIN_PATTERN)
+PINCODE_SEARCH = re.compile(r"(?<!\d)(\d{6})(?!\d)")
+
+# Field labels as printed on GST REG-06, MCA and Udyam certificates (longest first)
+LABELS = {
+    "company_name": ["Legal Name of Business", "Legal Name", "Name of the Company", "Name of Enterprise", "Name of Business"],
+    "trade_name": ["Trade Name, if any", "Trade Name"],
+    "address": ["Address of Principal Place of Business", "Registered Office Address", "Official Address of Enterprise", "Address"],
+    "issue_date": ["Date of Liability", "Date of Incorporation", "Date of Registration", "Date of Issue"],
+}
+ALL_LABELS = sorted((label for labels in LABELS.values() for label in labels), key=len, reverse=True)
+
+# "I hereby certify that <NAME> is incorporated on this <day> day of <Month>, <year>"
+INCORPORATION_SENTENCE = re.compile(
+    r"certify that\s+(.+?)\s+is incorporated on\s+(?:this\s+)?([A-Za-z\-]+|\d{1,2})(?:st|nd|rd|th)?\s+day of\s+([A-Za-z]+),?\s+(\d{4})",
+    re.IGNORECASE | re.DOTALL
+)
+ORDINAL_DAYS = {
+    word: day for day, word in enumerate([
+        "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth",
+        "eleventh", "twelfth", "thirteenth", "fourteenth", "fifteenth", "sixteenth", "seventeenth",
+        "eighteenth", "nineteenth", "twentieth", "twenty-first", "twenty-second", "twenty-third",
+        "twenty-fourth", "twenty-fifth", "twenty-sixth", "twenty-seventh", "twenty-eighth",
+        "twenty-ninth", "thirtieth", "thirty-first",
+    ], start=1)
+}
+
+STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana",
+    "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Andaman and Nicobar Islands", "Chandigarh",
+    "Dadra and Nagar Haveli and Daman and Diu", "Delhi", "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry",
+]
+
+# Phrases printed on each certificate type, for classifying text-layer PDFs without a model call
+TYPE_MARKERS = [
+    ("MSME", re.compile(r"\bUDYAM\b|Udyam Registration", re.IGNORECASE)),
+    ("FSSAI", re.compile(r"\bFSSAI\b|Food Safety and Standards", re.IGNORECASE)),
+    ("GST_CERTIFICATE", re.compile(r"GST REG-06|Goods and Services Tax|\bGSTIN\b", re.IGNORECASE)),
+    ("INCORPORATION_CERT", re.compile(r"Certificate of Incorporation|Corporate Identity Number", re.IGNORECASE)),
+    ("SHOP_ESTABLISHMENT", re.compile(r"Shops? (?:and|&) Establishments?", re.IGNORECASE)),
+    ("PAN_CARD", re.compile(r"Permanent Account Number|Income Tax Department", re.IGNORECASE)),
+]
+
+# The ID each locally parsed type is identified by; other types always go to the model
+ID_SEARCH = {
+    "GST_CERTIFICATE": GSTIN_SEARCH,
+    "INCORPORATION_CERT": CIN_SEARCH,
+    "PAN_CARD": PAN_SEARCH,
+}
+
+def classify_text(text: str) -> Optional[str]:
+    """Document type from a PDF's text (first matching marker, then ID patterns); None when unsure"""
+    for document_type, marker in TYPE_MARKERS:
+        if marker.search(text):
+            return document_type
+    if GSTIN_SEARCH.search(text):
+        return "GST_CERTIFICATE"
+    if CIN_SEARCH.search(text):
+        return "INCORPORATION_CERT"
+    return None
+
+def read_text_layer(source, max_pages: int = 5) -> str:
+    """Text of the first max_pages pages (bytes or path); empty when the PDF has no text layer"""
+    reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+    pages = reader.pages[:max_pages] if max_pages else reader.pages
+    return "\n".join(page.extract_text() or "" for page in pages)
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = re.sub(r"\s+", " ", value).strip(" :-,.")
+    return value or None
+
+def _labelled_value(lines: List[str], labels: List[str], multiline: bool = False) -> Optional[str]:
+    """
+    Value printed after a label on the same line (or the next line when the label
+    stands alone). multiline keeps reading until the next known label or the line with a pincode.
+    """
+    for label in labels:
+        pattern = re.compile(r"^(?:\d+\.\s*)?" + re.escape(label) + r"\b\s*[:\-]?\s*(.*)$", re.IGNORECASE)
+        for i, line in enumerate(lines):
+            match = pattern.match(line.strip())
+            if not match:
+                continue
+            parts = [match.group(1)] if match.group(1) else []
+            for following in lines[i + 1:]:
+                if parts and (not multiline or PINCODE_SEARCH.search(parts[-1])):
+                    break
+                if any(re.match(r"^(?:\d+\.\s*)?" + re.escape(other) + r"\b", following.strip(), re.IGNORECASE) for other in ALL_LABELS):
+                    break
+                if following.strip():
+                    parts.append(following)
+            value = _clean(" ".join(parts))
+            if value:
+                return value
+    return None
+
+def _parse_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%d %B %Y", "%d %b %Y"):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def _split_address(full_address: str) -> dict:
+    pincode_match = PINCODE_SEARCH.findall(full_address)
+    pincode = pincode_match[-1] if pincode_match else None
+    state = next((s for s in sorted(STATES, key=len, reverse=True) if re.search(r"\b" + re.escape(s) + r"\b", full_address, re.IGNORECASE)), None)
+
+    segments = [_clean(part) for part in full_address.split(",")]
+    segments = [part for part in segments if part and not (state and part.lower().startswith(state.lower())) and part != pincode]
+    # Drop a trailing "<state> <pincode>"/"<pincode>" fragment already captured
+    segments = [PINCODE_SEARCH.sub("", part).strip() or part for part in segments]
+
+    city = segments[-1] if len(segments) >= 2 else None
+    return {
+        "full_address": full_address,
+        "address_line_1": segments[0] if segments else None,
+        "locality": (", ".join(segments[1:-1]) or None) if len(segments) > 2 else None,
+        "city": city,
+        "state": state,
+        "pincode": pincode,
+    }
+
+def parse_text_layer(text: str) -> dict:
+    """
+    Best-effort result in the model's output format from a PDF's text. The
+    type comes from classify_text and the ID from that type's pattern only, so
+    an FSSAI or Udyam certificate printing the holder's GSTIN keeps its type
+    and is left without an ID (incomplete, so it goes to the model).
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+
+    company_name = _labelled_value(lines, LABELS["company_name"])
+    issue_date = _parse_date(_labelled_value(lines, LABELS["issue_date"]))
+
+    document_type = classify_text(text) or "OTHER"
+    id_search = ID_SEARCH.get(document_type)
+    id_match = id_search.search(text) if id_search else None
+    identification_number = id_match.group(0) if id_match else None
+    if document_type == "INCORPORATION_CERT":
+        sentence = INCORPORATION_SENTENCE.search(text)
+        if sentence:
+            day = ORDINAL_DAYS.get(sentence.group(2).lower(), sentence.group(2))
+            company_name = company_name or _clean(sentence.group(1))
+            issue_date = issue_date or _parse_date(f"{day} {sentence.group(3)} {sentence.group(4)}")
+
+    full_address = _labelled_value(lines, LABELS["address"], multiline=True)
+    address = _split_address(full_address) if full_address else {
+        "full_address": None, "address_line_1": None, "locality": None, "city": None, "state": None, "pincode": None
+    }
+
+    return {
+        "document_type": document_type,
+        "data": {
+            "company_name": company_name,
+            "trade_name": _labelled_value(lines, LABELS["trade_name"]),
+            "identification_number": identification_number,
+            "address": address,
+            "issue_date": issue_date,
+            "approver_name": None,
+        },
+        "confidence": settings.TEXT_LAYER_LOCAL_CONFIDENCE,
+        "confidence_reason": "Extracted from the PDF text layer without a model call",
+    }
+
+def is_complete(result: dict) -> bool:
+    """Everything the quality score looks at is present and the ID/pincode validate"""
+    data = result["data"]
+    validators = {
+        "GST_CERTIFICATE": IDValidator.validate_gstin,
+        "INCORPORATION_CERT": IDValidator.validate_cin,
+        "PAN_CARD": IDValidator.validate_pan,
+    }
+    validate = validators.get(result["document_type"])
+    return bool(
+        validate
+        and validate(data["identification_number"])["valid"]
+        and data["company_name"]
+        and data["address"]["full_address"]
+        and IDValidator.validate_pincode(data["address"]["pincode"])["valid"]
+    )
+
+def choose_path(source) -> Tuple[str, Optional[str], Optional[dict]]:
+    """
+    Reads the text layer and picks the extraction path.
+    Returns (path, text, local_result); text is set for the text paths and
+    local_result only for text_local.
+    """
+    try:
+        text = read_text_layer(source, settings.TEXT_LAYER_MAX_PAGES)
+    except Exception as e:
+        print(f"⚠️ Could not read PDF text layer: {e}")
+        return IMAGE, None, None
+
+    if len(text.strip()) < settings.TEXT_LAYER_MIN_CHARS:
+        return IMAGE, None, None
+
+    if settings.TEXT_LAYER_LOCAL_ENABLED:
+        result = parse_text_layer(text)
+        if is_complete(result):
+            return TEXT_LOCAL, text, result
+
+    return TEXT_PROMPT, text[:settings.TEXT_LAYER_MAX_CHARS], None
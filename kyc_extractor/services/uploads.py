@@ -0,0 +1,180 @@
+"""
+Streaming upload ingestion.
+
+Starlette already spools each multipart file while parsing the request: in
+memory up to UPLOAD_SPOOL_MAX_MEMORY_BYTES, then in an unnamed temp file.
+read_upload hashes and size-checks that spool in place, chunk by chunk, and
+hands the image and PDF stages either the bytes (small files) or a path to
+the same temp file (through /proc on Linux), so a large upload is not copied
+a second time. That path is only valid until the UploadFile is closed.
+
+BodySizeLimitMiddleware caps the whole request body of the upload routes
+before and while it is received, so an oversized request is cut off even
+when it is sent chunked, without a Content-Length.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, List, Optional, Tuple, Union
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+from kyc_extractor.core.config import settings
+
+class UploadTooLargeError(ValueError):
+    """Upload exceeds MAX_UPLOAD_BYTES"""
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"File '{filename}' exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+class SpooledUpload:
+    def __init__(self, filename: str, max_bytes: int = 0, in_memory: bool = True):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        # Chunks are kept only while the spool is in memory; on disk the spool file is the copy
+        self._chunks: Optional[List[bytes]] = [] if in_memory else None
+        self._content: Optional[bytes] = None
+        self.path: Optional[str] = None
+        # Set when the path is a copy made by this upload (no /proc), deleted on close
+        self._owns_path = False
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadTooLargeError(self.filename, self.max_bytes)
+        self._sha256.update(chunk)
+        if self._chunks is not None:
+            self._chunks.append(chunk)
+
+    def finish(self, spool=None) -> None:
+        """Joins in-memory chunks, or gives the on-disk spool file a path"""
+        if self._chunks is not None:
+            self._content = b"".join(self._chunks)
+            self._chunks = None
+        else:
+            self.path, self._owns_path = _spool_path(spool)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """What ImageProcessor reads: the bytes for small uploads, otherwise the temp file path"""
+        return self._content if self.in_memory else self.path
+
+    def read_bytes(self) -> bytes:
+        if self.in_memory:
+            return self._content
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        if self._owns_path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self._content = None
+        self._chunks = None
+
+def _spool_path(spool) -> Tuple[str, bool]:
+    """
+    Returns (path, copied) for the contents of a rolled-over SpooledTemporaryFile.
+    Its backing temp file has no name; on Linux it is reopened through this
+    process's /proc fd entry (which pool workers and pdftoppm can open too),
+    elsewhere it is copied once to a named temp file.
+    """
+    spool.flush()
+    try:
+        path = f"/proc/{os.getpid()}/fd/{spool.fileno()}"
+        if os.path.exists(path):
+            return path, False
+    except (OSError, ValueError):
+        pass
+    spool.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="kyc-upload-", delete=False) as f:
+        shutil.copyfileobj(spool, f, settings.UPLOAD_CHUNK_BYTES)
+    return f.name, True
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> SpooledUpload:
+    """
+    Hashes and size-checks an UploadFile where Starlette spooled it.
+    Raises UploadTooLargeError as soon as the size is known to exceed max_bytes,
+    without reading the rest of the file. The caller closes the returned upload
+    (and the UploadFile, which owns the spool).
+    """
+    max_bytes = settings.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+
+    # Multipart parsing already knows the size; reject before reading anything
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(file.filename, max_bytes)
+
+    # SpooledTemporaryFile._rolled, as checked by UploadFile itself
+    on_disk = getattr(file.file, "_rolled", False)
+    upload = SpooledUpload(file.filename, max_bytes, in_memory=not on_disk)
+    try:
+        await file.seek(0)
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            upload.write(chunk)
+        upload.finish(file.file)
+    except Exception:
+        upload.close()
+        raise
+    return upload
+
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI middleware capping the request body of selected routes.
+    limit_for(path) returns the cap in bytes for a POST to that path (0: no cap);
+    it is called per request so the limits follow runtime settings. A declared
+    Content-Length over the cap is answered with 413 before the body is read;
+    otherwise the bytes actually received are counted and the request fails
+    with 413 as soon as they pass the cap. Other requests pass straight through.
+    """
+    def __init__(self, app, limit_for: Callable[[str], int]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limit_for(scope["path"])
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload exceeds the maximum request size of {limit // (1024 * 1024)} MB"
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside request parsing, which passes HTTPException through
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark /extract throughput with 1, 10 and 50 concurrent clients.
+
+Uses a fake Gemini model that injects a fixed latency, so the numbers show how
+well a single worker overlaps in-flight extractions rather than Gemini speed.
+'blocking' mode sleeps synchronously inside the model call, which is what the
+endpoints did before the async client; 'async' mode awaits the model.
+
+Usage:
+    python scripts/benchmark_async_extraction.py --latency 0.5 --requests 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmark_common import FakeGeminiModel, make_sample_image, setup_sqlite_app, make_client, percentile
+
+from kyc_extractor.main import app
+from kyc_extractor.core.gemini import gemini_client
+
+async def run_clients(client, payload: bytes, concurrency: int, total_requests: int):
+    latencies = []
+    health_latencies = []
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await client.post("/extract", files={"file": ("bench.png", payload, "image/png")})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"Extraction failed: {response.status_code} {response.text}")
+
+    async def probe_health():
+        # /health latency while extractions are in flight
+        while not queue.empty():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(probe_health(), *(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, health_latencies
+
+async def main(latency: float, total_requests: int, levels):
+    setup_sqlite_app(app)
+    payload = make_sample_image(620, 877)
+
+    print(f"📊 /extract throughput, fake model latency {latency * 1000:.0f} ms, {total_requests} requests per run\n")
+    print(f"{'mode':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'health p95 ms':>15}")
+
+    async with make_client(app) as client:
+        for mode in ("blocking", "async"):
+            for concurrency in levels:
+                gemini_client.model = FakeGeminiModel(latency=latency, blocking=(mode == "blocking"))
+                # Blocking mode serializes everything - keep the run short
+                requests_for_run = min(total_requests, max(concurrency, 10)) if mode == "blocking" else total_requests
+                elapsed, latencies, health = await run_clients(client, payload, concurrency, requests_for_run)
+                print(
+                    f"{mode:<10}{concurrency:>8}{requests_for_run / elapsed:>10.1f}"
+                    f"{percentile(latencies, 50) * 1000:>10.0f}{percentile(latencies, 95) * 1000:>10.0f}"
+                    f"{percentile(health, 95) * 1000:>15.0f}"
+                )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark async extraction throughput")
+    parser.add_argument("--latency", type=float, default=0.5, help="Injected model latency in seconds")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per run")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50], help="Concurrent client counts")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.requests, args.levels))
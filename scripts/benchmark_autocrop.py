@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark auto-crop and deskew (ImageProcessor._crop_and_deskew) on a
+synthetic fixture set: phone photos of certificates on a table (rotated a few
+degrees), scans with wide margins, a small ID card in a large frame and a
+clean full-page scan that should be left alone.
+
+For each fixture reports the pixel reduction, the detected vs. true rotation,
+payload bytes with and without the stage, and the time it adds.
+
+Usage:
+    python scripts/benchmark_autocrop.py --repeats 3
+"""
+import argparse
+import io
+import time
+
+from benchmark_common import make_sample_image
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from kyc_extractor.core.config import settings
+from kyc_extractor.services.image_processor import image_processor
+
+def certificate(width: int = 1654, height: int = 2339) -> Image.Image:
+    page = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=width // 45)
+    draw.rectangle([30, 30, width - 30, height - 30], outline=(0, 60, 120), width=8)
+    for i, line in enumerate([
+        "GOVERNMENT OF INDIA - FORM GST REG-06",
+        "Registration Number: 27ABCDE1234F1Z5",
+        "Legal Name: ABC TRADING PRIVATE LIMITED",
+        "Trade Name: ABC TRADERS",
+        "Address: 123, Market Road, Andheri West, Mumbai 400001",
+        "Date of Liability: 15/01/2023",
+    ] * 4):
+        draw.text((width // 12, height // 12 + i * height // 28), line, fill="black", font=font)
+    return page
+
+def table(width: int, height: int) -> Image.Image:
+    wood = Image.new("RGB", (width, height), (139, 94, 60))
+    draw = ImageDraw.Draw(wood)
+    for y in range(0, height, 18):
+        draw.line([(0, y), (width, y + 30)], fill=(120 + (y % 40), 80, 50), width=5)
+    return wood
+
+def noisy(image: Image.Image) -> Image.Image:
+    return Image.blend(image, Image.effect_noise(image.size, 8).convert("RGB"), 0.06)
+
+def phone_photo(angle: float) -> Image.Image:
+    """Certificate rotated by `angle` on a wooden table, 12 MP"""
+    photo = table(3024, 4032)
+    page = certificate(2200, 3110).rotate(angle, expand=True, fillcolor=(0, 0, 0))
+    mask = Image.new("L", (2200, 3110), 255).rotate(angle, expand=True, fillcolor=0)
+    photo.paste(page, ((3024 - page.width) // 2, (4032 - page.height) // 2), mask)
+    return noisy(photo.filter(ImageFilter.GaussianBlur(1)))
+
+def id_card_photo() -> Image.Image:
+    """PAN-card sized document in a large frame"""
+    photo = table(3024, 4032)
+    card = certificate(1300, 820)
+    photo.paste(card, (800, 1500))
+    return noisy(photo)
+
+def wide_margin_scan() -> Image.Image:
+    """Small certificate scanned in the middle of an A4 flatbed"""
+    scan = Image.new("RGB", (2480, 3508), (250, 250, 248))
+    scan.paste(certificate(1400, 1980), (540, 760))
+    return noisy(scan)
+
+def rotated_scan(angle: float) -> Image.Image:
+    return noisy(certificate(2480, 3508).rotate(angle, expand=False, fillcolor="white"))
+
+def clean_scan() -> Image.Image:
+    return Image.open(io.BytesIO(make_sample_image(1654, 2339))).convert("RGB")
+
+FIXTURES = [
+    ("phone photo +3°", lambda: phone_photo(3), 3.0),
+    ("phone photo -6°", lambda: phone_photo(-6), -6.0),
+    ("id card photo", id_card_photo, 0.0),
+    ("wide margin scan", wide_margin_scan, 0.0),
+    ("rotated scan +2°", lambda: rotated_scan(2), 2.0),
+    ("clean scan", clean_scan, 0.0),
+]
+
+def prepare(image: Image.Image, enabled: bool) -> tuple:
+    settings.MODEL_IMAGE_AUTOCROP = enabled
+    settings.MODEL_IMAGE_DESKEW = enabled
+    start = time.perf_counter()
+    _, stats = image_processor.prepare_for_model(image.copy())
+    return stats, time.perf_counter() - start
+
+def main(repeats: int):
+    print("📊 Auto-crop and deskew on synthetic fixtures\n")
+    header = f"{'fixture':<20}{'size':>11}{'cropped':>11}{'px saved':>10}{'skew true/found':>17}{'KB off/on':>13}{'ms added':>10}"
+    print(header)
+    print("-" * len(header))
+
+    totals = [0, 0]
+    for name, make, true_angle in FIXTURES:
+        image = make()
+        off_times, on_times = [], []
+        for _ in range(repeats):
+            off, elapsed = prepare(image, False)
+            off_times.append(elapsed)
+            on, elapsed = prepare(image, True)
+            on_times.append(elapsed)
+
+        preprocess = on["preprocess"]
+        totals[0] += off["sent_bytes"]
+        totals[1] += on["sent_bytes"]
+        found = preprocess["deskew_degrees"] if preprocess["deskew_degrees"] is not None else 0.0
+        print(
+            f"{name:<20}{image.width:>5}x{image.height:<5}"
+            f"{preprocess['cropped_size'][0]:>5}x{preprocess['cropped_size'][1]:<5}"
+            f"{preprocess['pixel_reduction'] * 100:>9.0f}%"
+            f"{true_angle:>9.1f}/{found:<7.1f}"
+            f"{off['sent_bytes'] / 1024:>6.0f}/{on['sent_bytes'] / 1024:<6.0f}"
+            f"{(min(on_times) - min(off_times)) * 1000:>9.0f}"
+        )
+
+    print("-" * len(header))
+    print(f"Payload total: {totals[0] / 1024:.0f} KB -> {totals[1] / 1024:.0f} KB ({(1 - totals[1] / totals[0]) * 100:.0f}% smaller)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark auto-crop and deskew preprocessing")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing repeats per fixture (best is reported)")
+    args = parser.parse_args()
+    main(args.repeats)
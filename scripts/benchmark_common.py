@@ -0,0 +1,192 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Provides a latency-injecting fake Gemini model, a throwaway SQLite database
+and an in-process HTTP client for the FastAPI app, so benchmarks run without
+a Gemini API key or a MySQL server.
+"""
+import sys
+import os
+import io
+import json
+import time
+import asyncio
+import tempfile
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-fake-key")
+# Most scripts fake a single model (gemini_client.model) and count one model call per
+# document; the end-to-end tests restore the full pipeline with use_production_pipeline
+os.environ.setdefault("GEMINI_CASCADE_ENABLED", "false")
+
+# Benchmarks always run against a throwaway SQLite database
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR.name, 'bench.db')}"
+
+import httpx
+from PIL import Image, ImageDraw
+from kyc_extractor.db.database import Base, engine, SessionLocal
+from kyc_extractor.db import models  # noqa: F401 - registers tables on Base
+from kyc_extractor.api.deps import get_current_active_user
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.core.prompts import CLASSIFY_PROMPT, PACKED_DOCUMENT_MARKER
+
+SAMPLE_RESULT = {
+    "document_type": "GST_CERTIFICATE",
+    "data": {
+        "company_name": "ABC TRADING PRIVATE LIMITED",
+        "trade_name": "ABC TRADERS",
+        "identification_number": "27ABCDE1234F1Z5",
+        "address": {
+            "full_address": "123, Market Road, Andheri West, Mumbai, Maharashtra 400001",
+            "address_line_1": "123, Market Road",
+            "locality": "Andheri West",
+            "city": "Mumbai",
+            "state": "Maharashtra",
+            "pincode": "400001"
+        },
+        "issue_date": "2023-01-15",
+        "approver_name": "DS GST OFFICER"
+    },
+    "confidence": 0.95,
+    "confidence_reason": "Document is clear"
+}
+
+class FakeResponse:
+    """Reply text plus usage_metadata, with output tokens at ~4 characters per token"""
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        output_tokens = len(text) // 4
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens
+        )
+
+    def with_prompt(self, contents: list) -> "FakeResponse":
+        """Sets the prompt token count for the contents the reply answers"""
+        metadata = self.usage_metadata
+        metadata.prompt_token_count = estimate_prompt_tokens(contents)
+        metadata.total_token_count = metadata.prompt_token_count + metadata.candidates_token_count
+        return self
+
+def packed_document_count(contents: list) -> int:
+    """Number of documents in a packed prompt (0 for other prompts)"""
+    markers = {PACKED_DOCUMENT_MARKER.format(index=index) for index in range(1, len(contents) + 1)}
+    return sum(1 for part in contents if isinstance(part, str) and part in markers)
+
+def estimate_prompt_tokens(contents: list) -> int:
+    """~4 characters per text token and 258 tokens per image part"""
+    return sum(len(part) // 4 if isinstance(part, str) else 258 for part in contents)
+
+class FakeGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel that sleeps for `latency` seconds
+    and returns a fixed JSON payload.
+
+    With blocking=True the async method sleeps synchronously, which reproduces
+    the old behaviour of calling the sync SDK from an async endpoint.
+    Classification prompts are answered with the result's document_type and
+    counted in classify_calls rather than calls; packed prompts get one entry
+    per document and are also counted in packed_calls.
+    """
+    def __init__(self, latency: float = 0.5, result: dict = None, blocking: bool = False):
+        self.latency = latency
+        self.result = result or SAMPLE_RESULT
+        self.blocking = blocking
+        self.calls = 0
+        self.classify_calls = 0
+        self.packed_calls = 0
+
+    def _response(self):
+        self.calls += 1
+        # Bare JSON, as returned in JSON response mode
+        return FakeResponse(json.dumps(self.result))
+
+    def _packed_response(self, count: int):
+        self.calls += 1
+        self.packed_calls += 1
+        return FakeResponse(json.dumps({"documents": [{"index": index, **self.result} for index in range(1, count + 1)]}))
+
+    def _respond_to(self, contents):
+        packed = packed_document_count(contents)
+        if contents and contents[0] == CLASSIFY_PROMPT:
+            self.classify_calls += 1
+            response = FakeResponse(self.result.get("document_type", "OTHER"))
+        elif packed:
+            response = self._packed_response(packed)
+        else:
+            response = self._response()
+        return response.with_prompt(contents)
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.latency)
+        return self._respond_to(contents)
+
+    async def generate_content_async(self, contents, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return self._respond_to(contents)
+
+def make_sample_image(width: int = 1240, height: int = 1754, fmt: str = "PNG") -> bytes:
+    """Renders a synthetic certificate-like page and returns the encoded bytes."""
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([40, 40, width - 40, height - 40], outline=(0, 0, 0), width=4)
+    for i, line in enumerate([
+        "GOVERNMENT OF INDIA - FORM GST REG-06",
+        "Registration Number: 27ABCDE1234F1Z5",
+        "Legal Name: ABC TRADING PRIVATE LIMITED",
+        "Trade Name: ABC TRADERS",
+        "Address: 123, Market Road, Andheri West, Mumbai, Maharashtra 400001",
+        "Date of Liability: 15/01/2023",
+    ]):
+        draw.text((100, 150 + i * 60), line, fill=(0, 0, 0))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def setup_sqlite_app(app):
+    """
+    Creates the tables in the throwaway SQLite database and bypasses JWT auth.
+    Returns the session factory bound to it.
+    """
+    Base.metadata.create_all(bind=engine)
+    bench_user = SimpleNamespace(id=None, role="admin", is_active=True)
+    app.dependency_overrides[get_current_active_user] = lambda: bench_user
+    return SessionLocal
+
+def use_production_pipeline(fast: "FakeGeminiModel" = None, strong: "FakeGeminiModel" = None) -> tuple:
+    """
+    Turns the model cascade back on, as it defaults in production, and the
+    opt-in classify-first so its thumbnail call is covered too, and installs a
+    two-tier fake: `fast` answers classification and first attempts, `strong`
+    the escalations. Returns (fast, strong).
+    """
+    settings.GEMINI_CASCADE_ENABLED = True
+    settings.CLASSIFY_FIRST = True
+    gemini_client.fast_model = fast or FakeGeminiModel(latency=0.01)
+    gemini_client.model = strong or FakeGeminiModel(latency=0.01)
+    return gemini_client.fast_model, gemini_client.model
+
+def make_client(app) -> httpx.AsyncClient:
+    """In-process async HTTP client for the ASGI app."""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        timeout=None
+    )
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
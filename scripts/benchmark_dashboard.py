@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark the rollup-backed /stats/dashboard (crud.get_dashboard_stats)
+against the query-per-metric version that scanned extractions, and
+/stats/avg-processing-time (get_avg_processing_time, only the processing time
+of the last 7 rows, read along the uploaded_at indexes) against loading those rows.
+
+Seeds a throwaway SQLite table in steps up to the largest --rows size
+(50 users; --recent uploads in the last week, then only older history),
+rebuilds the rollups after each step (crud.rebuild_rollups, timed) and times
+both versions for an admin (whole table) and for one user, counting the
+SELECTs sent. The legacy implementations are reproduced below: one query
+per summary card, DATE(uploaded_at) comparisons for today and yesterday,
+separate GROUP BY queries for the trend and the grades, and the last 7 rows
+for the processing time. Both dashboards must return the same summary and
+charts, and both processing times the same average.
+
+Usage:
+    python scripts/benchmark_dashboard.py --rows 100000,1000000 --repeat 5
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmark_common import setup_sqlite_app
+
+from sqlalchemy import case, desc, event, func
+from kyc_extractor.main import app
+from kyc_extractor.db import crud
+from kyc_extractor.db.database import engine
+from kyc_extractor.db.models import Extraction, User
+
+def legacy_dashboard_stats(db, user_id: int = None, role: str = "user") -> dict:
+    query = db.query(Extraction)
+    if role != "admin" and user_id:
+        query = query.filter(Extraction.user_id == user_id)
+    quality_grade_expr = case(
+        (Extraction.data_quality_score >= 90, 'A'),
+        (Extraction.data_quality_score >= 75, 'B'),
+        (Extraction.data_quality_score >= 60, 'C'),
+        (Extraction.data_quality_score >= 40, 'D'),
+        else_='F'
+    )
+    total_count = query.count()
+    success_count = query.filter(Extraction.data_quality_score >= 75).count()
+    success_rate = (success_count / total_count * 100) if total_count > 0 else 0
+    avg_confidence = query.with_entities(func.avg(Extraction.confidence)).scalar() or 0.0
+    pending_count = query.filter(Extraction.data_quality_score < 75).count()
+    today = datetime.utcnow().date()
+    yesterday = today - timedelta(days=1)
+    today_count = query.filter(func.date(Extraction.uploaded_at) == today).count()
+    yesterday_count = query.filter(func.date(Extraction.uploaded_at) == yesterday).count()
+    volume_trend = 0
+    if yesterday_count > 0:
+        volume_trend = ((today_count - yesterday_count) / yesterday_count) * 100
+    elif today_count > 0:
+        volume_trend = 100
+    active_users_count = 0
+    if role == "admin":
+        active_users_count = db.query(User).filter(User.is_active == True).count()
+    seven_days_ago = today - timedelta(days=6)
+    daily_stats = query.with_entities(
+        func.date(Extraction.uploaded_at).label('date'),
+        func.count(Extraction.id).label('count')
+    ).filter(func.date(Extraction.uploaded_at) >= seven_days_ago).group_by(func.date(Extraction.uploaded_at)).all()
+    stats_map = {str(s.date): s.count for s in daily_stats}
+    daily_trend = [
+        {"date": (seven_days_ago + timedelta(days=i)).strftime("%b %d"), "count": stats_map.get(str(seven_days_ago + timedelta(days=i)), 0)}
+        for i in range(7)
+    ]
+    quality_stats = query.with_entities(quality_grade_expr.label('grade'), func.count(Extraction.id)).group_by(quality_grade_expr).all()
+    quality_distribution = [{"name": f"Grade {s[0]}", "value": s[1]} for s in quality_stats if s[0]]
+    recent_activity = query.order_by(desc(Extraction.uploaded_at)).limit(5).all()
+    return {
+        "summary": {
+            "total_documents": total_count,
+            "success_rate": round(success_rate, 1),
+            "avg_confidence": round(avg_confidence * 100, 1),
+            "pending_reviews": pending_count,
+            "todays_volume": today_count,
+            "volume_trend": round(volume_trend, 1),
+            "active_users": active_users_count
+        },
+        "charts": {"daily_trend": daily_trend, "quality_distribution": quality_distribution},
+        "recent_activity": recent_activity
+    }
+
+def legacy_avg_processing_time(db, user_id: int = None, role: str = "user", limit: int = 7) -> int:
+    query = db.query(Extraction).filter(Extraction.processing_time_ms.isnot(None), Extraction.processing_time_ms > 0)
+    if role != "admin" and user_id:
+        query = query.filter(Extraction.user_id == user_id)
+    recent = query.order_by(desc(Extraction.uploaded_at)).limit(limit).all()
+    if not recent:
+        return 3000
+    return int(sum(e.processing_time_ms for e in recent) / len(recent))
+
+def seed(SessionLocal, rows: int, rng: random.Random, recent: int) -> None:
+    """`recent` of the rows in the last week, the rest over the year before it"""
+    db = SessionLocal()
+    # Whole seconds, like DATETIME columns on MySQL
+    now = datetime.utcnow().replace(microsecond=0)
+    chunk = 20000
+    for offset in range(0, rows, chunk):
+        db.execute(Extraction.__table__.insert(), [
+            {
+                "request_id": str(uuid.uuid4()),
+                "user_id": rng.randint(1, 50),
+                "document_type": rng.choice(("GST_CERTIFICATE", "PAN_CARD", "MSME_CERTIFICATE")),
+                "confidence": rng.uniform(0.5, 1.0),
+                "data_quality_score": rng.choice((None, rng.randint(0, 100), rng.randint(0, 100), rng.randint(0, 100))),
+                "processing_time_ms": rng.randint(500, 5000),
+                "uploaded_at": now - timedelta(
+                    seconds=rng.randint(0, 7 * 86400) if offset + i < recent else rng.randint(8 * 86400, 373 * 86400)
+                ),
+            }
+            for i in range(min(chunk, rows - offset))
+        ])
+    db.commit()
+    db.close()
+
+def measure(SessionLocal, function, repeat: int, **kwargs) -> tuple:
+    """(median ms, SELECTs per call, result)"""
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    samples, result = [], None
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(repeat):
+            db = SessionLocal()
+            start = time.perf_counter()
+            result = function(db, **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return statistics.median(samples), len(statements) // repeat, result
+
+def main(args):
+    SessionLocal = setup_sqlite_app(app)
+    sizes = [int(size) for size in args.rows.split(",")]
+    rng = random.Random(11)
+    seeded = 0
+
+    header = f"{'rows':>10}  {'endpoint':<22}{'scope':<10}{'legacy q':>9}{'legacy ms':>11}{'rollup q':>10}{'rollup ms':>11}{'speedup':>9}"
+    for size in sizes:
+        print(f"📊 Seeding up to {size:,} extractions...")
+        start = time.perf_counter()
+        # Later steps only add older history
+        seed(SessionLocal, size - seeded, rng, args.recent if not seeded else 0)
+        seeded = size
+        print(f"   seeded in {time.perf_counter() - start:.1f} s")
+        db = SessionLocal()
+        start = time.perf_counter()
+        rollup_rows = crud.rebuild_rollups(db)
+        db.close()
+        print(f"   rebuilt {rollup_rows:,} rollup rows in {time.perf_counter() - start:.1f} s\n")
+        print(header)
+        print("-" * len(header))
+
+        for scope, kwargs in (("admin", {"role": "admin"}), ("one user", {"user_id": 7, "role": "user"})):
+            for endpoint, legacy_function, function in (
+                ("/stats/dashboard", legacy_dashboard_stats, crud.get_dashboard_stats),
+                ("/stats/avg-processing", legacy_avg_processing_time, crud.get_avg_processing_time),
+            ):
+                legacy_ms, legacy_queries, legacy = measure(SessionLocal, legacy_function, args.repeat, **kwargs)
+                new_ms, new_queries, new = measure(SessionLocal, function, args.repeat, **kwargs)
+                print(f"{size:>10,}  {endpoint:<22}{scope:<10}{legacy_queries:>9}{legacy_ms:>11.1f}{new_queries:>10}{new_ms:>11.1f}{legacy_ms / new_ms:>8.1f}x")
+                if function is crud.get_avg_processing_time and legacy != new:
+                    print(f"   ❌ results differ: legacy={legacy} ms, new={new} ms")
+                if function is crud.get_dashboard_stats:
+                    grades = lambda stats: sorted((point["name"], point["value"]) for point in stats["charts"]["quality_distribution"])
+                    if legacy["summary"] != new["summary"] or legacy["charts"]["daily_trend"] != new["charts"]["daily_trend"] or grades(legacy) != grades(new):
+                        print(f"   ❌ results differ:\n   legacy={legacy['summary']}\n   rollup={new['summary']}")
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rollup-backed stats against queries over extractions")
+    parser.add_argument("--rows", default="100000,1000000", help="Comma-separated table sizes to measure at")
+    parser.add_argument("--recent", type=int, default=20000, help="Extractions in the last week (seeded in the first step)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per version (median is shown)")
+    main(parser.parse_args())
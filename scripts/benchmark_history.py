@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark /history page latency against page depth: OFFSET paging (with and
+without the total count) versus keyset cursors.
+
+Seeds a throwaway SQLite table with --rows extractions spread over a year,
+then times crud.get_extractions_history for pages at increasing depth. OFFSET
+pages walk every skipped index entry, so their cost grows with depth; cursor
+pages seek straight to (uploaded_at, id) on ix_extractions_uploaded_at_id and
+stay flat. The cursor for a deep page is taken from the row just before it.
+
+Usage:
+    python scripts/benchmark_history.py --rows 500000 --limit 20
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmark_common import setup_sqlite_app
+
+from kyc_extractor.main import app
+from kyc_extractor.db import crud
+from kyc_extractor.db.models import Extraction
+
+def seed(SessionLocal, rows: int) -> None:
+    db = SessionLocal()
+    start = datetime(2025, 1, 1)
+    rng = random.Random(7)
+    chunk = 20000
+    for offset in range(0, rows, chunk):
+        db.execute(Extraction.__table__.insert(), [
+            {
+                "request_id": str(uuid.uuid4()),
+                "user_id": rng.randint(1, 20),
+                "filename": f"doc{offset + i}.png",
+                "document_type": rng.choice(("GST_CERTIFICATE", "PAN_CARD", "MSME_CERTIFICATE")),
+                "processing_time_ms": rng.randint(500, 5000),
+                # Whole seconds, so plenty of rows share a timestamp
+                "uploaded_at": start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+            }
+            for i in range(min(chunk, rows - offset))
+        ])
+    db.commit()
+    db.close()
+
+def time_page(SessionLocal, repeat: int, **kwargs) -> float:
+    """Median milliseconds for one page"""
+    samples = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        crud.get_extractions_history(db, role="admin", **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        db.close()
+    return statistics.median(samples)
+
+def main(args):
+    SessionLocal = setup_sqlite_app(app)
+    print(f"📊 /history paging: seeding {args.rows:,} extractions...")
+    start = time.perf_counter()
+    seed(SessionLocal, args.rows)
+    print(f"   seeded in {time.perf_counter() - start:.1f} s\n")
+
+    header = f"{'page':>8}{'offset + count':>17}{'offset':>10}{'cursor':>10}   (ms, limit {args.limit})"
+    print(header)
+    print("-" * len(header))
+
+    db = SessionLocal()
+    depths = [page for page in (1, 10, 100, 1000, 10000, 25000) if (page - 1) * args.limit < args.rows]
+    for page in depths:
+        skip = (page - 1) * args.limit
+        cursor = None
+        if skip:
+            # Cursor the previous page would have returned
+            previous, _, _ = crud.get_extractions_history(db, skip=skip - 1, limit=1, role="admin", include_total=False)
+            cursor = crud.encode_history_cursor(previous[0])
+        counted = time_page(SessionLocal, args.repeat, skip=skip, limit=args.limit)
+        offset = time_page(SessionLocal, args.repeat, skip=skip, limit=args.limit, include_total=False)
+        keyset = time_page(SessionLocal, args.repeat, cursor=cursor, limit=args.limit, include_total=False)
+        print(f"{page:>8}{counted:>17.2f}{offset:>10.2f}{keyset:>10.2f}")
+    db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OFFSET against cursor paging of /history")
+    parser.add_argument("--rows", type=int, default=500000, help="Extractions to seed")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page (median is shown)")
+    main(parser.parse_args())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pre-send image stage (ImageProcessor.prepare_for_model).
+
+For a set of synthetic documents, compares what used to be sent to Gemini
+(the PIL image, serialized by google-generativeai itself: lossless WebP for
+images decoded from an upload) with the downscaled/re-encoded payload: bytes on the wire, encode time and
+estimated end-to-end latency (encode + upload at --uplink-mbps + model time).
+
+Usage:
+    python scripts/benchmark_model_payload.py --uplink-mbps 20 --model-latency 2.5
+"""
+import argparse
+import io
+import time
+
+from benchmark_common import make_sample_image
+
+from google.generativeai.types.content_types import image_to_blob
+from PIL import Image, ImageDraw, ImageFilter
+from kyc_extractor.services.image_processor import image_processor
+
+def add_scanner_noise(image: Image.Image, sigma: float = 6) -> Image.Image:
+    noise = Image.effect_noise(image.size, sigma).convert(image.mode)
+    return Image.blend(image, noise, 0.08)
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def scanned_a4() -> tuple:
+    """Grayscale-looking A4 scan at 300 DPI, uploaded as PNG"""
+    page = Image.open(io.BytesIO(make_sample_image(2480, 3508))).convert("RGB")
+    return "scan_a4_300dpi.png", encode(add_scanner_noise(page), "PNG")
+
+def phone_photo() -> tuple:
+    """12 MP phone photo of a certificate on a wooden table, uploaded as JPEG"""
+    photo = Image.new("RGB", (3024, 4032), (139, 94, 60))
+    draw = ImageDraw.Draw(photo)
+    for y in range(0, 4032, 24):
+        draw.line([(0, y), (3024, y + 40)], fill=(120 + (y % 50), 80, 50), width=6)
+    page = Image.open(io.BytesIO(make_sample_image(2200, 3100))).convert("RGB").rotate(3, expand=True, fillcolor=(139, 94, 60))
+    photo.paste(page, (300, 400))
+    photo = add_scanner_noise(photo.filter(ImageFilter.GaussianBlur(1)))
+    buffer = io.BytesIO()
+    photo.save(buffer, format="JPEG", quality=92)
+    return "phone_photo.jpg", buffer.getvalue()
+
+def color_certificate() -> tuple:
+    """Certificate with a colored border and seal, uploaded as PNG"""
+    page = Image.open(io.BytesIO(make_sample_image(1654, 2339))).convert("RGB")
+    draw = ImageDraw.Draw(page)
+    draw.rectangle([20, 20, 1634, 2319], outline=(0, 90, 160), width=30)
+    draw.ellipse([1200, 1900, 1500, 2200], fill=(200, 30, 30))
+    draw.rectangle([0, 0, 1654, 200], fill=(255, 153, 51))
+    return "color_certificate.png", encode(add_scanner_noise(page), "PNG")
+
+def stitched_pdf_pages(pages: int = 3) -> tuple:
+    """What _process_pdf returns for a multi-page 200 DPI PDF: one stitched RGB canvas"""
+    page = add_scanner_noise(Image.open(io.BytesIO(make_sample_image(1654, 2339))).convert("RGB"))
+    canvas = Image.new("RGB", (1654, 2339 * pages), (255, 255, 255))
+    for i in range(pages):
+        canvas.paste(page, (0, 2339 * i))
+    canvas.info["page_count"] = pages
+    return f"stitched_{pages}_pages.pdf", canvas
+
+def sdk_default_payload(image: Image.Image) -> bytes:
+    """What google-generativeai sends for a PIL image passed as-is"""
+    try:
+        return image_to_blob(image).data
+    except ValueError:
+        # Taller than WebP allows (long stitched PDFs): the SDK call itself fails; lossless PNG stands in
+        return encode(image, "PNG")
+
+def main(uplink_mbps: float, model_latency: float, repeats: int):
+    documents = [scanned_a4(), phone_photo(), color_certificate(), stitched_pdf_pages(3), stitched_pdf_pages(8)]
+
+    print(f"📊 Model payload before/after (uplink {uplink_mbps} Mbps, model latency {model_latency} s)\n")
+    header = f"{'document':<24}{'before KB':>11}{'after KB':>10}{'saved':>8}{'enc ms b/a':>14}{'e2e s b/a':>13}  sent as"
+    print(header)
+    print("-" * len(header))
+
+    totals = [0, 0]
+    for name, source in documents:
+        def load():
+            return source if isinstance(source, Image.Image) else image_processor.process_file(source, name)
+
+        before_times, after_times = [], []
+        for _ in range(repeats):
+            image = load()
+            start = time.perf_counter()
+            before = sdk_default_payload(image)
+            before_times.append(time.perf_counter() - start)
+
+            image = load()
+            start = time.perf_counter()
+            payload, stats = image_processor.prepare_for_model(image)
+            after_times.append(time.perf_counter() - start)
+
+        before_bytes = len(before)
+        after_bytes = stats["sent_bytes"]
+        totals[0] += before_bytes
+        totals[1] += after_bytes
+
+        before_enc = min(before_times)
+        after_enc = min(after_times)
+        before_e2e = before_enc + before_bytes * 8 / (uplink_mbps * 1e6) + model_latency
+        after_e2e = after_enc + after_bytes * 8 / (uplink_mbps * 1e6) + model_latency
+        sent_as = f"{stats['sent_size'][0]}x{stats['sent_size'][1]} {stats['mode']} {stats['format']}"
+        print(
+            f"{name:<24}{before_bytes / 1024:>11.0f}{after_bytes / 1024:>10.0f}"
+            f"{(1 - after_bytes / before_bytes) * 100:>7.0f}%"
+            f"{before_enc * 1000:>7.0f}/{after_enc * 1000:<6.0f}"
+            f"{before_e2e:>6.2f}/{after_e2e:<6.2f}  {sent_as}"
+        )
+
+    print("-" * len(header))
+    print(f"{'total':<24}{totals[0] / 1024:>11.0f}{totals[1] / 1024:>10.0f}{(1 - totals[1] / totals[0]) * 100:>7.0f}%")
+    print("\nNote: model latency is a fixed stand-in; fewer image pixels also mean fewer billed input tokens.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark model payload size before/after re-encoding")
+    parser.add_argument("--uplink-mbps", type=float, default=20, help="Upload bandwidth used to estimate transfer time")
+    parser.add_argument("--model-latency", type=float, default=2.5, help="Fixed model latency in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="Timing repeats per document (best is reported)")
+    args = parser.parse_args()
+    main(args.uplink_mbps, args.model_latency, args.repeats)
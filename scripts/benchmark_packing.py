@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-document packing against one model call per document.
+
+Sends a batch of small single-page documents (PAN-card sized JPEGs) through
+/extract/batch twice, with PACKING_ENABLED off and on. The fake model sleeps
+for a fixed per-call overhead (connection, upstream queueing) plus prefill
+time for the input tokens it is actually sent and decode time for the JSON it
+returns, so packing is charged for its longer replies. Input tokens are
+estimated from the real prompt text (~4 characters per token) at 258 tokens
+per image, output tokens from the reply. Cost per document is the recorded
+usage (GEMINI_*_PRICE settings). With --rpm the shared rate limiter is set to
+that many requests per minute, to show throughput under a request quota.
+
+Usage:
+    python scripts/benchmark_packing.py --documents 48 --overhead 0.6 --rpm 0
+"""
+import argparse
+import asyncio
+import time
+
+from benchmark_common import FakeGeminiModel, make_sample_image, setup_sqlite_app, make_client, estimate_prompt_tokens
+
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.core.resilience import RateLimiter
+from kyc_extractor.services.extraction import document_packer
+from kyc_extractor.services.image_processor import image_processor
+
+class TokenTimedModel(FakeGeminiModel):
+    """Sleeps for overhead + prefill + decode time of each call"""
+    def __init__(self, overhead: float, input_ms_per_1k: float, output_ms_per_token: float):
+        super().__init__(latency=0.0)
+        self.overhead = overhead
+        self.input_ms_per_1k = input_ms_per_1k
+        self.output_ms_per_token = output_ms_per_token
+
+    async def generate_content_async(self, contents, **kwargs):
+        response = self._respond_to(contents)
+        metadata = response.usage_metadata
+        await asyncio.sleep(
+            self.overhead
+            + estimate_prompt_tokens(contents) * self.input_ms_per_1k / 1e6
+            + metadata.candidates_token_count * self.output_ms_per_token / 1000
+        )
+        return response
+
+async def run(client, documents: list, packing: bool, args) -> dict:
+    settings.PACKING_ENABLED = packing
+    model = gemini_client.model = TokenTimedModel(args.overhead, args.input_ms_per_1k, args.output_ms_per_token)
+    gemini_client.guard.limiter = RateLimiter(args.rpm, 0)
+    document_packer.bundles = document_packer.packed_documents = document_packer.individual = 0
+
+    files = [("files", (name, image, "image/jpeg")) for name, image in documents]
+    start = time.perf_counter()
+    response = await client.post("/extract/batch", params={"use_cache": "false"}, files=files)
+    elapsed = time.perf_counter() - start
+    body = response.json()
+    assert body["successful"] == len(documents), body.get("errors")
+
+    usages = [result["usage"] for result in body["results"]]
+    return {
+        "calls": model.calls,
+        "docs_per_second": len(documents) / elapsed,
+        "seconds": elapsed,
+        "input_tokens": sum(usage["prompt_tokens"] for usage in usages) / len(usages),
+        "output_tokens": sum(usage["output_tokens"] for usage in usages) / len(usages),
+        "cost": sum(usage["cost_usd"] for usage in usages) / len(usages) * 1e6,
+        "bundle": document_packer.stats()["avg_bundle_size"],
+    }
+
+async def main(args):
+    setup_sqlite_app(app)
+    # Settings are changed at runtime; keep the image stage in-process
+    image_processor._process_pool = None
+    settings.BATCH_CONCURRENCY = args.concurrency
+    settings.PACK_MAX_DOCUMENTS = args.pack_size
+
+    print(f"📊 Packing: {args.documents} small documents via /extract/batch (overhead {args.overhead} s/call, "
+          f"{args.input_ms_per_1k} ms/1k input tokens, {args.output_ms_per_token} ms/output token, "
+          f"concurrency {args.concurrency}, up to {args.pack_size} per call, rpm {args.rpm or 'unlimited'})\n")
+    header = f"{'mode':<18}{'calls':>7}{'docs/bundle':>13}{'docs/s':>9}{'batch s':>9}{'in tok/doc':>12}{'out tok/doc':>13}{'µ$/doc':>9}"
+    print(header)
+    print("-" * len(header))
+
+    report = {}
+    async with make_client(app) as client:
+        for label, packing, offset in (("one per document", False, 0), ("packed", True, args.documents)):
+            # Fresh images per mode so the result cache cannot help either side
+            documents = [(f"pan{offset + i}.jpg", make_sample_image(1000 + offset + i, 630, "JPEG")) for i in range(args.documents)]
+            row = report[label] = await run(client, documents, packing, args)
+            print(
+                f"{label:<18}{row['calls']:>7}{row['bundle'] or 1:>13}{row['docs_per_second']:>9.1f}{row['seconds']:>9.2f}"
+                f"{row['input_tokens']:>12.0f}{row['output_tokens']:>13.0f}{row['cost']:>9.1f}"
+            )
+
+    single, packed = report["one per document"], report["packed"]
+    print(
+        f"\nPacked vs one call per document: throughput {(packed['docs_per_second'] / single['docs_per_second'] - 1) * 100:+.0f}%, "
+        f"cost per document {(packed['cost'] / single['cost'] - 1) * 100:+.0f}%, model calls {packed['calls']} vs {single['calls']}"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark multi-document packing against one call per document")
+    parser.add_argument("--documents", type=int, default=48, help="Documents in the batch")
+    parser.add_argument("--overhead", type=float, default=0.6, help="Fixed latency per model call in seconds")
+    parser.add_argument("--input-ms-per-1k", type=float, default=20, help="Prefill time per 1000 input tokens (ms)")
+    parser.add_argument("--output-ms-per-token", type=float, default=4, help="Decode time per output token (ms)")
+    parser.add_argument("--concurrency", type=int, default=16, help="BATCH_CONCURRENCY")
+    parser.add_argument("--pack-size", type=int, default=8, help="PACK_MAX_DOCUMENTS")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute allowed upstream (0 = unlimited)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for PDF rasterization settings (ImageProcessor._process_pdf).
+
+Generates scanned-style multi-page PDFs, then runs process_file once per
+(PDF, configuration) in a fresh subprocess so peak RSS is measured cleanly.
+Reports wall time, peak RSS of the Python process (over the post-import
+baseline) and peak RSS of the poppler child processes. In the default
+per-page mode every page is decoded once, as the model stage would.
+
+Requires poppler-utils (pdftoppm / pdftocairo).
+
+Usage:
+    python scripts/benchmark_pdf_rasterization.py --pages 1 5 20
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Each configuration is a set of environment overrides for Settings
+CONFIGURATIONS = {
+    "default (200 dpi)": {},
+    "stitched": {"PDF_PAGE_MODE": "stitch"},
+    "150 dpi": {"PDF_DPI": "150"},
+    "grayscale": {"PDF_GRAYSCALE": "true"},
+    "4 threads": {"PDF_THREAD_COUNT": "4"},
+    "pdftocairo": {"PDF_USE_PDFTOCAIRO": "true"},
+    "first 3 pages": {"PDF_MAX_PAGES": "3"},
+    "stitched, disk, png": {"PDF_PAGE_MODE": "stitch", "PDF_RASTERIZE_TO_DISK": "true", "PDF_FORMAT": "png"},
+    "150 dpi, gray, 4 thr": {"PDF_DPI": "150", "PDF_GRAYSCALE": "true", "PDF_THREAD_COUNT": "4"},
+}
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def run_worker(pdf_path: str):
+    """Child process: rasterize one PDF with the settings from the environment"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from kyc_extractor.services.image_processor import image_processor, PageSequence
+
+    with open(pdf_path, "rb") as f:
+        content = f.read()
+
+    baseline = peak_rss_mb(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    image = image_processor.process_file(content, os.path.basename(pdf_path))
+    if isinstance(image, PageSequence):
+        with image:
+            for page in image:
+                size, mode = page.size, page.mode
+        output = f"{len(image)} x {size[0]}x{size[1]} {mode}"
+    else:
+        output = f"{image.size[0]}x{image.size[1]} {image.mode}"
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "output": output,
+        "rss_mb": peak_rss_mb(resource.RUSAGE_SELF) - baseline,
+        "poppler_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }))
+
+def make_pdf(path: str, pages: int):
+    """Scanned-style PDF: one full-page A4 image per page at 200 DPI"""
+    from benchmark_common import make_sample_image
+    from PIL import Image
+
+    page = Image.open(io.BytesIO(make_sample_image(1654, 2339))).convert("RGB")
+    noise = Image.effect_noise(page.size, 8).convert("RGB")
+    page = Image.blend(page, noise, 0.06)
+    page.save(path, "PDF", resolution=200, save_all=True, append_images=[page] * (pages - 1))
+
+def main(page_counts, configurations):
+    with tempfile.TemporaryDirectory() as tmp:
+        print("📊 PDF rasterization, one fresh process per run\n")
+        header = f"{'pages':>5}  {'configuration':<28}{'seconds':>9}{'py RSS MB':>11}{'poppler MB':>12}  output"
+        print(header)
+        print("-" * len(header))
+
+        for pages in page_counts:
+            pdf_path = os.path.join(tmp, f"scan_{pages}p.pdf")
+            make_pdf(pdf_path, pages)
+
+            for name in configurations:
+                env = {**os.environ, **CONFIGURATIONS[name]}
+                env.setdefault("GOOGLE_API_KEY", "benchmark-fake-key")
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", pdf_path],
+                    env=env, capture_output=True, text=True
+                )
+                lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+                if proc.returncode != 0 or not lines:
+                    error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+                    print(f"{pages:>5}  {name:<28}  ❌ {error}")
+                    if "poppler" in error.lower() or "pdfinfo" in error.lower():
+                        print("\n❌ poppler-utils is required for this benchmark")
+                        return
+                    continue
+
+                r = json.loads(lines[-1])
+                print(
+                    f"{pages:>5}  {name:<28}{r['seconds']:>9.2f}{r['rss_mb']:>11.0f}{r['poppler_rss_mb']:>12.0f}"
+                    f"  {r['output']}"
+                )
+            print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF rasterization settings")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20], help="Page counts of the generated PDFs")
+    parser.add_argument("--config", nargs="+", choices=list(CONFIGURATIONS), default=list(CONFIGURATIONS), help="Configurations to run")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+    else:
+        main(args.pages, args.config)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark two-stage classify-then-extract against the single generic prompt.
+
+Each supported document type is run through extract_document_data twice:
+once with the generic EXTRACTION_PROMPT (CLASSIFY_FIRST off) and once with
+the thumbnail classification call followed by the short prompt for that type.
+A fake model counts input tokens from what it is actually sent (text at ~4
+characters per token, images at 258 tokens per 768x768 tile, one tile up to
+384 px) and output tokens from the JSON it returns, and sleeps for
+base latency + input/output token time, so the numbers reflect the real
+prompts, thumbnails and payloads. Cost uses per-million-token prices, with
+the classification call priced at the fast cascade tier.
+
+Usage:
+    python scripts/benchmark_prompts.py --base-latency 0.35 --output-ms-per-token 4
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import time
+
+from benchmark_common import FakeGeminiModel, FakeResponse, SAMPLE_RESULT, make_sample_image, setup_sqlite_app
+
+from PIL import Image
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.core.prompts import CLASSIFY_PROMPT, TYPE_FIELDS, TYPED_PROMPTS
+from kyc_extractor.services.extraction import extract_document_data
+from kyc_extractor.services.image_processor import image_processor
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_TILE = 258
+
+ADDRESS = SAMPLE_RESULT["data"]["address"]
+FIXTURES = {
+    "GST_CERTIFICATE": SAMPLE_RESULT["data"],
+    "PAN_CARD": {"company_name": "ABC TRADING PRIVATE LIMITED", "identification_number": "AABCA1234F", "issue_date": "2015-06-01"},
+    "FSSAI": {
+        "company_name": "ABC FOODS PRIVATE LIMITED", "trade_name": "ABC KITCHEN", "identification_number": "11521998000123",
+        "address": ADDRESS, "issue_date": "2022-04-01", "approver_name": "DESIGNATED OFFICER, MUMBAI",
+    },
+    "INCORPORATION_CERT": {
+        "company_name": "XYZ TECHNOLOGIES PRIVATE LIMITED", "identification_number": "U72900KA2021PTC123456",
+        "address": None, "issue_date": "2021-03-10", "approver_name": "REGISTRAR OF COMPANIES",
+    },
+    "MSME": {"company_name": "ABC TRADING PRIVATE LIMITED", "identification_number": "UDYAM-MH-19-0012345", "address": ADDRESS, "issue_date": "2021-08-20"},
+    "SHOP_ESTABLISHMENT": {
+        "company_name": "ABC TRADING PRIVATE LIMITED", "trade_name": "ABC TRADERS", "identification_number": "760310243/KE WARD",
+        "address": ADDRESS, "issue_date": "2019-02-11", "approver_name": "INSPECTOR, SHOPS AND ESTABLISHMENTS",
+    },
+}
+GENERIC_FIELDS = ["company_name", "trade_name", "identification_number", "address", "issue_date", "approver_name"]
+EMPTY_ADDRESS = {key: None for key in ADDRESS}
+
+def image_tokens(width: int, height: int) -> int:
+    if width <= 384 and height <= 384:
+        return TOKENS_PER_TILE
+    return math.ceil(width / 768) * math.ceil(height / 768) * TOKENS_PER_TILE
+
+def count_input_tokens(contents: list) -> int:
+    tokens = 0
+    for part in contents:
+        if isinstance(part, str):
+            tokens += len(part) // CHARS_PER_TOKEN
+        elif isinstance(part, list):
+            tokens += count_input_tokens(part)
+        elif isinstance(part, dict):
+            tokens += image_tokens(*Image.open(io.BytesIO(part["data"])).size)
+        else:
+            tokens += image_tokens(*part.size)
+    return tokens
+
+class TokenTimedModel(FakeGeminiModel):
+    """Answers like the real prompts would and sleeps for the token-dependent latency"""
+    def __init__(self, document_type: str, base_latency: float, input_ms_per_1k: float, output_ms_per_token: float):
+        super().__init__(latency=0.0)
+        self.document_type = document_type
+        self.base_latency = base_latency
+        self.input_ms_per_1k = input_ms_per_1k
+        self.output_ms_per_token = output_ms_per_token
+        self.log = []
+
+    def _answer(self, prompt: str) -> str:
+        if prompt == CLASSIFY_PROMPT:
+            return self.document_type
+        fixture = FIXTURES[self.document_type]
+        if prompt in TYPED_PROMPTS.values():
+            data = {name: fixture.get(name) for name, _ in TYPE_FIELDS[self.document_type][1]}
+            answer = {"data": data}
+        else:
+            # The generic prompt asks for every field, with the address bifurcated
+            data = {name: fixture.get(name) for name in GENERIC_FIELDS}
+            data["address"] = data["address"] or EMPTY_ADDRESS
+            answer = {"document_type": self.document_type, "data": data}
+        answer.update(confidence=0.95, confidence_reason="Document is clear")
+        return json.dumps(answer, indent=2)
+
+    async def generate_content_async(self, contents, **kwargs):
+        text = self._answer(contents[0])
+        tokens_in, tokens_out = count_input_tokens(contents), len(text) // CHARS_PER_TOKEN
+        self.log.append(("classify" if contents[0] == CLASSIFY_PROMPT else "extract", tokens_in, tokens_out))
+        self.calls += 1
+        await asyncio.sleep(self.base_latency + tokens_in * self.input_ms_per_1k / 1e6 + tokens_out * self.output_ms_per_token / 1000)
+        return FakeResponse(text)
+
+async def run(document_type: str, image: bytes, classify_first: bool, args) -> tuple:
+    settings.CLASSIFY_FIRST = classify_first
+    model = gemini_client.model = TokenTimedModel(document_type, args.base_latency, args.input_ms_per_1k, args.output_ms_per_token)
+    latencies = []
+    for _ in range(args.repeats):
+        model.log.clear()
+        start = time.perf_counter()
+        result = await extract_document_data(image, f"{document_type.lower()}.png", use_cache=False)
+        latencies.append(time.perf_counter() - start)
+    assert result["document_type"] == document_type, result["document_type"]
+    return model.log, min(latencies)
+
+def cost(log: list, args) -> float:
+    """Micro-dollars for the calls in a run log"""
+    total = 0.0
+    for kind, tokens_in, tokens_out in log:
+        if kind == "classify":
+            total += tokens_in * args.fast_input_price + tokens_out * args.fast_output_price
+        else:
+            total += tokens_in * args.input_price + tokens_out * args.output_price
+    return total
+
+async def main(args):
+    setup_sqlite_app(app)
+    # Keep the image stage in-process; this benchmark is about the model calls
+    image_processor._process_pool = None
+    settings.GEMINI_CASCADE_ENABLED = False
+
+    print(f"📊 Classify-then-extract vs single prompt (base {args.base_latency} s, "
+          f"{args.input_ms_per_1k} ms/1k input tokens, {args.output_ms_per_token} ms/output token)\n")
+    header = (
+        f"{'document type':<20}{'single in/out':>15}{'two-stage in/out':>18}{'  (classify)':<14}"
+        f"{'single ms':>10}{'two-stage ms':>14}{'single µ$':>11}{'two-stage µ$':>14}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    totals = {"single": [0, 0, 0.0, 0.0], "two": [0, 0, 0.0, 0.0]}
+    for i, document_type in enumerate(FIXTURES):
+        image = make_sample_image(1654 + i, 2339)
+        single_log, single_s = await run(document_type, image, False, args)
+        two_log, two_s = await run(document_type, image, True, args)
+
+        rows = {}
+        for key, log, seconds in (("single", single_log, single_s), ("two", two_log, two_s)):
+            rows[key] = (sum(entry[1] for entry in log), sum(entry[2] for entry in log), seconds, cost(log, args))
+            totals[key] = [total + value for total, value in zip(totals[key], rows[key])]
+        classify = next((entry for entry in two_log if entry[0] == "classify"), ("classify", 0, 0))
+        single, two = rows["single"], rows["two"]
+        print(
+            f"{document_type:<20}{single[0]:>9}/{single[1]:<5}{two[0]:>12}/{two[1]:<5}"
+            f"  {'(' + str(classify[1]) + '/' + str(classify[2]) + ')':<12}"
+            f"{single[2] * 1000:>10.0f}{two[2] * 1000:>14.0f}{single[3]:>11.0f}{two[3]:>14.0f}"
+        )
+
+    print("-" * len(header))
+    single, two = totals["single"], totals["two"]
+    n = len(FIXTURES)
+    print(
+        f"{'mean':<20}{single[0] / n:>9.0f}/{single[1] / n:<5.0f}{two[0] / n:>12.0f}/{two[1] / n:<5.0f}{'':<14}"
+        f"{single[2] / n * 1000:>10.0f}{two[2] / n * 1000:>14.0f}{single[3] / n:>11.0f}{two[3] / n:>14.0f}"
+    )
+    print(
+        f"\nTwo-stage vs single prompt: input tokens {(two[0] / single[0] - 1) * 100:+.0f}%, "
+        f"output tokens {(two[1] / single[1] - 1) * 100:+.0f}%, latency {(two[2] / single[2] - 1) * 100:+.0f}%, "
+        f"cost {(two[3] / single[3] - 1) * 100:+.0f}%"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark classify-then-extract against the single generic prompt")
+    parser.add_argument("--base-latency", type=float, default=0.35, help="Fixed model latency per call in seconds")
+    parser.add_argument("--input-ms-per-1k", type=float, default=20, help="Prefill time per 1000 input tokens (ms)")
+    parser.add_argument("--output-ms-per-token", type=float, default=4, help="Decode time per output token (ms)")
+    parser.add_argument("--input-price", type=float, default=0.30, help="Extraction model $ per million input tokens")
+    parser.add_argument("--output-price", type=float, default=2.50, help="Extraction model $ per million output tokens")
+    parser.add_argument("--fast-input-price", type=float, default=0.10, help="Fast tier $ per million input tokens (classification)")
+    parser.add_argument("--fast-output-price", type=float, default=0.40, help="Fast tier $ per million output tokens (classification)")
+    parser.add_argument("--repeats", type=int, default=2, help="Runs per document type and mode (best is reported)")
+    asyncio.run(main(parser.parse_args()))
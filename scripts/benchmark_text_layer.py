@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PDF text-layer fast path (services/text_layer.py) on born-digital
+fixtures: a GST REG-06 certificate and an MCA certificate of incorporation that
+parse completely (text_local, no model call), a GST certificate with its
+address missing and an FSSAI licence printing the holder's GSTIN (both
+text_prompt) and a PDF with no text layer (image).
+
+Reports the chosen path, the time to pick it, and the model payload for the
+text path versus the page-image path. Image tokens are estimated at 258 tokens
+per 768x768 tile (Gemini's image pricing) unless poppler is installed, in which
+case the scanned page is rasterized and measured too. Text tokens are estimated
+at 4 characters per token.
+
+Usage:
+    python scripts/benchmark_text_layer.py --repeats 20
+"""
+import argparse
+import math
+import shutil
+import time
+
+import benchmark_common  # noqa: F401  (sets up sys.path)
+
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.prompts import EXTRACTION_PROMPT, TEXT_LAYER_PROMPT
+from kyc_extractor.services import text_layer
+
+# A4 in PDF points, rendered at PDF_DPI for the image estimate
+A4_POINTS = (595, 842)
+TOKENS_PER_IMAGE_TILE = 258
+CHARS_PER_TOKEN = 4
+
+GST_LINES = [
+    "Government of India",
+    "Form GST REG-06",
+    "[See Rule 10(1)]",
+    "Registration Certificate",
+    "Registration Number: 27ABCDE1234F1Z5",
+    "1. Legal Name: ABC TRADING PRIVATE LIMITED",
+    "2. Trade Name, if any: ABC TRADERS",
+    "3. Constitution of Business: Private Limited Company",
+    "4. Address of Principal Place of Business: 123, Market Road,",
+    "Andheri West, Mumbai, Maharashtra, 400058",
+    "5. Date of Liability: 15/01/2023",
+    "6. Period of Validity From: 15/01/2023 To: Not Applicable",
+    "7. Type of Registration: Regular",
+    "8. Particulars of Approving Authority: Superintendent, Range-III",
+    "Signature: Digitally signed by DS GOODS AND SERVICES TAX NETWORK",
+    "Date of issue of Certificate: 20/01/2023",
+]
+
+MCA_LINES = [
+    "GOVERNMENT OF INDIA",
+    "MINISTRY OF CORPORATE AFFAIRS",
+    "Central Registration Centre",
+    "Certificate of Incorporation",
+    "[Pursuant to sub-section (2) of section 7 and sub-section (1) of section 8 of the Companies Act, 2013",
+    "and rule 18 of the Companies (Incorporation) Rules, 2014]",
+    "I hereby certify that XYZ TECHNOLOGIES PRIVATE LIMITED is incorporated on this Tenth day of March, 2021",
+    "under the Companies Act, 2013 (18 of 2013) and that the company is limited by shares.",
+    "The Corporate Identity Number of the company is U72900KA2021PTC123456.",
+    "The Permanent Account Number (PAN) of the company is AAACX1234B",
+    "Registered Office Address: No. 45, 2nd Floor, Koramangala 5th Block,",
+    "Bengaluru, Karnataka, 560095",
+    "Given under my hand at Manesar this 10/03/2021",
+]
+
+FSSAI_LINES = [
+    "Government of India",
+    "Food Safety and Standards Authority of India",
+    "License under Food Safety and Standards Act, 2006",
+    "License Number: 11521999000123",
+    "Name of Business: ABC TRADING PRIVATE LIMITED",
+    "GSTIN: 27ABCDE1234F1Z5",
+    "Address: 123, Market Road,",
+    "Andheri West, Mumbai, Maharashtra, 400058",
+    "Date of Issue: 01/04/2023",
+]
+
+def make_pdf(pages: list) -> bytes:
+    """Minimal PDF with one Helvetica text line per entry; an empty page list gives a page with no text"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages or [[]]:
+        stream = "BT /F1 10 Tf 50 790 Td 14 TL\n" + "".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '\n" for line in lines
+        ) + "ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {A4_POINTS[0]} {A4_POINTS[1]}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+FIXTURES = [
+    ("GST REG-06", make_pdf([GST_LINES]), text_layer.TEXT_LOCAL),
+    ("MCA incorporation", make_pdf([MCA_LINES]), text_layer.TEXT_LOCAL),
+    ("GST, no address", make_pdf([[line for line in GST_LINES if "Address" not in line and "Andheri" not in line]]), text_layer.TEXT_PROMPT),
+    ("FSSAI with GSTIN", make_pdf([FSSAI_LINES]), text_layer.TEXT_PROMPT),
+    ("scanned (no text)", make_pdf([]), text_layer.IMAGE),
+]
+
+def estimated_image_tokens(pages: int = 1) -> tuple:
+    """(tokens, pixels) for A4 pages at the model's DPI and size cap"""
+    width, height = (round(edge / 72 * settings.PDF_DPI) for edge in A4_POINTS)
+    scale = min(1.0, settings.MODEL_IMAGE_MAX_EDGE / max(width, height))
+    width, height = round(width * scale), round(height * scale)
+    tiles = math.ceil(width / 768) * math.ceil(height / 768)
+    return tiles * TOKENS_PER_IMAGE_TILE * pages, (width, height)
+
+def rasterized_bytes(pdf: bytes) -> int:
+    from kyc_extractor.services.image_processor import image_processor
+    document = image_processor.process_file(pdf, "scan.pdf")
+    _, stats = image_processor.prepare_for_model(document)
+    return stats["sent_bytes"]
+
+def main(repeats: int):
+    prompt_tokens = len(EXTRACTION_PROMPT) // CHARS_PER_TOKEN
+    image_tokens, image_size = estimated_image_tokens()
+    has_poppler = shutil.which("pdftoppm") is not None
+
+    print("📊 PDF text-layer fast path\n")
+    print(f"Image path estimate: {image_size[0]}x{image_size[1]} page -> {image_tokens} image tokens + {prompt_tokens} prompt tokens")
+    if not has_poppler:
+        print("(poppler not installed: image path payload is estimated, not rasterized)")
+    print()
+
+    header = f"{'fixture':<20}{'path':<13}{'expected':>10}{'ms':>8}{'chars':>7}{'tokens text/image':>20}{'model call':>12}"
+    print(header)
+    print("-" * len(header))
+
+    passed = True
+    for name, pdf, expected in FIXTURES:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            path, text, local_result = text_layer.choose_path(pdf)
+            times.append(time.perf_counter() - start)
+
+        if path == text_layer.TEXT_LOCAL:
+            tokens = "0"
+        elif path == text_layer.TEXT_PROMPT:
+            tokens = str(prompt_tokens + len(TEXT_LAYER_PROMPT.format(text=text)) // CHARS_PER_TOKEN)
+        else:
+            tokens = str(prompt_tokens + image_tokens)
+        ok = path == expected
+        passed = passed and ok
+        print(
+            f"{name:<20}{path:<13}{'✅' if ok else '❌ ' + expected:>10}{min(times) * 1000:>8.1f}"
+            f"{len(text or ''):>7}{tokens + '/' + str(prompt_tokens + image_tokens):>20}"
+            f"{'no' if path == text_layer.TEXT_LOCAL else 'yes':>12}"
+        )
+        if local_result:
+            data = local_result["data"]
+            print(f"{'':<20}-> {local_result['document_type']} {data['identification_number']} | {data['company_name']} | "
+                  f"{data['address']['city']}, {data['address']['state']} {data['address']['pincode']} | {data['issue_date']}")
+
+    if has_poppler:
+        print(f"\nRasterized scanned page payload: {rasterized_bytes(FIXTURES[-1][1]) / 1024:.0f} KB")
+
+    print("\n✨ All fixtures took the expected path" if passed else "\n❌ Some fixtures took an unexpected path")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PDF text-layer fast path")
+    parser.add_argument("--repeats", type=int, default=20, help="Timing repeats per fixture (best is reported)")
+    args = parser.parse_args()
+    raise SystemExit(0 if main(args.repeats) else 1)
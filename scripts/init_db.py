@@ -10,8 +10,8 @@ import os
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from kyc_extractor.db.database import engine, Base
-from kyc_extractor.db.models import Extraction
+from kyc_extractor.db.database import engine
+from kyc_extractor.db.migrations import run_migrations
 import pymysql
 from kyc_extractor.core.config import settings
 
@@ -38,9 +38,9 @@ def create_database():
         sys.exit(1)
 
 def create_tables():
-    """Create all tables"""
+    """Create all tables by applying the schema migrations"""
     try:
-        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         print("✅ All tables created successfully")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
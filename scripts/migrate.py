@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Applies pending schema migrations (kyc_extractor/db/migrations.py) to the
+configured database (MySQL settings or DATABASE_URL).
+
+Usage:
+    python scripts/migrate.py              # apply all pending migrations
+    python scripts/migrate.py --status     # list applied and pending migrations
+    python scripts/migrate.py --target 8   # apply up to version 8
+"""
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyc_extractor.db.database import engine
+from kyc_extractor.db.migrations import MIGRATIONS, applied_versions, run_migrations
+
+def show_status():
+    applied = applied_versions(engine)
+    for migration in MIGRATIONS:
+        print(f"{'✅' if migration.version in applied else '⏳'} {migration.version:>3}  {migration.name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    parser.add_argument("--target", type=int, default=None, help="Highest version to apply (default: latest)")
+    args = parser.parse_args()
+
+    if args.status:
+        show_status()
+        sys.exit(0)
+
+    try:
+        applied = run_migrations(engine, args.target)
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+    if applied:
+        print(f"✅ Applied {len(applied)} migration(s), now at version {applied[-1].version}")
+    else:
+        print("⚠️ Schema already up to date. Nothing to do.")
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Deletes expired rows (older than EXTRACTION_CACHE_TTL_SECONDS) from the
+extraction_cache table. The API does this every
+EXTRACTION_CACHE_PURGE_INTERVAL_SECONDS; use this script when that is
+disabled or to run it from cron.
+
+Usage:
+    python scripts/purge_cache.py
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyc_extractor.services.cache import extraction_cache
+
+if __name__ == "__main__":
+    print(f"🧹 Purging extraction cache entries older than {extraction_cache.ttl_seconds} s...")
+    try:
+        deleted = extraction_cache.purge_expired()
+    except Exception as e:
+        print(f"❌ Purge failed: {e}")
+        sys.exit(1)
+    print(f"✅ Deleted {deleted} expired entr{'y' if deleted == 1 else 'ies'}")
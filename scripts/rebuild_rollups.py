@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Rebuilds the statistics rollups (extraction_rollups) from the extractions
+table, e.g. after extractions were edited or imported outside the API.
+Pause uploads while it runs: extractions stored meanwhile may be missed.
+
+Usage:
+    python scripts/rebuild_rollups.py
+"""
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyc_extractor.db.database import SessionLocal
+from kyc_extractor.db.crud import rebuild_rollups
+
+if __name__ == "__main__":
+    print("🔄 Rebuilding extraction rollups...")
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        rows = rebuild_rollups(db)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+    print(f"✅ Wrote {rows} rollup row(s) in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test that auto-crop (ImageProcessor._crop_and_deskew) only removes background.
+
+A page whose dark, full-width header band carries white text must keep the
+band; faint print outside the ink (light-gray footer) must not be cut off; a
+phone photo on a table is still cropped to the paper without losing text;
+clean scans are left alone; auto-crop is off unless MODEL_IMAGE_AUTOCROP is set.
+
+Usage:
+    python scripts/test_autocrop.py
+"""
+import os
+
+import numpy as np
+from benchmark_autocrop import clean_scan, phone_photo
+
+from PIL import Image, ImageDraw, ImageFont
+from kyc_extractor.core.config import Settings, settings
+from kyc_extractor.services.image_processor import image_processor
+
+def header_band_page() -> Image.Image:
+    page = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    draw.rectangle([0, 0, 1240, 220], fill=(20, 40, 90))
+    draw.text((120, 60), "GOVERNMENT OF INDIA - MINISTRY OF FINANCE", fill="white", font=font)
+    draw.text((120, 130), "CERTIFICATE OF REGISTRATION", fill="white", font=font)
+    for i in range(12):
+        draw.text((120, 320 + i * 60), f"Field {i}: ABC TRADING PRIVATE LIMITED 27ABCDE1234F1Z5", fill="black", font=font)
+    return page
+
+def faint_footer_page() -> Image.Image:
+    page = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=28)
+    for i in range(6):
+        draw.text((200, 500 + i * 60), f"Registration Number: 27ABCDE1234F1Z{i}", fill="black", font=font)
+    draw.text((200, 1600), "This is a system generated certificate. Verify at gst.gov.in", fill=(215, 215, 215), font=font)
+    return page
+
+def kept(original: Image.Image, cropped: Image.Image, mask) -> float:
+    """Share of the original's `mask` pixels still present after cropping"""
+    before = mask(np.asarray(original.convert("L"), dtype=np.int16)).sum()
+    after = mask(np.asarray(cropped.convert("L"), dtype=np.int16)).sum()
+    return after / before if before else 1.0
+
+def crop(image: Image.Image) -> tuple:
+    settings.MODEL_IMAGE_AUTOCROP = True
+    settings.MODEL_IMAGE_DESKEW = True
+    return image_processor._crop_and_deskew(image.copy())
+
+def main():
+    passed = True
+
+    # 1. Dark header band with white text
+    print("🧪 Test 1: full-width header band is page content")
+    page = header_band_page()
+    cropped, info = crop(page)
+    band_kept = kept(page, cropped, lambda gray: gray < 80)
+    text_kept = kept(page, cropped, lambda gray: gray > 200)
+    top_row = np.asarray(cropped.convert("L"))[0]
+    ok = cropped.width == page.width and band_kept >= 0.999 and top_row.mean() < 128 and info["pixel_reduction"] < 0.5
+    print(f"   {'✅' if ok else '❌'} cropped to {info['cropped_size']} ({info['pixel_reduction']:.0%} fewer pixels), "
+          f"band kept={band_kept:.1%}, top row mean={top_row.mean():.0f}, white pixels kept={text_kept:.0%}")
+    passed = passed and ok
+
+    # 2. Faint print outside the ink
+    print("🧪 Test 2: light-gray footer outside the dark text")
+    page = faint_footer_page()
+    cropped, info = crop(page)
+    footer_kept = kept(page, cropped, lambda gray: (gray > 150) & (gray < 240))
+    ok = footer_kept >= 0.999
+    print(f"   {'✅' if ok else '❌'} cropped to {info['cropped_size']}, footer kept={footer_kept:.1%}")
+    passed = passed and ok
+
+    # 3. Phone photo on a table is still cropped
+    print("🧪 Test 3: phone photo on a table")
+    # Upright, so the text pixels are not resampled by the rotation
+    photo = phone_photo(0)
+    cropped, info = crop(photo)
+    text_kept = kept(photo, cropped, lambda gray: gray < 60)
+    ok = info["pixel_reduction"] > 0.3 and text_kept >= 0.999
+    print(f"   {'✅' if ok else '❌'} {info['pixel_reduction']:.0%} fewer pixels, text kept={text_kept:.1%}")
+    passed = passed and ok
+
+    # 4. Clean scan untouched
+    print("🧪 Test 4: clean full-page scan")
+    page = clean_scan()
+    _, info = crop(page)
+    ok = info["pixel_reduction"] == 0
+    print(f"   {'✅' if ok else '❌'} {info['pixel_reduction']:.0%} fewer pixels")
+    passed = passed and ok
+
+    # 5. Opt-in
+    print("🧪 Test 5: auto-crop is off by default")
+    if "MODEL_IMAGE_AUTOCROP" in os.environ:
+        print("   ⚠️  skipped: MODEL_IMAGE_AUTOCROP is set in the environment")
+    else:
+        # Class attribute: the value read at import, before the tests above switched it on
+        ok = Settings.MODEL_IMAGE_AUTOCROP is False
+        print(f"   {'✅' if ok else '❌'} MODEL_IMAGE_AUTOCROP default={Settings.MODEL_IMAGE_AUTOCROP}")
+        passed = passed and ok
+
+    print("\n✨ All auto-crop tests passed!" if passed else "\n❌ Some auto-crop tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
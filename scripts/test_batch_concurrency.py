@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test POST /extract/batch in-process: results and errors must keep the
+upload order even when later files finish first, no more than
+BATCH_CONCURRENCY files may be in flight at once, and a file that fails
+(unreadable, oversized, model error) must not abort the others.
+
+Runs in-process against a throwaway SQLite database with the full
+pipeline (model cascade, classify-first) and a two-tier fake model (see
+scripts/test_batch.py for the same request against a running server).
+
+Usage:
+    python scripts/test_batch_concurrency.py
+"""
+import asyncio
+import copy
+import json
+
+from benchmark_common import FakeGeminiModel, FakeResponse, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client, use_production_pipeline
+
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.prompts import CLASSIFY_PROMPT
+from kyc_extractor.db.models import Extraction
+
+FILES = 10
+CONCURRENCY = 3
+UNREADABLE, OVERSIZED = 3, 7
+
+DOUBTFUL_RESULT = copy.deepcopy(SAMPLE_RESULT)
+DOUBTFUL_RESULT["confidence"] = 0.5
+
+class TrackingModel(FakeGeminiModel):
+    """
+    Fast tier. Earlier extraction calls take longer, so files finish out of
+    upload order; the `doubtful_call`-th extraction answers with low
+    confidence and is escalated. Records the peak of calls in flight.
+    """
+    def __init__(self, doubtful_call: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.extractions = 0
+        self.active = 0
+        self.peak = 0
+        self.doubtful_call = doubtful_call
+
+    async def generate_content_async(self, contents, **kwargs):
+        classify = contents[0] == CLASSIFY_PROMPT
+        if not classify:
+            self.extractions += 1
+        call = self.extractions
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01 if classify else max(0.05, 0.4 - 0.04 * call))
+        finally:
+            self.active -= 1
+        if classify:
+            self.classify_calls += 1
+            return FakeResponse(self.result["document_type"]).with_prompt(contents)
+        self.calls += 1
+        result = DOUBTFUL_RESULT if call == self.doubtful_call else self.result
+        return FakeResponse(json.dumps(result)).with_prompt(contents)
+
+class FailingModel(FakeGeminiModel):
+    """Strong tier that rejects every request (not retryable, so it fails that file only)"""
+    async def generate_content_async(self, contents, **kwargs):
+        self.calls += 1
+        raise ValueError("400 Request contains an invalid argument")
+
+def upload_files() -> list:
+    image = make_sample_image(620, 877)
+    files = []
+    for index in range(FILES):
+        # Distinct content, so identical uploads are not coalesced into one model call
+        payload = make_sample_image(620 + index, 877)
+        if index == UNREADABLE:
+            payload = b"not an image"
+        elif index == OVERSIZED:
+            payload = image * 4
+        files.append(("files", (f"doc{index}.png", payload, "image/png")))
+    settings.MAX_UPLOAD_BYTES = len(image) * 2
+    return files
+
+def upload_index(filename: str) -> int:
+    return int(filename[len("doc"):-len(".png")])
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    settings.BATCH_CONCURRENCY = CONCURRENCY
+    settings.PACKING_ENABLED = False
+    fast, strong = use_production_pipeline(TrackingModel(doubtful_call=2), FailingModel())
+    files = upload_files()
+    passed = True
+
+    async with make_client(app) as client:
+        response = await client.post("/extract/batch", params={"use_cache": "false"}, files=files)
+    batch = response.json()
+    db = SessionLocal()
+    filenames = dict(db.query(Extraction.request_id, Extraction.filename).all())
+    db.close()
+    result_order = [upload_index(filenames[result["request_id"]]) for result in batch["results"]]
+    error_order = [upload_index(error["filename"]) for error in batch["errors"]]
+
+    # 1. Failures stay with their file
+    print("🧪 Test 1: failing files do not abort the batch")
+    errors = {upload_index(error["filename"]): error["error"] for error in batch["errors"]}
+    ok = (
+        response.status_code == 200
+        and batch["total_processed"] == FILES
+        and batch["successful"] == FILES - 3
+        and batch["failed"] == 3
+        and UNREADABLE in errors and "maximum upload size" in errors.get(OVERSIZED, "")
+    )
+    print(f"   {'✅' if ok else '❌'} {response.status_code}, successful={batch.get('successful')}, failed={batch.get('failed')}, "
+          f"errors={ {index: error[:40] for index, error in errors.items()} }")
+    passed = passed and ok
+
+    # 2. Upload order, although earlier files were slower
+    print("🧪 Test 2: results and errors keep the upload order")
+    ok = result_order == sorted(result_order) and error_order == sorted(error_order)
+    ok = ok and sorted(result_order + error_order) == list(range(FILES))
+    print(f"   {'✅' if ok else '❌'} results={result_order}, errors={error_order}")
+    passed = passed and ok
+
+    # 3. At most BATCH_CONCURRENCY files in flight
+    print("🧪 Test 3: BATCH_CONCURRENCY is respected")
+    ok = fast.peak == CONCURRENCY
+    print(f"   {'✅' if ok else '❌'} peak model calls in flight={fast.peak} (BATCH_CONCURRENCY={CONCURRENCY}), "
+          f"fast tier: {fast.classify_calls} classifications, {fast.calls} extractions")
+    passed = passed and ok
+
+    # 4. Both tiers were used
+    print("🧪 Test 4: production pipeline")
+    ok = fast.classify_calls == FILES - 2 and fast.calls == FILES - 2 and strong.calls == 1
+    print(f"   {'✅' if ok else '❌'} classified={fast.classify_calls}, fast extractions={fast.calls}, escalated={strong.calls}")
+    passed = passed and ok
+
+    print("\n✨ All batch tests passed!" if passed else "\n❌ Some batch tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Test the extraction result cache (kyc_extractor/services/cache.py).
+
+The in-process tier must evict the least recently used entry and drop
+expired ones; a result stored by one process must be served from the
+extraction_cache table to another (and promoted to its memory tier) until it
+expires; purge_expired and the background purge task must delete expired
+rows only; changing the cascade (or its fast model), classify-first or JSON-mode settings must
+change the key; /extract must skip the lookup with use_cache=false but still
+store the fresh result.
+
+Runs in-process against a throwaway SQLite database.
+
+Usage:
+    python scripts/test_cache.py
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmark_common import FakeGeminiModel, make_sample_image, setup_sqlite_app, make_client
+
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.models import ExtractionCacheEntry
+from kyc_extractor.services.cache import ExtractionCache, extraction_cache, hash_content
+
+def result(n: int) -> dict:
+    return {"document_type": "GST_CERTIFICATE", "company_name": f"Company {n}"}
+
+def row_count(SessionLocal) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(ExtractionCacheEntry).count()
+    finally:
+        db.close()
+
+def backdate(SessionLocal, seconds: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(ExtractionCacheEntry).update({"created_at": datetime.utcnow() - timedelta(seconds=seconds)})
+        db.commit()
+    finally:
+        db.close()
+
+async def test_memory_tier() -> bool:
+    passed = True
+
+    # 1. LRU eviction
+    print("🧪 Test 1: least recently used entry is evicted")
+    cache = ExtractionCache(max_entries=2, persistent=False)
+    a, b, c = (cache.make_key(sha) for sha in ("a" * 64, "b" * 64, "c" * 64))
+    await cache.set(a, result(1))
+    await cache.set(b, result(2))
+    await cache.get(a)
+    await cache.set(c, result(3))
+    found = [await cache.get(key) is not None for key in (a, b, c)]
+    ok = found == [True, False, True] and cache.evictions == 1
+    print(f"   {'✅' if ok else '❌'} a/b/c cached={found}, evictions={cache.evictions}")
+    passed = passed and ok
+
+    # 2. TTL expiry
+    print("🧪 Test 2: memory entries expire after the TTL")
+    cache = ExtractionCache(ttl_seconds=0.2, persistent=False)
+    await cache.set(a, result(1))
+    fresh = await cache.get(a)
+    await asyncio.sleep(0.25)
+    expired = await cache.get(a)
+    ok = fresh == result(1) and expired is None and cache.stats()["entries"] == 0
+    print(f"   {'✅' if ok else '❌'} within TTL={fresh is not None}, after TTL={expired is not None}")
+    passed = passed and ok
+    return passed
+
+async def test_persistent_tier(SessionLocal) -> bool:
+    passed = True
+
+    # 3. Served from the table to another process
+    print("🧪 Test 3: persistent tier")
+    writer = ExtractionCache(session_factory=SessionLocal)
+    key = writer.make_key("d" * 64)
+    await writer.set(key, result(4))
+    reader = ExtractionCache(session_factory=SessionLocal)
+    first = await reader.get(key)
+    second = await reader.get(key)
+    db = SessionLocal()
+    hit_count = db.query(ExtractionCacheEntry).one().hit_count
+    db.close()
+    ok = first == second == result(4) and reader.persistent_hits == 1 and reader.memory_hits == 1 and hit_count == 1
+    print(f"   {'✅' if ok else '❌'} persistent hits={reader.persistent_hits}, memory hits={reader.memory_hits}, hit_count={hit_count}")
+    passed = passed and ok
+
+    # 4. Expired rows are ignored and purged
+    print("🧪 Test 4: persistent TTL and purge_expired")
+    cache = ExtractionCache(ttl_seconds=3600, session_factory=SessionLocal)
+    await cache.set(cache.make_key("e" * 64), result(5))
+    backdate(SessionLocal, 7200)
+    await cache.set(cache.make_key("f" * 64), result(6))
+    cache.clear()
+    expired = await cache.get(cache.make_key("e" * 64))
+    deleted = cache.purge_expired()
+    remaining = row_count(SessionLocal)
+    ok = expired is None and deleted == 2 and remaining == 1
+    print(f"   {'✅' if ok else '❌'} expired served={expired is not None}, deleted={deleted}, remaining={remaining}")
+    passed = passed and ok
+
+    # 5. Background purge
+    print("🧪 Test 5: purge_periodically deletes expired rows")
+    backdate(SessionLocal, 7200)
+    task = asyncio.create_task(cache.purge_periodically(0.05))
+    for _ in range(40):
+        await asyncio.sleep(0.05)
+        if row_count(SessionLocal) == 0:
+            break
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    remaining = row_count(SessionLocal)
+    ok = remaining == 0 and task.cancelled()
+    print(f"   {'✅' if ok else '❌'} remaining rows={remaining}, task stopped={task.cancelled()}")
+    passed = passed and ok
+    return passed
+
+def test_key() -> bool:
+    # 6. Pipeline settings are part of the key
+    print("🧪 Test 6: pipeline settings change the key")
+    cache = ExtractionCache(persistent=False)
+    baseline = cache.make_key("a" * 64)
+    changes = [
+        ("GEMINI_CASCADE_ENABLED", not settings.GEMINI_CASCADE_ENABLED),
+        ("CLASSIFY_FIRST", not settings.CLASSIFY_FIRST),
+        ("GEMINI_JSON_MODE", not settings.GEMINI_JSON_MODE),
+    ]
+    differs = {}
+    for name, value in changes:
+        original = getattr(settings, name)
+        setattr(settings, name, value)
+        differs[name] = cache.make_key("a" * 64) != baseline
+        setattr(settings, name, original)
+
+    original_cascade, original_fast = settings.GEMINI_CASCADE_ENABLED, settings.GEMINI_FAST_MODEL_NAME
+    settings.GEMINI_CASCADE_ENABLED = True
+    cascade_key = cache.make_key("a" * 64)
+    settings.GEMINI_FAST_MODEL_NAME = original_fast + "-002"
+    differs["GEMINI_FAST_MODEL_NAME"] = cache.make_key("a" * 64) != cascade_key
+    settings.GEMINI_CASCADE_ENABLED, settings.GEMINI_FAST_MODEL_NAME = original_cascade, original_fast
+
+    unchanged = cache.make_key("a" * 64) == baseline
+    ok = all(differs.values()) and unchanged
+    print(f"   {'✅' if ok else '❌'} key changed: {differs}, restored settings give the same key: {unchanged}")
+    return ok
+
+async def test_endpoint(SessionLocal) -> bool:
+    # 7. use_cache=false
+    print("🧪 Test 7: /extract with use_cache=false")
+    model = FakeGeminiModel(latency=0.01)
+    gemini_client.model = model
+    extraction_cache.clear()
+    image = make_sample_image()
+    async def extract(**params):
+        response = await client.post("/extract", params=params, files={"file": ("doc.png", image, "image/png")})
+        return response.status_code
+    async with make_client(app) as client:
+        statuses = [await extract()]
+        after_first = model.calls
+        statuses.append(await extract())
+        after_hit = model.calls
+        # Only the memory tier still has it, so a stored result must come from the bypassed request
+        db = SessionLocal()
+        db.query(ExtractionCacheEntry).delete()
+        db.commit()
+        db.close()
+        statuses.append(await extract(use_cache="false"))
+        after_bypass = model.calls
+    extraction_cache.clear()
+    stored = await extraction_cache.get(extraction_cache.make_key(hash_content(image)))
+    ok = statuses == [200] * 3 and (after_first, after_hit, after_bypass) == (1, 1, 2) and stored is not None
+    print(f"   {'✅' if ok else '❌'} statuses={statuses}, model calls after miss/hit/bypass={after_first}/{after_hit}/{after_bypass}, "
+          f"result stored={stored is not None}")
+    return ok
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    passed = await test_memory_tier()
+    passed = await test_persistent_tier(SessionLocal) and passed
+    passed = test_key() and passed
+    passed = await test_endpoint(SessionLocal) and passed
+
+    print("\n✨ All extraction cache tests passed!" if passed else "\n❌ Some extraction cache tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test the Gemini model cascade (GeminiClient fast -> strong tiers).
+
+Clean documents must finish on the fast tier; low confidence, unparseable
+JSON and invalid IDs must be re-run on the strong model, and the stored
+extraction must record the tier and the escalation reason. Finishes with a
+mixed workload (mostly clean GST certificates) comparing median latency and
+model cost against sending everything to the strong model. A typed
+extraction answering wrong_type is re-run once with the generic prompt, even
+if the generic reply sets wrong_type too.
+
+Runs in-process against a throwaway SQLite database and fake models.
+
+Usage:
+    python scripts/test_cascade.py --documents 40
+"""
+import argparse
+import asyncio
+import copy
+import time
+
+from benchmark_common import FakeGeminiModel, FakeResponse, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client, percentile
+
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.models import Extraction
+
+# Relative price per call of the strong tier vs the fast tier (input-token pricing ratio)
+STRONG_COST = 1.0
+FAST_COST = 0.33
+
+class BrokenJsonModel(FakeGeminiModel):
+    """Fast-tier model that answers with prose the JSON repair pass cannot rescue"""
+    def _response(self):
+        self.calls += 1
+        return FakeResponse("Sorry, I cannot read the identification number on this document.")
+
+def result_with(confidence: float = 0.95, identification_number: str = "27ABCDE1234F1Z5", document_type: str = "GST_CERTIFICATE") -> dict:
+    result = copy.deepcopy(SAMPLE_RESULT)
+    result["confidence"] = confidence
+    result["document_type"] = document_type
+    result["data"]["identification_number"] = identification_number
+    return result
+
+def use_models(fast, strong):
+    gemini_client.fast_model = fast
+    gemini_client.model = strong
+    return fast, strong
+
+async def main(documents: int):
+    SessionLocal = setup_sqlite_app(app)
+    settings.GEMINI_CASCADE_ENABLED = True
+    passed = True
+
+    cases = [
+        ("clean GST certificate", FakeGeminiModel(0.01, result_with()), "fast", None, 0),
+        ("low confidence", FakeGeminiModel(0.01, result_with(confidence=0.6)), "strong", "low_confidence", 1),
+        ("invalid GSTIN", FakeGeminiModel(0.01, result_with(identification_number="27ABCDE1234F1Z")), "strong", "invalid_id", 1),
+        ("missing GSTIN", FakeGeminiModel(0.01, result_with(identification_number=None)), "strong", "invalid_id", 1),
+        ("broken JSON", BrokenJsonModel(0.01), "strong", "invalid_response", 1),
+        ("OTHER without an ID", FakeGeminiModel(0.01, result_with(identification_number=None, document_type="OTHER")), "fast", None, 0),
+    ]
+
+    async with make_client(app) as client:
+        # 1. Escalation rules, end to end through /extract
+        print("🧪 Test 1: escalation rules")
+        for i, (name, fast, expected_tier, expected_reason, strong_calls) in enumerate(cases):
+            _, strong = use_models(fast, FakeGeminiModel(0.01, result_with()))
+            image = make_sample_image(1240 + i, 1754)
+            response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("doc.png", image, "image/png")})
+            body = response.json()
+            db = SessionLocal()
+            row = db.query(Extraction).filter(Extraction.request_id == body.get("request_id")).first()
+            db.close()
+            ok = (
+                response.status_code == 200 and row is not None
+                and row.model_tier == expected_tier and row.escalation_reason == expected_reason
+                and body["model_tier"] == expected_tier and strong.calls == strong_calls and fast.calls == 1
+            )
+            print(f"   {'✅' if ok else '❌'} {name:<22} tier={body.get('model_tier')} reason={body.get('escalation_reason')} strong calls={strong.calls}")
+            passed = passed and ok
+
+        # 2. Thresholds are tunable at runtime
+        print("🧪 Test 2: tunable confidence threshold")
+        settings.GEMINI_ESCALATION_MIN_CONFIDENCE = 0.5
+        _, strong = use_models(FakeGeminiModel(0.01, result_with(confidence=0.6)), FakeGeminiModel(0.01, result_with()))
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("doc.png", make_sample_image(1300, 1754), "image/png")})
+        ok = response.json().get("model_tier") == "fast" and strong.calls == 0
+        print(f"   {'✅' if ok else '❌'} confidence 0.6 kept on the fast tier with threshold 0.5")
+        passed = passed and ok
+        settings.GEMINI_ESCALATION_MIN_CONFIDENCE = 0.85
+
+        # 3. Mixed workload: 80% clean, 20% needing the strong model
+        print(f"🧪 Test 3: mixed workload ({documents} documents, fast 0.3 s, strong 0.9 s)")
+
+        class MixedFastModel(FakeGeminiModel):
+            def _response(self):
+                self.result = result_with(confidence=0.6 if self.calls % 5 == 4 else 0.95)
+                return super()._response()
+
+        report = {}
+        for label, cascade in (("strong only", False), ("cascade", True)):
+            settings.GEMINI_CASCADE_ENABLED = cascade
+            fast, strong = use_models(MixedFastModel(0.3), FakeGeminiModel(0.9, result_with()))
+            latencies = []
+            for _ in range(documents):
+                start = time.perf_counter()
+                await gemini_client.extract_data_async("document", id_is_valid=lambda result: True)
+                latencies.append(time.perf_counter() - start)
+            cost = fast.calls * FAST_COST + strong.calls * STRONG_COST
+            report[label] = (percentile(latencies, 50), cost)
+            print(f"   {label:<12} p50={percentile(latencies, 50) * 1000:.0f} ms  p95={percentile(latencies, 95) * 1000:.0f} ms  "
+                  f"fast calls={fast.calls} strong calls={strong.calls} relative cost={cost / documents:.2f}")
+        ok = report["cascade"][0] < report["strong only"][0] and report["cascade"][1] < report["strong only"][1]
+        print(f"   {'✅' if ok else '❌'} cascade lowers median latency and cost")
+        passed = passed and ok
+
+    # 4. Misclassified document: one generic re-run, no loop
+    print("🧪 Test 4: wrong_type re-runs once with the generic prompt")
+    settings.GEMINI_CASCADE_ENABLED = False
+    stray = result_with()
+    stray["wrong_type"] = True
+    _, strong = use_models(None, FakeGeminiModel(0.01, stray))
+    try:
+        result = await asyncio.wait_for(gemini_client.extract_data_async("document", document_type="GST_CERTIFICATE"), timeout=5)
+    except (asyncio.TimeoutError, RecursionError) as e:
+        result = {"error": type(e).__name__}
+    ok = strong.calls == 2 and "error" not in result and "wrong_type" not in result
+    print(f"   {'✅' if ok else '❌'} model calls={strong.calls}, wrong_type left in the result={'wrong_type' in result}")
+    passed = passed and ok
+
+    print("\n✨ All cascade tests passed!" if passed else "\n❌ Some cascade tests failed")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the Gemini model cascade")
+    parser.add_argument("--documents", type=int, default=40, help="Documents in the mixed workload")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(main(args.documents)) else 1)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test keyset (cursor) pagination of /history.
+
+Following next_cursor from the first page must return every extraction
+exactly once and in the same order as skip/limit paging - including rows
+that share an upload timestamp and rows without one - while filters keep
+applying, the total count is skipped unless asked for, and malformed
+cursors (or a cursor combined with skip) are rejected with 400.
+
+Runs in-process against a throwaway SQLite database.
+
+Usage:
+    python scripts/test_history_cursor.py
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from benchmark_common import setup_sqlite_app, make_client
+
+from kyc_extractor.main import app
+from kyc_extractor.db.models import Extraction
+
+def seed(SessionLocal) -> int:
+    """57 rows: runs of equal timestamps, two document types, three without a timestamp"""
+    db = SessionLocal()
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(54):
+        db.add(Extraction(
+            request_id=str(uuid.uuid4()),
+            filename=f"doc{i}.png",
+            document_type="GST_CERTIFICATE" if i % 3 else "PAN_CARD",
+            # Three rows per timestamp, so ties fall across page boundaries
+            uploaded_at=start + timedelta(minutes=i // 3)
+        ))
+    db.flush()
+    for i in range(3):
+        db.add(Extraction(request_id=str(uuid.uuid4()), filename=f"untimed{i}.png", document_type="PAN_CARD"))
+    db.flush()
+    # server_default fills in a timestamp; clear it for these rows
+    db.query(Extraction).filter(Extraction.filename.like("untimed%")).update({Extraction.uploaded_at: None}, synchronize_session=False)
+    db.commit()
+    count = db.query(Extraction).count()
+    db.close()
+    return count
+
+async def walk_offsets(client, limit: int, **params) -> list:
+    ids, skip = [], 0
+    while True:
+        body = (await client.get("/history", params={"skip": skip, "limit": limit, **params})).json()
+        ids += [item["request_id"] for item in body["items"]]
+        if len(body["items"]) < limit:
+            return ids
+        skip += limit
+
+async def walk_cursors(client, limit: int, **params) -> tuple:
+    """(request ids in page order, pages, totals seen on each page)"""
+    ids, pages, totals, cursor = [], 0, [], None
+    while True:
+        query = {"limit": limit, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = await client.get("/history", params=query)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        ids += [item["request_id"] for item in body["items"]]
+        totals.append(body["total"])
+        pages += 1
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids, pages, totals
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    count = seed(SessionLocal)
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. Cursor pages cover the table exactly once, in offset order
+        print(f"🧪 Test 1: walk {count} rows with next_cursor")
+        for limit in (1, 5, 10, 100):
+            expected = await walk_offsets(client, limit)
+            ids, pages, totals = await walk_cursors(client, limit)
+            ok = ids == expected and len(set(ids)) == count and pages == max(1, -(-count // limit))
+            print(f"   {'✅' if ok else '❌'} limit={limit}: {len(ids)} rows in {pages} pages, {len(set(ids))} distinct")
+            passed = passed and ok
+
+        # 2. Filters apply to cursor pages too
+        print("🧪 Test 2: document_type filter")
+        expected = await walk_offsets(client, 4, document_type="PAN_CARD")
+        ids, _, _ = await walk_cursors(client, 4, document_type="PAN_CARD")
+        ok = ids == expected and len(ids) == 21
+        print(f"   {'✅' if ok else '❌'} {len(ids)} PAN_CARD rows")
+        passed = passed and ok
+
+        # 3. Total is counted on the first page only, unless asked for
+        print("🧪 Test 3: optional total")
+        _, _, totals = await walk_cursors(client, 20)
+        _, _, counted = await walk_cursors(client, 20, include_total="true")
+        first = (await client.get("/history", params={"limit": 20, "include_total": "false"})).json()
+        ok = totals[0] == count and all(total is None for total in totals[1:]) and all(total == count for total in counted) and first["total"] is None
+        print(f"   {'✅' if ok else '❌'} default={totals} include_total={counted} first page without count={first['total']}")
+        passed = passed and ok
+
+        # 4. Bad requests
+        print("🧪 Test 4: invalid cursors")
+        cursor = (await client.get("/history", params={"limit": 5})).json()["next_cursor"]
+        statuses = [
+            (await client.get("/history", params={"cursor": "not-a-cursor"})).status_code,
+            (await client.get("/history", params={"cursor": "WzEsMiwzXQ"})).status_code,
+            (await client.get("/history", params={"cursor": cursor, "skip": 5})).status_code,
+        ]
+        ok = statuses == [400, 400, 400]
+        print(f"   {'✅' if ok else '❌'} statuses={statuses}")
+        passed = passed and ok
+
+    print("\n✨ All history cursor tests passed!" if passed else "\n❌ Some history cursor tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
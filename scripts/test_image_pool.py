@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test the image processing process pool (services/process_pool.py).
+
+Checks that work runs in other processes, that workers are recycled, that a
+full queue is rejected, and compares event-loop lag and throughput of the
+thread pool vs the process pool on large synthetic scans.
+
+Usage:
+    python scripts/test_image_pool.py --documents 12 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmark_common import make_sample_image, percentile
+
+from kyc_extractor.core.config import settings
+from kyc_extractor.services.image_processor import ImageProcessor
+from kyc_extractor.services.process_pool import ProcessPool, PoolBusyError
+
+def worker_pid(delay: float = 0.0) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+async def loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    """Records how late a 10 ms timer fires while the pool is busy"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+async def run_documents(processor: ImageProcessor, documents: list) -> dict:
+    stop = asyncio.Event()
+    lag = []
+    lag_task = asyncio.create_task(loop_lag(stop, lag))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(processor.process_for_model_async(doc, f"scan{i}.png") for i, doc in enumerate(documents)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    return {"seconds": elapsed, "lag_p95_ms": percentile(lag, 95) * 1000, "lag_max_ms": max(lag) * 1000, "results": results}
+
+async def main(documents: int, workers: int):
+    passed = True
+
+    # 1. Work runs in worker processes, which are replaced after max_tasks_per_worker
+    print("🧪 Test 1: worker recycling")
+    pool = ProcessPool(max_workers=1, queue_size=4, max_tasks_per_worker=2)
+    pids = [(await pool.run(worker_pid))[0] for _ in range(4)]
+    pool.shutdown()
+    if os.getpid() not in pids and len(set(pids)) == 2:
+        print(f"   ✅ 4 tasks on {len(set(pids))} worker processes")
+    else:
+        print(f"   ❌ pids={pids}")
+        passed = False
+
+    # 2. Tasks beyond workers + queue_size wait, then are rejected
+    print("🧪 Test 2: bounded queue")
+    pool = ProcessPool(max_workers=1, queue_size=1, queue_timeout=0.2)
+    await pool.run(worker_pid)  # start the worker
+    outcomes = await asyncio.gather(*(pool.run(worker_pid, 1.0) for _ in range(3)), return_exceptions=True)
+    rejected = sum(isinstance(outcome, PoolBusyError) for outcome in outcomes)
+    stats = pool.stats()
+    pool.shutdown()
+    if rejected == 1 and stats["rejected"] == 1 and stats["queue_wait"]["max_ms"] >= 900:
+        print(f"   ✅ 1 of 3 rejected, max queue wait {stats['queue_wait']['max_ms']:.0f} ms")
+    else:
+        print(f"   ❌ rejected={rejected} stats={stats}")
+        passed = False
+
+    # 3. Threads vs processes on large scans
+    print(f"🧪 Test 3: {documents} A4 300 DPI scans, threads vs {workers} processes ({os.cpu_count()} CPUs)")
+    scans = [make_sample_image(2480, 3508 + i) for i in range(documents)]
+
+    settings.IMAGE_PROCESS_WORKERS = 0
+    threads = await run_documents(ImageProcessor(), scans)
+
+    settings.IMAGE_PROCESS_WORKERS = workers
+    processor = ImageProcessor()
+    await processor.process_for_model_async(scans[0], "warmup.png")  # spawn workers outside the timing
+    processes = await run_documents(processor, scans)
+    pool_stats = processor.pool_stats()
+    processor.shutdown()
+
+    for name, run in (("threads", threads), ("processes", processes)):
+        print(f"   {name:<10} {run['seconds']:6.2f} s  loop lag p95 {run['lag_p95_ms']:6.1f} ms, max {run['lag_max_ms']:6.1f} ms")
+    print(f"   queue wait avg {pool_stats['queue_wait']['avg_ms']} ms, compute avg {pool_stats['compute']['avg_ms']} ms")
+
+    same = all(a[0]["data"] == b[0]["data"] for a, b in zip(threads["results"], processes["results"]))
+    has_timings = all("queue_wait_ms" in stats and "compute_ms" in stats for _, stats in processes["results"])
+    if same and has_timings:
+        print("   ✅ Identical payloads, timings reported per document")
+    else:
+        print(f"   ❌ identical={same} timings={has_timings}")
+        passed = False
+
+    print("\n✨ All image pool tests passed!" if passed else "\n❌ Some image pool tests failed")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the image processing process pool")
+    parser.add_argument("--documents", type=int, default=12, help="Documents processed concurrently in test 3")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes in test 3")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(main(args.documents, args.workers)) else 1)
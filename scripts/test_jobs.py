@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+End-to-end test of the async job API (POST /jobs, GET /jobs/{job_id}).
+
+Runs in-process against a throwaway SQLite database with the full
+pipeline (model cascade, classify-first) and a two-tier fake model, so no API
+key, MySQL server or running uvicorn is needed.
+
+Usage:
+    python scripts/test_jobs.py
+"""
+import asyncio
+import copy
+import time
+
+from benchmark_common import FakeGeminiModel, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client, use_production_pipeline
+
+from google.api_core import exceptions as google_exceptions
+from sqlalchemy import event
+from kyc_extractor.main import app
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.database import engine
+from kyc_extractor.db.models import Extraction
+from kyc_extractor.services.jobs import job_worker_pool
+
+class FlakyModel(FakeGeminiModel):
+    """Fails the first `failures` calls with a 503-style error"""
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    async def generate_content_async(self, contents, **kwargs):
+        if self.failures > 0:
+            self.failures -= 1
+            raise google_exceptions.ServiceUnavailable("503 Service Unavailable")
+        return await super().generate_content_async(contents, **kwargs)
+
+async def wait_for_job(client, job_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish, last status: {job['status']}")
+
+class CrashOnJobCompletion:
+    """Fails the first UPDATE that marks a job completed, as if the worker died right there"""
+    def __enter__(self):
+        self.crashed = False
+        event.listen(engine, "before_cursor_execute", self._maybe_crash)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._maybe_crash)
+
+    def _maybe_crash(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.crashed and statement.lstrip().upper().startswith("UPDATE EXTRACTION_JOBS") and "completed" in str(parameters):
+            self.crashed = True
+            raise RuntimeError("worker crashed")
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    job_worker_pool.poll_interval = 0.05
+    job_worker_pool.retry_delay = 0
+    await job_worker_pool.start()
+
+    payload = make_sample_image(620, 877)
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. Happy path: many jobs, all complete with their own extraction rows
+        print("🧪 Test 1: 10 queued jobs complete")
+        # Low confidence on the fast tier, so every job is also escalated to the strong one
+        doubtful = copy.deepcopy(SAMPLE_RESULT)
+        doubtful["confidence"] = 0.5
+        fast, strong = use_production_pipeline(FakeGeminiModel(latency=0.2, result=doubtful), FakeGeminiModel(latency=0.2))
+        start = time.perf_counter()
+        responses = [
+            await client.post("/jobs", params={"use_cache": "false"}, files={"file": (f"doc{i}.png", payload, "image/png")})
+            for i in range(10)
+        ]
+        enqueue_ms = (time.perf_counter() - start) * 1000
+        assert all(r.status_code == 202 for r in responses), [r.text for r in responses]
+        jobs = await asyncio.gather(*(wait_for_job(client, r.json()["job_id"]) for r in responses))
+        request_ids = {job["result"]["request_id"] for job in jobs if job["result"]}
+        if all(job["status"] == "completed" for job in jobs) and len(request_ids) == 10 and fast.classify_calls and strong.calls:
+            print(f"   ✅ 10/10 completed, enqueue took {enqueue_ms:.0f} ms total, {fast.classify_calls} classifications, "
+                  f"{fast.calls} fast and {strong.calls} escalated model calls")
+        else:
+            print(f"   ❌ Unexpected job states: {[job['status'] for job in jobs]}")
+            passed = False
+
+        # 2. Retryable model failure is retried, not failed
+        print("🧪 Test 2: transient model error is retried")
+        gemini_client.guard.base_delay = 0.01
+        retries_before = gemini_client.guard.retries
+        use_production_pipeline(FlakyModel(failures=2, latency=0.05))
+        response = await client.post("/jobs", params={"use_cache": "false"}, files={"file": ("flaky.png", payload, "image/png")})
+        job = await wait_for_job(client, response.json()["job_id"])
+        if job["status"] == "completed" and gemini_client.guard.retries - retries_before == 2:
+            print(f"   ✅ Completed after 2 retries (attempts={job['attempts']})")
+        else:
+            print(f"   ❌ status={job['status']} attempts={job['attempts']} error={job['error']}")
+            passed = False
+
+        # 2b. Open circuit keeps the job queued instead of failing it
+        print("🧪 Test 2b: open circuit requeues instead of failing")
+        breaker = gemini_client.guard.breaker
+        breaker.reset_timeout = 1.0
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        job_worker_pool.retry_delay = 0.05
+        response = await client.post("/jobs", params={"use_cache": "false"}, files={"file": ("outage.png", payload, "image/png")})
+        job_id = response.json()["job_id"]
+        await asyncio.sleep(0.5)
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] in ("queued", "processing") and job["attempts"] >= 1:
+            print(f"   ✅ Still {job['status']} after {job['attempts']} attempt(s) while circuit is open")
+        else:
+            print(f"   ❌ status={job['status']} attempts={job['attempts']} error={job['error']}")
+            passed = False
+        job = await wait_for_job(client, job_id)
+        if job["status"] == "completed" and breaker.state == "closed":
+            print("   ✅ Completed once the circuit half-opened")
+        else:
+            print(f"   ❌ status={job['status']} error={job['error']}")
+            passed = False
+        job_worker_pool.retry_delay = 0
+
+        # 3. Unreadable document fails without retry
+        print("🧪 Test 3: unreadable document fails")
+        response = await client.post("/jobs", files={"file": ("broken.png", b"not an image", "image/png")})
+        job = await wait_for_job(client, response.json()["job_id"])
+        if job["status"] == "failed" and job["attempts"] == 1 and job["error"]:
+            print(f"   ✅ Failed with: {job['error'][:60]}")
+        else:
+            print(f"   ❌ status={job['status']} attempts={job['attempts']}")
+            passed = False
+
+        # 4. Unknown job id
+        print("🧪 Test 4: unknown job returns 404")
+        response = await client.get("/jobs/does-not-exist")
+        if response.status_code == 404:
+            print("   ✅ 404")
+        else:
+            print(f"   ❌ {response.status_code}")
+            passed = False
+
+        # 5. A crash while completing the job leaves nothing behind; the retry stores one extraction
+        print("🧪 Test 5: crash between storing the extraction and completing the job")
+        use_production_pipeline()
+        with CrashOnJobCompletion() as crash:
+            response = await client.post("/jobs", params={"use_cache": "false"}, files={"file": ("crash.png", payload, "image/png")})
+            job_id = response.json()["job_id"]
+            while not crash.crashed:
+                await asyncio.sleep(0.05)
+        await asyncio.sleep(0.1)
+        status = (await client.get(f"/jobs/{job_id}")).json()["status"]
+        # Restart: the job is stale and gets requeued
+        await job_worker_pool.stop()
+        job_worker_pool.stale_after = 0
+        await job_worker_pool.start()
+        job = await wait_for_job(client, job_id)
+        db = SessionLocal()
+        stored = db.query(Extraction).filter(Extraction.filename == "crash.png").count()
+        db.close()
+        if status == "processing" and job["status"] == "completed" and stored == 1:
+            print(f"   ✅ {status} after the crash, completed after the restart, {stored} extraction stored")
+        else:
+            print(f"   ❌ after the crash: {status}, after the restart: {job['status']}, extractions stored: {stored}")
+            passed = False
+
+        # 6. An upstream that never recovers fails the job once the upstream budget is spent
+        print("🧪 Test 6: upstream retries are bounded")
+        job_worker_pool.max_upstream_attempts = 2
+        job_worker_pool.retry_delay = 0.05
+        use_production_pipeline(FlakyModel(failures=1000, latency=0.01))
+        response = await client.post("/jobs", params={"use_cache": "false"}, files={"file": ("down.png", payload, "image/png")})
+        job = await wait_for_job(client, response.json()["job_id"])
+        if job["status"] == "failed" and job["attempts"] == 2:
+            print(f"   ✅ Failed after {job['attempts']} attempts: {job['error'][:60]}")
+        else:
+            print(f"   ❌ status={job['status']} attempts={job['attempts']} error={job['error']}")
+            passed = False
+
+    await job_worker_pool.stop()
+    print("\n✨ All job tests passed!" if passed else "\n❌ Some job tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
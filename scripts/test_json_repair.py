@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test JSON response mode and the local repair pass for malformed model replies.
+
+Checks repair_json on the usual defects (fences, trailing commas, single
+quotes, Python literals, truncation), that extraction calls request JSON mode
+with the schema for the prompt in use, that a repairable reply still extracts
+on /extract while an unrepairable one fails, and that /stats/model-responses
+reports the parse-failure and repair rates.
+
+Runs in-process against a throwaway SQLite database and a fake Gemini model.
+
+Usage:
+    python scripts/test_json_repair.py
+"""
+import asyncio
+import json
+
+from benchmark_common import FakeGeminiModel, FakeResponse, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client
+
+from kyc_extractor.main import app
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.core.json_repair import repair_json
+
+REPAIR_CASES = [
+    ("valid", '{"a": 1}', {"a": 1}),
+    ("fences", '```json\n{"a": 1}\n```', {"a": 1}),
+    ("trailing commas", '{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    ("single quotes", "{'name': 'Raj\\'s \"Co\"'}", {"name": 'Raj\'s "Co"'}),
+    ("python literals", '{"a": None, "b": True, "c": False}', {"a": None, "b": True, "c": False}),
+    ("surrounding text", 'Here you go: {"a": 1} Let me know!', {"a": 1}),
+    ("truncated string", '{"data": {"city": "Mum', {"data": {"city": "Mum"}}),
+    ("truncated after key", '{"a": 1, "data": {"city": "Mumbai", "state"', {"a": 1, "data": {"city": "Mumbai"}}),
+    ("truncated after colon", '{"a": 1, "b":', {"a": 1, "b": None}),
+    ("numbers", '{"confidence": 0.95, "n": -1.5e3,}', {"confidence": 0.95, "n": -1500.0}),
+    ("prose", "I could not read this document.", None),
+]
+
+class ScriptedModel(FakeGeminiModel):
+    """Replies with a fixed text and records the generation_config it was called with"""
+    def __init__(self, reply: str):
+        super().__init__(latency=0.01)
+        self.reply = reply
+        self.generation_configs = []
+
+    async def generate_content_async(self, contents, **kwargs):
+        self.calls += 1
+        self.generation_configs.append(kwargs.get("generation_config"))
+        return FakeResponse(self.reply)
+
+async def main():
+    setup_sqlite_app(app)
+    passed = True
+
+    # 1. Repair pass
+    print("🧪 Test 1: repair_json")
+    for name, text, expected in REPAIR_CASES:
+        result, fixes = repair_json(text)
+        ok = result == expected
+        print(f"   {'✅' if ok else '❌'} {name:<22} fixes={fixes}")
+        passed = passed and ok
+
+    async with make_client(app) as client:
+        # 2. JSON mode with the schema matching the prompt
+        print("🧪 Test 2: JSON response mode")
+        model = gemini_client.model = ScriptedModel(json.dumps(SAMPLE_RESULT))
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("ok.png", make_sample_image(1240, 1754), "image/png")})
+        config = model.generation_configs[0] or {}
+        schema = config.get("response_schema", {})
+        ok = (
+            response.status_code == 200 and config.get("response_mime_type") == "application/json"
+            and "GST_CERTIFICATE" in schema["properties"]["document_type"]["enum"]
+            and schema["properties"]["data"]["properties"]["address"]["nullable"]
+        )
+        print(f"   {'✅' if ok else '❌'} {response.status_code}, mime={config.get('response_mime_type')}, required={schema.get('required')}")
+        passed = passed and ok
+
+        # 3. A malformed but repairable reply still extracts
+        print("🧪 Test 3: repairable reply")
+        broken = "```json\n" + json.dumps(SAMPLE_RESULT, indent=2)[:-2].rstrip() + ",\n}\n```"
+        gemini_client.model = ScriptedModel(broken)
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("fenced.png", make_sample_image(1241, 1754), "image/png")})
+        ok = response.status_code == 200 and response.json()["data"]["identification_number"] == SAMPLE_RESULT["data"]["identification_number"]
+        print(f"   {'✅' if ok else '❌'} {response.status_code} {response.text[:80] if not ok else 'extracted'}")
+        passed = passed and ok
+
+        # 4. An unrepairable reply fails
+        print("🧪 Test 4: unrepairable reply")
+        gemini_client.model = ScriptedModel("I could not read this document.")
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("prose.png", make_sample_image(1242, 1754), "image/png")})
+        ok = response.status_code == 500 and "not valid JSON" in response.json()["detail"]
+        print(f"   {'✅' if ok else '❌'} {response.status_code} {response.json().get('detail', '')[:80]}")
+        passed = passed and ok
+
+        # 5. Metrics
+        print("🧪 Test 5: /stats/model-responses")
+        stats = (await client.get("/stats/model-responses")).json()
+        ok = (
+            stats["responses"] == 3 and stats["clean"] == 1 and stats["repaired"] == 1 and stats["failed"] == 1
+            and stats["parse_failure_rate"] == round(2 / 3, 4) and stats["repair_rate"] == 0.5
+            and {"fences", "trailing_comma"} <= set(stats["fixes"])
+        )
+        print(f"   {'✅' if ok else '❌'} {stats}")
+        passed = passed and ok
+
+    print("\n✨ All JSON repair tests passed!" if passed else "\n❌ Some JSON repair tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Test the schema migration runner (kyc_extractor/db/migrations.py) and the
+query plans of the hot history/stats queries.
+
+Migrations: a database with the original schema (before user_id, last_login
+and the later tables, columns and indexes) is upgraded in steps and then to
+the latest version without losing rows, with its rollups backfilled; re-running applies nothing; a
+database created by Base.metadata.create_all is adopted as is.
+
+Query plans: the SQL that crud.get_extractions_history, get_avg_processing_time,
+get_usage_stats and get_dashboard_stats actually send is captured
+and EXPLAINed. Each must use its composite (or rollup) index, none may scan
+the whole extractions or extraction_rollups table, and history pages must come out of the index in order
+instead of being sorted.
+
+Runs against throwaway SQLite databases.
+
+Usage:
+    python scripts/test_migrations.py
+"""
+import os
+import random
+import re
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from benchmark_common import setup_sqlite_app
+
+from sqlalchemy import create_engine, event, inspect, text
+from kyc_extractor.main import app
+from kyc_extractor.db import crud
+from kyc_extractor.db.database import Base, engine
+from kyc_extractor.db.migrations import MIGRATIONS, applied_versions, run_migrations
+from kyc_extractor.db.models import Extraction
+
+ORIGINAL_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR(255) NOT NULL UNIQUE, hashed_password VARCHAR(255) NOT NULL,
+        full_name VARCHAR(255), role VARCHAR(20), is_active BOOLEAN, created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE extractions (
+        id INTEGER PRIMARY KEY, request_id VARCHAR(36) NOT NULL UNIQUE, filename VARCHAR(255), file_size_bytes INTEGER,
+        document_type VARCHAR(50), company_name VARCHAR(255), trade_name VARCHAR(255), identification_number VARCHAR(50),
+        address_json JSON, issue_date VARCHAR(20), approver_name VARCHAR(255), confidence FLOAT, confidence_reason TEXT,
+        data_quality_score INTEGER, validation_results JSON, processing_time_ms INTEGER,
+        uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP, api_version VARCHAR(10)
+    )""",
+    "INSERT INTO extractions (request_id, filename, document_type) VALUES ('legacy-1', 'old.pdf', 'PAN_CARD')",
+]
+
+def schema_of(target_engine) -> dict:
+    inspector = inspect(target_engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+    }
+
+def test_runner(workdir: str) -> bool:
+    passed = True
+
+    # 1. Original schema -> step by step -> latest
+    print("🧪 Test 1: upgrade a database with the original schema")
+    legacy = create_engine(f"sqlite:///{os.path.join(workdir, 'legacy.db')}")
+    with legacy.begin() as connection:
+        for statement in ORIGINAL_SCHEMA:
+            connection.execute(text(statement))
+    first = run_migrations(legacy, target=3)
+    rest = run_migrations(legacy)
+    again = run_migrations(legacy)
+    schema = schema_of(legacy)
+    with legacy.connect() as connection:
+        legacy_rows = connection.execute(text("SELECT request_id, user_id, model_name FROM extractions")).all()
+        # Backfilled lifetime row (the hourly one depends on the insert time)
+        legacy_rollups = [tuple(row) for row in connection.execute(text(
+            "SELECT user_id, document_type, documents FROM extraction_rollups WHERE hour < '2000-01-01'"
+        ))]
+    expected_columns = {column.name for column in Extraction.__table__.columns}
+    # Composite indexes; the original schema made its single-column ones under other names
+    expected_indexes = {index.name for index in Extraction.__table__.indexes if len(index.columns) > 1}
+    ok = (
+        [migration.version for migration in first] == [1, 2, 3]
+        and [migration.version for migration in rest] == list(range(4, len(MIGRATIONS) + 1))
+        and again == [] and applied_versions(legacy) == {migration.version for migration in MIGRATIONS}
+        and schema["extractions"][0] == expected_columns and expected_indexes <= schema["extractions"][1]
+        and "last_login" in schema["users"][0] and {"extraction_cache", "extraction_jobs"} <= set(schema)
+        and [tuple(row) for row in legacy_rows] == [("legacy-1", None, None)]
+        and legacy_rollups == [(0, "PAN_CARD", 1)]
+    )
+    print(f"   {'✅' if ok else '❌'} applied {len(first)} + {len(rest)} then {len(again)}; "
+          f"missing columns={expected_columns - schema['extractions'][0]} missing indexes={expected_indexes - schema['extractions'][1]}")
+    passed = passed and ok
+
+    # 2. Schema created by create_all is adopted
+    print("🧪 Test 2: adopt a database created by create_all")
+    fresh = create_engine(f"sqlite:///{os.path.join(workdir, 'fresh.db')}")
+    Base.metadata.create_all(bind=fresh)
+    before = schema_of(fresh)
+    applied = run_migrations(fresh)
+    after = schema_of(fresh)
+    unchanged = before == {table: after[table] for table in before}
+    ok = len(applied) == len(MIGRATIONS) and unchanged
+    print(f"   {'✅' if ok else '❌'} recorded {len(applied)} migrations, schema unchanged={unchanged}")
+    passed = passed and ok
+
+    # 3. Empty database
+    print("🧪 Test 3: empty database")
+    empty = create_engine(f"sqlite:///{os.path.join(workdir, 'empty.db')}")
+    run_migrations(empty)
+    schema = schema_of(empty)
+    ok = schema["extractions"][0] == expected_columns and expected_indexes <= schema["extractions"][1]
+    print(f"   {'✅' if ok else '❌'} tables={sorted(schema)}")
+    passed = passed and ok
+    return passed
+
+def seed(SessionLocal, rows: int) -> None:
+    db = SessionLocal()
+    rng = random.Random(3)
+    now = datetime.utcnow()
+    db.execute(Extraction.__table__.insert(), [
+        {
+            "request_id": str(uuid.uuid4()),
+            "user_id": rng.randint(1, 50),
+            "document_type": rng.choice(("GST_CERTIFICATE", "PAN_CARD", "MSME_CERTIFICATE", "UDYAM_CERTIFICATE")),
+            "processing_time_ms": rng.randint(500, 5000),
+            "data_quality_score": rng.randint(0, 100),
+            "uploaded_at": now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+        }
+        for _ in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+def explain(connection, statement: str, parameters) -> list:
+    """[(index used or None, full table scan, sorts rows)] per table access in the plan"""
+    cursor = connection.cursor()
+    if engine.dialect.name == "sqlite":
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plan = []
+        for row in cursor.fetchall():
+            detail = row[-1]
+            index = re.search(r"INDEX (\w+)", detail)
+            plan.append((
+                index.group(1) if index else None,
+                detail.startswith("SCAN extractions") and not index,
+                "TEMP B-TREE FOR ORDER BY" in detail,
+            ))
+        return plan
+    # MySQL: id, select_type, table, partitions, type, possible_keys, key, key_len, ref, rows, filtered, Extra
+    cursor.execute(f"EXPLAIN {statement}", parameters)
+    return [
+        (row[6], row[2] == "extractions" and row[4] == "ALL", "Using filesort" in (row[11] or ""))
+        for row in cursor.fetchall()
+    ]
+
+def captured_statements(call) -> list:
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and ("extractions" in statement or "extraction_rollups" in statement):
+            statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+def test_query_plans(SessionLocal) -> bool:
+    print("🧪 Test 4: query plans of the hot queries")
+    seed(SessionLocal, 20000)
+    db = SessionLocal()
+    crud.rebuild_rollups(db)
+    _, _, cursor = crud.get_extractions_history(db, limit=20, role="admin", include_total=False)
+
+    user_index = "ix_extractions_user_id_uploaded_at"
+    rollup_user_index = "ux_extraction_rollups_user_hour_type"
+    cases = [
+        # (label, call, expected index, must not sort)
+        ("history (admin)", lambda: crud.get_extractions_history(db, limit=20, role="admin", include_total=False),
+         "ix_extractions_uploaded_at_id", True),
+        ("history (admin, cursor)", lambda: crud.get_extractions_history(db, limit=20, role="admin", cursor=cursor),
+         "ix_extractions_uploaded_at_id", True),
+        ("history (user)", lambda: crud.get_extractions_history(db, limit=20, user_id=7, role="user"), user_index, True),
+        ("history (user, last 7 days)", lambda: crud.get_extractions_history(db, limit=20, days_ago=7, user_id=7, role="user"),
+         user_index, True),
+        ("history (admin, document type)", lambda: crud.get_extractions_history(db, limit=20, document_type="PAN_CARD", role="admin"),
+         "ix_extractions_document_type_uploaded_at", True),
+        ("avg processing time (user)", lambda: crud.get_avg_processing_time(db, user_id=7, role="user"), user_index, True),
+        ("avg processing time (admin)", lambda: crud.get_avg_processing_time(db, role="admin"), "ix_extractions_uploaded_at_id", True),
+        ("usage stats (admin)", lambda: crud.get_usage_stats(db, role="admin", days=7), "ix_extractions_uploaded_at_id", False),
+        ("usage stats (user)", lambda: crud.get_usage_stats(db, user_id=7, role="user", days=30), user_index, False),
+        ("dashboard (user)", lambda: crud.get_dashboard_stats(db, user_id=7, role="user"), rollup_user_index, False),
+        ("dashboard (admin)", lambda: crud.get_dashboard_stats(db, role="admin"), "ix_extraction_rollups_hour", False),
+    ]
+
+    passed = True
+    raw = engine.raw_connection()
+    try:
+        for label, call, expected_index, ordered in cases:
+            statements = captured_statements(call)
+            plans = [explain(raw, statement, parameters) for statement, parameters in statements]
+            indexes = {index for plan in plans for index, _, _ in plan if index}
+            full_scans = sum(1 for plan in plans for _, full_scan, _ in plan if full_scan)
+            sorts = sum(1 for plan in plans for _, _, sort in plan if sort)
+            ok = bool(statements) and expected_index in indexes and not full_scans and not (ordered and sorts)
+            print(f"   {'✅' if ok else '❌'} {label}: {len(statements)} queries, indexes={sorted(indexes)}, "
+                  f"full scans={full_scans}, sorts={sorts}")
+            passed = passed and ok
+    finally:
+        raw.close()
+        db.close()
+    return passed
+
+def main():
+    SessionLocal = setup_sqlite_app(app)
+    with tempfile.TemporaryDirectory() as workdir:
+        passed = test_runner(workdir)
+    passed = test_query_plans(SessionLocal) and passed
+
+    print("\n✨ All migration tests passed!" if passed else "\n❌ Some migration tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test multi-document packing (services/packing.py) through /extract/batch.
+
+Small single-page documents in a batch must share one model call and still
+get their own extraction rows with their share of the usage; bundles must
+respect PACK_MAX_DOCUMENTS and PACK_MAX_BYTES; large documents are not
+packed; documents missing from the reply (or an unusable reply) are
+extracted on their own; low-confidence packed answers are escalated to the
+strong model individually.
+
+Runs in-process against a throwaway SQLite database and fake models.
+
+Usage:
+    python scripts/test_packing.py
+"""
+import asyncio
+import copy
+import json
+
+from benchmark_common import FakeGeminiModel, FakeResponse, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client
+
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.models import Extraction
+from kyc_extractor.services.extraction import document_packer
+from kyc_extractor.services.image_processor import image_processor
+
+class DroppingModel(FakeGeminiModel):
+    """Packed replies leave out one document index"""
+    def __init__(self, drop_index: int, **kwargs):
+        super().__init__(**kwargs)
+        self.drop_index = drop_index
+
+    def _packed_response(self, count: int):
+        self.calls += 1
+        self.packed_calls += 1
+        entries = [{"index": index, **self.result} for index in range(1, count + 1) if index != self.drop_index]
+        return FakeResponse(json.dumps({"documents": entries}))
+
+class ProseModel(FakeGeminiModel):
+    """Packed replies are unusable prose"""
+    def _packed_response(self, count: int):
+        self.calls += 1
+        self.packed_calls += 1
+        return FakeResponse("These look like company documents.")
+
+def small_documents(count: int, offset: int) -> list:
+    # PAN-card sized JPEGs; distinct sizes so neither the cache nor single-flight merges them
+    return [("files", (f"pan{offset + i}.jpg", make_sample_image(1000 + offset + i, 630, "JPEG"), "image/jpeg")) for i in range(count)]
+
+async def run_batch(client, files: list) -> dict:
+    response = await client.post("/extract/batch", params={"use_cache": "false"}, files=files)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def reset_packer():
+    document_packer.bundles = document_packer.packed_documents = document_packer.individual = document_packer.escalated = 0
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    # Settings are changed at runtime below; keep the image stage in-process
+    image_processor._process_pool = None
+    settings.PACKING_ENABLED = True
+    # Long enough for every document of a test batch to be prepared, so bundles fill up by count or size
+    settings.PACK_MAX_WAIT_MS = 2000
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. One call for a batch of small documents, fanned out to rows
+        print("🧪 Test 1: batch of 6 small documents")
+        model = gemini_client.model = FakeGeminiModel(0.05)
+        body = await run_batch(client, small_documents(6, 0))
+        results = body["results"]
+        db = SessionLocal()
+        rows = db.query(Extraction).filter(Extraction.request_id.in_([result["request_id"] for result in results])).all()
+        db.close()
+        ok = (
+            body["successful"] == 6 and model.calls == 1 and model.packed_calls == 1 and len(rows) == 6
+            and all(result["payload_stats"]["packed_with"] == 6 for result in results)
+            and all(row.identification_number == SAMPLE_RESULT["data"]["identification_number"] for row in rows)
+            and len({row.prompt_tokens for row in rows}) <= 2 and all(row.cost_usd > 0 for row in rows)
+        )
+        print(f"   {'✅' if ok else '❌'} calls={model.calls} rows={len(rows)} prompt tokens per row={sorted(row.prompt_tokens for row in rows)}")
+        passed = passed and ok
+
+        # 2. Bundle caps
+        print("🧪 Test 2: PACK_MAX_DOCUMENTS and PACK_MAX_BYTES")
+        settings.PACK_MAX_DOCUMENTS = 4
+        reset_packer()
+        model = gemini_client.model = FakeGeminiModel(0.05)
+        await run_batch(client, small_documents(6, 10))
+        ok = model.packed_calls == 2 and document_packer.packed_documents == 6
+        print(f"   {'✅' if ok else '❌'} 6 documents, max 4 per call -> {model.packed_calls} packed calls")
+        passed = passed and ok
+        settings.PACK_MAX_DOCUMENTS = 8
+
+        reset_packer()
+        files = small_documents(6, 20)
+        sent = [len(image_processor.process_for_model(image, name)[0]["data"]) for _, (name, image, _) in files]
+        settings.PACK_MAX_BYTES = int(max(sent) * 2.5)
+        model = gemini_client.model = FakeGeminiModel(0.05)
+        await run_batch(client, files)
+        ok = model.packed_calls == 3
+        print(f"   {'✅' if ok else '❌'} byte cap of ~2.5 documents -> {model.packed_calls} packed calls of {document_packer.stats()['avg_bundle_size']}")
+        passed = passed and ok
+        settings.PACK_MAX_BYTES = 4 * 1024 * 1024
+
+        # 3. Large documents are not packed
+        print("🧪 Test 3: documents over PACK_MAX_DOCUMENT_BYTES")
+        settings.PACK_MAX_DOCUMENT_BYTES = 1024
+        model = gemini_client.model = FakeGeminiModel(0.05)
+        await run_batch(client, small_documents(3, 30))
+        ok = model.packed_calls == 0 and model.calls == 3
+        print(f"   {'✅' if ok else '❌'} packed calls={model.packed_calls} single calls={model.calls}")
+        passed = passed and ok
+        settings.PACK_MAX_DOCUMENT_BYTES = 300 * 1024
+
+        # 4. Documents missing from the reply, and unusable replies
+        print("🧪 Test 4: incomplete and unusable replies")
+        reset_packer()
+        model = gemini_client.model = DroppingModel(2, latency=0.05)
+        body = await run_batch(client, small_documents(4, 40))
+        ok = body["successful"] == 4 and model.packed_calls == 1 and model.calls == 2 and document_packer.individual == 1
+        print(f"   {'✅' if ok else '❌'} missing entry: successful={body['successful']} calls={model.calls} individual={document_packer.individual}")
+        passed = passed and ok
+
+        reset_packer()
+        model = gemini_client.model = ProseModel(0.05)
+        body = await run_batch(client, small_documents(3, 50))
+        ok = body["successful"] == 3 and model.packed_calls == 1 and model.calls == 4 and document_packer.individual == 3
+        print(f"   {'✅' if ok else '❌'} prose reply: successful={body['successful']} calls={model.calls} individual={document_packer.individual}")
+        passed = passed and ok
+
+        # 5. Cascade: low-confidence packed answers go to the strong model one by one
+        print("🧪 Test 5: escalation of packed answers")
+        settings.GEMINI_CASCADE_ENABLED = True
+        reset_packer()
+        low_confidence = copy.deepcopy(SAMPLE_RESULT)
+        low_confidence["confidence"] = 0.5
+        fast = gemini_client.fast_model = FakeGeminiModel(0.05, low_confidence)
+        strong = gemini_client.model = FakeGeminiModel(0.05)
+        body = await run_batch(client, small_documents(3, 60))
+        ok = (
+            body["successful"] == 3 and fast.packed_calls == 1 and fast.calls == 1 and strong.calls == 3
+            and all(result["model_tier"] == "strong" and result["escalation_reason"] == "low_confidence" for result in body["results"])
+        )
+        print(f"   {'✅' if ok else '❌'} fast packed calls={fast.packed_calls} strong calls={strong.calls} escalated={document_packer.escalated}")
+        passed = passed and ok
+        settings.GEMINI_CASCADE_ENABLED = False
+
+        # 6. /extract is never packed
+        print("🧪 Test 6: single uploads")
+        model = gemini_client.model = FakeGeminiModel(0.05)
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("single.jpg", make_sample_image(1100, 630, "JPEG"), "image/jpeg")})
+        ok = response.status_code == 200 and model.packed_calls == 0 and "packed_with" not in response.json()["payload_stats"]
+        print(f"   {'✅' if ok else '❌'} status={response.status_code} packed calls={model.packed_calls}")
+        passed = passed and ok
+
+        stats = (await client.get("/stats/packing")).json()
+        print(f"   /stats/packing: {stats}")
+
+    print("\n✨ All packing tests passed!" if passed else "\n❌ Some packing tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test blank/duplicate page elimination (services/page_filter.py) on synthetic
+scanned pages, both for per-page payloads and the stitched fallback. Repeated
+pages are dropped only when their pixels match, so same-template pages with
+different data are kept; rescans are matched only when near-duplicate
+matching is switched on.
+
+Pages are written to a temp directory and wrapped in a PageSequence, which is
+what _process_pdf returns, so poppler is not needed.
+
+Usage:
+    python scripts/test_page_filter.py
+"""
+import io
+import os
+import tempfile
+import time
+
+from benchmark_common import make_sample_image
+
+from PIL import Image, ImageDraw
+from PIL._util import DeferredError
+from kyc_extractor.services.image_processor import image_processor, PageSequence
+from kyc_extractor.services.page_filter import PageFilter
+
+def scan(image: Image.Image) -> Image.Image:
+    """Adds scanner noise so duplicates are never pixel-identical"""
+    return Image.blend(image, Image.effect_noise(image.size, 10).convert("RGB"), 0.06)
+
+def certificate() -> Image.Image:
+    return scan(Image.open(io.BytesIO(make_sample_image(1654, 2339))).convert("RGB"))
+
+def annexure(first_partner: int = 0) -> Image.Image:
+    page = Image.new("RGB", (1654, 2339), "white")
+    draw = ImageDraw.Draw(page)
+    draw.rectangle([40, 40, 1614, 2299], outline="black", width=4)
+    for i in range(first_partner, first_partner + 30):
+        draw.text((100, 300 + (i - first_partner) * 50), f"Annexure A - partner {i}: ABC TRADING PRIVATE LIMITED", fill="black")
+    return scan(page)
+
+def blank() -> Image.Image:
+    return scan(Image.new("RGB", (1654, 2339), (235, 232, 225)))
+
+def in_memory(image: Image.Image) -> bool:
+    """Decoded and not closed yet"""
+    return image._im is not None and not isinstance(image._im, DeferredError)
+
+def page_sequence(pages) -> PageSequence:
+    tmp_dir = tempfile.TemporaryDirectory(prefix="kyc-pdf-")
+    paths = []
+    for i, page in enumerate(pages):
+        path = os.path.join(tmp_dir.name, f"page-{i:03d}.ppm")
+        page.save(path)
+        paths.append(path)
+    return PageSequence(paths, tmp_dir)
+
+def main():
+    passed = True
+    # A PDF repeating a page renders it to the same pixels
+    first, second = certificate(), annexure()
+    document = [first, blank(), first.copy(), second, blank(), second.copy()]
+
+    # 1. Classification of each page
+    print("🧪 Test 1: page classification")
+    page_filter = PageFilter.from_settings()
+    start = time.perf_counter()
+    reasons = [page_filter.check(page) for page in document]
+    per_page_ms = (time.perf_counter() - start) * 1000 / len(document)
+    expected = [None, "blank", "duplicate", None, "blank", "duplicate"]
+    if reasons == expected:
+        print(f"   ✅ {reasons} ({per_page_ms:.1f} ms/page)")
+    else:
+        print(f"   ❌ got {reasons}, expected {expected}")
+        passed = False
+
+    # 2. Per-page payload only carries the kept pages
+    print("🧪 Test 2: per-page payload")
+    parts, stats = image_processor.prepare_for_model(page_sequence(document))
+    if len(parts) == 2 and stats["pages_dropped"] == 4 and stats["pages_dropped_by_reason"] == {"blank": 2, "duplicate": 2}:
+        print(f"   ✅ 2 of 6 pages sent, {stats['sent_bytes'] / 1024:.0f} KB")
+    else:
+        print(f"   ❌ {len(parts)} parts, stats={ {k: v for k, v in stats.items() if k != 'page_stats'} }")
+        passed = False
+
+    # 3. Stitched fallback drops the same pages
+    print("🧪 Test 3: stitched canvas")
+    canvas = image_processor._stitch_pages([page.copy() for page in document])
+    payload, stats = image_processor.prepare_for_model(canvas)
+    if canvas.info["page_count"] == 2 and stats["pages_dropped"] == 4:
+        print(f"   ✅ Canvas of 2 pages ({canvas.width}x{canvas.height})")
+    else:
+        print(f"   ❌ page_count={canvas.info.get('page_count')} pages_dropped={stats['pages_dropped']}")
+        passed = False
+
+    # 3b. Pages rasterized to disk are decoded one at a time
+    print("🧪 Test 3b: stitching pages rasterized to disk")
+    pages = page_sequence([first, blank(), second, annexure(30), first.copy(), annexure(60)])
+    opened, resident = [], []
+    def tracking_open(*args, **kwargs):
+        resident.append(sum(in_memory(image) for image in opened))
+        opened.append(original_open(*args, **kwargs))
+        return opened[-1]
+    original_open, Image.open = Image.open, tracking_open
+    try:
+        canvas = image_processor._stitch_pages(pages.paths)
+    finally:
+        Image.open = original_open
+        pages.close()
+    if canvas.info["page_count"] == 4 and canvas.info["pages_dropped"] == 2 and max(resident) == 0:
+        print(f"   ✅ Canvas of 4 pages, other pages in memory whenever one was opened: {max(resident)}")
+    else:
+        print(f"   ❌ page_count={canvas.info.get('page_count')} pages_dropped={canvas.info.get('pages_dropped')} "
+              f"pages in memory at once={max(resident) + 1}")
+        passed = False
+
+    # 4. An all-blank document still sends one page
+    print("🧪 Test 4: all pages blank")
+    parts, stats = image_processor.prepare_for_model(page_sequence([blank(), blank(), blank()]))
+    if len(parts) == 1 and stats["pages_dropped"] == 2:
+        print("   ✅ First page kept")
+    else:
+        print(f"   ❌ {len(parts)} parts, pages_dropped={stats['pages_dropped']}")
+        passed = False
+
+    # 5. Single images are never filtered
+    print("🧪 Test 5: single image is untouched")
+    payload, stats = image_processor.prepare_for_model(blank())
+    if stats["pages_dropped"] == 0:
+        print("   ✅ pages_dropped=0")
+    else:
+        print(f"   ❌ pages_dropped={stats['pages_dropped']}")
+        passed = False
+
+    # 6. Same template, different data
+    print("🧪 Test 6: same-layout pages with different content are kept")
+    annexures = [annexure(0), annexure(30)]
+    page_filter = PageFilter.from_settings()
+    reasons = [page_filter.check(page) for page in annexures]
+    # What the former default (near-duplicates within 5% of hash bits) made of them
+    loose = PageFilter(duplicate_max_distance=0.05)
+    loose_reasons = [loose.check(page) for page in annexures]
+    if reasons == [None, None]:
+        print(f"   ✅ both annexure pages kept (near-duplicate matching would have said {loose_reasons})")
+    else:
+        print(f"   ❌ got {reasons}")
+        passed = False
+
+    # 7. Rescans only with near-duplicate matching switched on
+    print("🧪 Test 7: rescans of the same page")
+    rescans = [certificate(), certificate()]
+    exact = [PageFilter().check(page) for page in rescans]
+    page_filter = PageFilter(duplicate_max_distance=0.05)
+    near = [page_filter.check(page) for page in rescans]
+    if exact == [None, None] and near == [None, "duplicate"]:
+        print(f"   ✅ exact matching keeps both, duplicate_max_distance=0.05 drops the rescan")
+    else:
+        print(f"   ❌ exact={exact}, near-duplicate={near}")
+        passed = False
+
+    print("\n✨ All page filter tests passed!" if passed else "\n❌ Some page filter tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test the pre-flight image quality gate (services/quality.py).
+
+Scores synthetic scans (sharp, blurred, tiny, washed out, skewed), then checks
+that /extract rejects unreadable uploads with 422 before the model is called
+(including the classify-first thumbnail call), and that flag mode stores the
+metrics on the extraction instead.
+
+Usage:
+    python scripts/test_quality_gate.py
+"""
+import asyncio
+import io
+import time
+
+from benchmark_common import FakeGeminiModel, setup_sqlite_app, make_client
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.models import Extraction
+from kyc_extractor.services.image_processor import image_processor
+from kyc_extractor.services.quality import analyze_image
+
+def scan_page(width: int = 2480, height: int = 3508) -> Image.Image:
+    """A4 page at 300 DPI with realistic-size text"""
+    page = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=max(10, width // 60))
+    for i in range(40):
+        draw.text((width // 16, height // 17 + i * height // 50), "Legal Name: ABC TRADING PRIVATE LIMITED 27ABCDE1234F1Z5", fill="black", font=font)
+    return page
+
+def encode(image: Image.Image, fmt: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    # Settings changed below must be seen by the image stage, so keep it in-process
+    image_processor._process_pool = None
+    passed = True
+
+    page = scan_page()
+    cases = [
+        ("sharp", page, "ok", []),
+        ("slight blur", page.filter(ImageFilter.GaussianBlur(2)), "ok", []),
+        ("heavy blur", page.filter(ImageFilter.GaussianBlur(8)), "rejected", ["blurry"]),
+        ("tiny photo", scan_page(300, 420), "rejected", ["low_resolution"]),
+        ("washed out", Image.blend(page, Image.new("RGB", page.size, "white"), 0.9), "rejected", ["low_contrast"]),
+        ("skewed 7°", page.rotate(7, expand=True, fillcolor="white"), "flagged", ["skewed"]),
+    ]
+
+    # 1. Metrics on synthetic scans
+    print("🧪 Test 1: quality metrics")
+    for name, image, expected_status, expected_issues in cases:
+        start = time.perf_counter()
+        report = analyze_image(image)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        ok = report["status"] == expected_status and all(issue in report["issues"] for issue in expected_issues)
+        print(
+            f"   {'✅' if ok else '❌'} {name:<12} {report['status']:<9} sharpness={report['sharpness']:<8} "
+            f"contrast={report['contrast']:<6} dpi={report['dpi']:<4} skew={report['skew_degrees']} ({elapsed_ms:.0f} ms)"
+        )
+        passed = passed and ok
+
+    async with make_client(app) as client:
+        # 2. Reject mode: 422, no model call
+        print("🧪 Test 2: blurry upload is rejected before the model call")
+        settings.QUALITY_GATE_MODE = "reject"
+        model = gemini_client.model = FakeGeminiModel(latency=0.01)
+        response = await client.post("/extract", files={"file": ("blurry.png", encode(cases[2][1]), "image/png")})
+        detail = response.json().get("detail", {})
+        if response.status_code == 422 and model.calls == 0 and detail["image_quality"]["status"] == "rejected":
+            print(f"   ✅ 422: {detail['message']}")
+        else:
+            print(f"   ❌ {response.status_code} model calls={model.calls} {response.text[:200]}")
+            passed = False
+
+        # 3. Flag mode: extracted, metrics stored on the extraction
+        print("🧪 Test 3: flag mode stores the metrics")
+        settings.QUALITY_GATE_MODE = "flag"
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("blurry.jpg", encode(cases[2][1], "JPEG"), "image/jpeg")})
+        body = response.json()
+        db = SessionLocal()
+        row = db.query(Extraction).filter(Extraction.request_id == body.get("request_id")).first()
+        db.close()
+        if response.status_code == 200 and model.calls == 1 and row and row.image_quality["status"] == "flagged" and body["image_quality"]["issues"] == ["blurry"]:
+            print(f"   ✅ 200, stored image_quality={row.image_quality['issues']}")
+        else:
+            print(f"   ❌ {response.status_code} model calls={model.calls} {response.text[:200]}")
+            passed = False
+        settings.QUALITY_GATE_MODE = "reject"
+
+        # 4. Classify-first: the gate runs before the classification call
+        print("🧪 Test 4: rejected upload pays for no classification")
+        settings.CLASSIFY_FIRST = True
+        model = gemini_client.model = FakeGeminiModel(latency=0.01)
+        rejected = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("blurry.png", encode(cases[2][1]), "image/png")})
+        rejected_classify_calls = model.classify_calls
+        accepted = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("sharp.png", encode(page), "image/png")})
+        settings.CLASSIFY_FIRST = False
+        classification = (accepted.json().get("payload_stats") or {}).get("classification") if accepted.status_code == 200 else None
+        breaker = gemini_client.guard.breaker.snapshot()["state"]
+        if rejected.status_code == 422 and rejected_classify_calls == 0 and accepted.status_code == 200 and model.classify_calls == 1 and breaker == "closed":
+            print(f"   ✅ rejected: 0 classify calls; accepted: 1 classify call ({classification}), breaker {breaker}")
+        else:
+            print(f"   ❌ rejected {rejected.status_code} with {rejected_classify_calls} classify calls, "
+                  f"accepted {accepted.status_code} with {model.classify_calls - rejected_classify_calls}, breaker {breaker}")
+            passed = False
+
+    print("\n✨ All quality gate tests passed!" if passed else "\n❌ Some quality gate tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
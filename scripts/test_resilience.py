@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the circuit breaker and retry policy in front of upstream model calls
+(kyc_extractor/core/resilience.py).
+
+The breaker must open after consecutive retryable failures and reject calls
+while open; after the reset timeout one trial goes through and closes or
+re-opens it. A trial that is cancelled (client disconnect, abandoned
+classification) must not leave the breaker half-open for good: the next
+call becomes the trial. Non-retryable errors must not open the breaker.
+Only typed upstream errors or HTTP status codes count as retryable, never
+digits in a message (a malformed reply quoting a GSTIN or pincode).
+
+Usage:
+    python scripts/test_resilience.py
+"""
+import asyncio
+
+import benchmark_common  # noqa: F401 (project path and fake API key)
+
+from google.api_core import exceptions as google_exceptions
+from kyc_extractor.core.gemini import gemini_client, MalformedReplyError
+from kyc_extractor.core.resilience import CircuitBreaker, CircuitOpenError, RateLimiter, UpstreamGuard, is_retryable
+
+RESET_SECONDS = 0.1
+
+def make_guard(max_retries: int = 0) -> UpstreamGuard:
+    return UpstreamGuard(
+        limiter=RateLimiter(0, 0),
+        breaker=CircuitBreaker(failure_threshold=2, reset_timeout=RESET_SECONDS),
+        max_retries=max_retries,
+        base_delay=0.01,
+        max_delay=0.01
+    )
+
+async def fail():
+    raise ConnectionError("503 unavailable")
+
+async def succeed():
+    return "ok"
+
+async def outcome(guard: UpstreamGuard, fn) -> str:
+    try:
+        return await guard.call(fn)
+    except CircuitOpenError:
+        return "rejected"
+    except ConnectionError:
+        return "failed"
+    except ValueError:
+        return "invalid"
+
+async def open_breaker(guard: UpstreamGuard) -> None:
+    for _ in range(guard.breaker.failure_threshold):
+        await outcome(guard, fail)
+
+async def main():
+    passed = True
+
+    # 1. Consecutive failures open the breaker
+    print("🧪 Test 1: breaker opens after consecutive failures")
+    guard = make_guard()
+    await open_breaker(guard)
+    rejected = await outcome(guard, succeed)
+    ok = guard.breaker.state == "open" and rejected == "rejected"
+    print(f"   {'✅' if ok else '❌'} state={guard.breaker.state}, next call {rejected}")
+    passed = passed and ok
+
+    # 2. Half-open trial: success closes, failure re-opens
+    print("🧪 Test 2: half-open trial")
+    await asyncio.sleep(RESET_SECONDS)
+    closed = await outcome(guard, succeed)
+    closed_state = guard.breaker.state
+    await open_breaker(guard)
+    await asyncio.sleep(RESET_SECONDS)
+    failed = await outcome(guard, fail)
+    ok = (closed, closed_state, failed, guard.breaker.state) == ("ok", "closed", "failed", "open")
+    print(f"   {'✅' if ok else '❌'} successful trial -> {closed_state}, failed trial -> {guard.breaker.state}")
+    passed = passed and ok
+
+    # 3. A cancelled trial lets the next call through
+    print("🧪 Test 3: cancelled half-open trial")
+    guard = make_guard()
+    await open_breaker(guard)
+    await asyncio.sleep(RESET_SECONDS)
+    started = asyncio.Event()
+    async def hang():
+        started.set()
+        await asyncio.sleep(60)
+    trial = asyncio.create_task(guard.call(hang))
+    await started.wait()
+    during_trial = await outcome(guard, succeed)
+    trial.cancel()
+    await asyncio.gather(trial, return_exceptions=True)
+    after_cancel = await outcome(guard, succeed)
+    ok = during_trial == "rejected" and after_cancel == "ok" and guard.breaker.state == "closed"
+    print(f"   {'✅' if ok else '❌'} during trial: {during_trial}, after cancelling it: {after_cancel}, state={guard.breaker.state}")
+    passed = passed and ok
+
+    # 4. Cancelling a call that is not the trial keeps the trial exclusive
+    print("🧪 Test 4: cancelled non-trial call")
+    guard = make_guard()
+    started = asyncio.Event()
+    stale = asyncio.create_task(guard.call(hang))
+    await started.wait()
+    await open_breaker(guard)
+    await asyncio.sleep(RESET_SECONDS)
+    started.clear()
+    trial = asyncio.create_task(guard.call(hang))
+    await started.wait()
+    stale.cancel()
+    await asyncio.gather(stale, return_exceptions=True)
+    second_trial = await outcome(guard, succeed)
+    trial.cancel()
+    await asyncio.gather(trial, return_exceptions=True)
+    ok = second_trial == "rejected"
+    print(f"   {'✅' if ok else '❌'} call during the trial after an older call was cancelled: {second_trial}")
+    passed = passed and ok
+
+    # 5. Non-retryable errors leave the breaker closed
+    print("🧪 Test 5: non-retryable errors")
+    guard = make_guard(max_retries=3)
+    async def invalid():
+        raise ValueError("400 invalid argument")
+    results = [await outcome(guard, invalid) for _ in range(5)]
+    ok = results == ["invalid"] * 5 and guard.breaker.state == "closed" and guard.retries == 0
+    print(f"   {'✅' if ok else '❌'} state={guard.breaker.state}, retries={guard.retries}")
+    passed = passed and ok
+
+    # 6. Retryable by type or status code, not by message
+    print("🧪 Test 6: what counts as retryable")
+    class StatusError(Exception):
+        status_code = 503
+    reply = MalformedReplyError("Model reply is not valid JSON and could not be repaired: 'GSTIN 27AAACR5002K1ZX, PIN 500032'")
+    cases = {
+        "ServiceUnavailable": (google_exceptions.ServiceUnavailable("unavailable"), True),
+        "TooManyRequests": (google_exceptions.TooManyRequests("quota"), True),
+        "timeout": (TimeoutError("timed out"), True),
+        "status_code 503": (StatusError("upstream"), True),
+        "InvalidArgument": (google_exceptions.InvalidArgument("400 invalid argument"), False),
+        "message with 503": (RuntimeError("503 Service Unavailable"), False),
+        "malformed reply": (reply, False),
+    }
+    wrong = [name for name, (error, expected) in cases.items() if is_retryable(error) != expected]
+    reply_result = gemini_client._error_result(reply)
+    ok = not wrong and not reply_result.get("retryable")
+    print(f"   {'✅' if ok else '❌'} misclassified: {wrong or 'none'}, malformed reply retryable={reply_result.get('retryable', False)}")
+    passed = passed and ok
+
+    print("\n✨ All resilience tests passed!" if passed else "\n❌ Some resilience tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Test the statistics rollups (extraction_rollups).
+
+Extractions stored through crud.create_extraction must land in their hourly
+and lifetime rollup rows in the same transaction; /stats/dashboard must
+match figures computed from the raw rows while only reading rollups (plus
+the five recent rows); /stats/avg-processing-time must average the latest
+documents themselves, not the whole hours they fall in; rebuild_rollups
+must reproduce what the incremental updates built; update_extraction must
+move a document between grades.
+
+Runs in-process against a throwaway SQLite database.
+
+Usage:
+    python scripts/test_rollups.py
+"""
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from benchmark_common import setup_sqlite_app, make_client
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from kyc_extractor.main import app
+from kyc_extractor.db import crud
+from kyc_extractor.db.database import engine
+from kyc_extractor.db.models import ExtractionRollup
+
+def grade(score) -> str:
+    if score is None or score < 40:
+        return "F"
+    return "A" if score >= 90 else "B" if score >= 75 else "C" if score >= 60 else "D"
+
+def record(user_id, uploaded_at, **overrides) -> dict:
+    return {
+        "request_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "filename": "doc.png",
+        "document_type": "GST_CERTIFICATE",
+        "confidence": 0.9,
+        "data_quality_score": 80,
+        "processing_time_ms": 2500,
+        "uploaded_at": uploaded_at,
+        **overrides,
+    }
+
+def seed(SessionLocal) -> list:
+    """Mixed extractions over the last month; returns their records"""
+    rng = random.Random(5)
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    offsets = [timedelta(minutes=30), timedelta(hours=1, minutes=15), timedelta(days=-1, hours=9), timedelta(days=-3, hours=14), timedelta(days=-30)]
+    records = [
+        record(
+            rng.choice((1, 2, 3, None)),
+            today + rng.choice(offsets),
+            document_type=rng.choice(("GST_CERTIFICATE", "PAN_CARD", None)),
+            confidence=rng.choice((None, round(rng.uniform(0.4, 1.0), 3))),
+            data_quality_score=rng.choice((None, rng.randint(0, 100), rng.randint(0, 100))),
+            processing_time_ms=rng.choice((None, 0, rng.randint(200, 40000))),
+        )
+        for _ in range(60)
+    ]
+    db = SessionLocal()
+    for data in records:
+        crud.create_extraction(db, data)
+    # Server-default timestamp (now)
+    default_timestamp = record(2, None)
+    del default_timestamp["uploaded_at"]
+    crud.create_extraction(db, default_timestamp)
+    records.append({**default_timestamp, "uploaded_at": datetime.utcnow()})
+    db.close()
+    return records
+
+def expected_dashboard(records: list) -> dict:
+    today = datetime.utcnow().date()
+    total = len(records)
+    grades = {letter: sum(1 for data in records if grade(data["data_quality_score"]) == letter) for letter in "ABCDF"}
+    confidences = [data["confidence"] for data in records if data["confidence"] is not None]
+    return {
+        "total_documents": total,
+        "success_rate": round((grades["A"] + grades["B"]) / total * 100, 1) if total else 0,
+        "avg_confidence": round(sum(confidences) / len(confidences) * 100, 1) if confidences else 0.0,
+        "pending_reviews": sum(1 for data in records if data["data_quality_score"] is not None and data["data_quality_score"] < 75),
+        "todays_volume": sum(1 for data in records if data["uploaded_at"].date() == today),
+        "daily_trend": [sum(1 for data in records if data["uploaded_at"].date() == today - timedelta(days=6 - i)) for i in range(7)],
+        "quality_distribution": {f"Grade {letter}": count for letter, count in grades.items() if count},
+    }
+
+def rollup_snapshot(SessionLocal) -> dict:
+    db = SessionLocal()
+    rows = db.query(ExtractionRollup).all()
+    db.close()
+    return {
+        (row.user_id, row.document_type, row.hour): tuple(
+            round(value, 6) if isinstance(value, float) else value
+            for column, value in ((column.name, getattr(row, column.name)) for column in ExtractionRollup.__table__.columns)
+            if column not in ("id", "user_id", "document_type", "hour")
+        )
+        for row in rows
+    }
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    records = seed(SessionLocal)
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. Dashboard from rollups matches the raw rows
+        print(f"🧪 Test 1: /stats/dashboard over {len(records)} extractions")
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        stats = (await client.get("/stats/dashboard")).json()
+        event.remove(engine, "before_cursor_execute", capture)
+        expected = expected_dashboard(records)
+        summary = stats["summary"]
+        actual = {
+            **{key: summary[key] for key in ("total_documents", "success_rate", "avg_confidence", "pending_reviews", "todays_volume")},
+            "daily_trend": [point["count"] for point in stats["charts"]["daily_trend"]],
+            "quality_distribution": {point["name"]: point["value"] for point in stats["charts"]["quality_distribution"]},
+        }
+        raw_reads = [statement for statement in statements if "FROM extractions" in statement]
+        ok = actual == expected and len(raw_reads) == 1 and len(stats["recent_activity"]) == 5
+        print(f"   {'✅' if ok else '❌'} summary={summary}")
+        if actual != expected:
+            print(f"      expected={expected}\n      actual=  {actual}")
+        print(f"      queries on extractions: {len(raw_reads)} (recent activity)")
+        passed = passed and ok
+
+        # 2. Per-user scope
+        print("🧪 Test 2: dashboard of one user")
+        db = SessionLocal()
+        user_stats = crud.get_dashboard_stats(db, user_id=2, role="user")
+        db.close()
+        user_records = [data for data in records if data["user_id"] == 2]
+        expected = expected_dashboard(user_records)
+        ok = (
+            user_stats["summary"]["total_documents"] == expected["total_documents"]
+            and user_stats["summary"]["pending_reviews"] == expected["pending_reviews"]
+            and [point["count"] for point in user_stats["charts"]["daily_trend"]] == expected["daily_trend"]
+            and all(row.user_id == 2 for row in user_stats["recent_activity"])
+        )
+        print(f"   {'✅' if ok else '❌'} user 2: {user_stats['summary']['total_documents']} documents, trend={[point['count'] for point in user_stats['charts']['daily_trend']]}")
+        passed = passed and ok
+
+        # 3. A failed insert leaves the rollups untouched
+        print("🧪 Test 3: rollups share the extraction's transaction")
+        before = rollup_snapshot(SessionLocal)
+        db = SessionLocal()
+        try:
+            crud.create_extraction(db, record(1, datetime.utcnow(), request_id=records[0]["request_id"]))
+            failed = False
+        except IntegrityError:
+            db.rollback()
+            failed = True
+        db.close()
+        ok = failed and rollup_snapshot(SessionLocal) == before
+        print(f"   {'✅' if ok else '❌'} duplicate request_id rejected={failed}, rollups unchanged={rollup_snapshot(SessionLocal) == before}")
+        passed = passed and ok
+
+        # 4. Rebuild reproduces the incremental rollups
+        print("🧪 Test 4: rebuild_rollups")
+        db = SessionLocal()
+        written = crud.rebuild_rollups(db)
+        db.close()
+        ok = rollup_snapshot(SessionLocal) == before and written == len(before)
+        print(f"   {'✅' if ok else '❌'} {written} rows rebuilt, identical={rollup_snapshot(SessionLocal) == before}")
+        passed = passed and ok
+
+        # 5. Updates move the document between grades
+        print("🧪 Test 5: update_extraction")
+        target = next(data for data in records if grade(data["data_quality_score"]) == "A")
+        db = SessionLocal()
+        crud.update_extraction(db, target["request_id"], {"data_quality_score": 10})
+        db.close()
+        target["data_quality_score"] = 10
+        stats = (await client.get("/stats/dashboard")).json()
+        distribution = {point["name"]: point["value"] for point in stats["charts"]["quality_distribution"]}
+        ok = distribution == expected_dashboard(records)["quality_distribution"]
+        print(f"   {'✅' if ok else '❌'} grades={distribution}")
+        passed = passed and ok
+
+        # 6. Average processing time of the latest documents (not of whole hours)
+        print("🧪 Test 6: /stats/avg-processing-time")
+        db = SessionLocal()
+        now = datetime.utcnow()
+        for _ in range(3):
+            crud.create_extraction(db, record(9, now - timedelta(seconds=30), processing_time_ms=9000))
+        for _ in range(7):
+            crud.create_extraction(db, record(9, now, processing_time_ms=2000))
+        recent = crud.get_avg_processing_time(db, user_id=9, role="user")
+        wider = crud.get_avg_processing_time(db, user_id=9, role="user", limit=10)
+        empty = crud.get_avg_processing_time(db, user_id=99, role="user")
+        db.close()
+        response = (await client.get("/stats/avg-processing-time")).json()
+        ok = recent == 2000 and wider == 4100 and empty == 3000 and response["avg_time_ms"] > 0
+        print(f"   {'✅' if ok else '❌'} last 7={recent} ms, last 10={wider} ms, no history={empty} ms, admin={response['avg_time_ms']} ms")
+        passed = passed and ok
+
+    print("\n✨ All rollup tests passed!" if passed else "\n❌ Some rollup tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test that concurrent identical uploads share one Gemini call.
+
+Runs in-process against a throwaway SQLite database and a fake Gemini model.
+The cache is bypassed (use_cache=false) so only request coalescing can
+explain a single model invocation. When the caller running the model call
+is cancelled, the callers waiting on it must still get their results.
+
+Usage:
+    python scripts/test_singleflight.py --clients 20
+"""
+import argparse
+import asyncio
+
+from benchmark_common import FakeGeminiModel, make_sample_image, setup_sqlite_app, make_client
+
+from kyc_extractor.main import app
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.services.singleflight import extraction_flights
+from kyc_extractor.db.models import Extraction
+
+async def main(clients: int):
+    SessionLocal = setup_sqlite_app(app)
+    payload = make_sample_image(620, 877)
+    other_payload = make_sample_image(640, 877)
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. N concurrent identical /extract calls -> one model call, N rows
+        print(f"🧪 Test 1: {clients} concurrent identical uploads")
+        model = gemini_client.model = FakeGeminiModel(latency=0.3)
+        responses = await asyncio.gather(*(
+            client.post("/extract", params={"use_cache": "false"}, files={"file": ("same.png", payload, "image/png")})
+            for _ in range(clients)
+        ))
+        request_ids = {r.json()["request_id"] for r in responses if r.status_code == 200}
+
+        db = SessionLocal()
+        rows = db.query(Extraction).filter(Extraction.request_id.in_(request_ids)).count()
+        db.close()
+
+        if model.calls == 1 and len(request_ids) == clients and rows == clients:
+            print(f"   ✅ 1 model call, {len(request_ids)} distinct request_ids, {rows} rows")
+        else:
+            print(f"   ❌ {model.calls} model calls, {len(request_ids)} request_ids, {rows} rows")
+            passed = False
+
+        # 2. Batch containing the same file twice plus a different one -> two model calls
+        print("🧪 Test 2: batch with a duplicate file")
+        model = gemini_client.model = FakeGeminiModel(latency=0.3)
+        response = await client.post("/extract/batch", params={"use_cache": "false"}, files=[
+            ("files", ("a.png", payload, "image/png")),
+            ("files", ("a-copy.png", payload, "image/png")),
+            ("files", ("b.png", other_payload, "image/png")),
+        ])
+        batch = response.json()
+        if model.calls == 2 and batch["successful"] == 3:
+            print("   ✅ 2 model calls for 3 files")
+        else:
+            print(f"   ❌ {model.calls} model calls, {batch['successful']} successful")
+            passed = False
+
+        # 3. Sequential identical uploads are not coalesced
+        print("🧪 Test 3: sequential uploads each call the model")
+        model = gemini_client.model = FakeGeminiModel(latency=0.05)
+        for _ in range(2):
+            await client.post("/extract", params={"use_cache": "false"}, files={"file": ("same.png", payload, "image/png")})
+        if model.calls == 2:
+            print("   ✅ 2 model calls")
+        else:
+            print(f"   ❌ {model.calls} model calls")
+            passed = False
+
+        # 4. The caller running the model call disconnects; the others still get results
+        print("🧪 Test 4: running caller cancelled while others wait on it")
+        model = gemini_client.model = FakeGeminiModel(latency=1.0)
+        upload = lambda: client.post("/extract", params={"use_cache": "false"}, files={"file": ("same.png", payload, "image/png")})
+        leader = asyncio.create_task(upload())
+        while extraction_flights.stats()["in_flight"] == 0:
+            await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(upload()) for _ in range(3)]
+        # Followers join the flight while the leader waits on the model
+        await asyncio.sleep(0.4)
+        leader.cancel()
+        results = await asyncio.gather(*followers, return_exceptions=True)
+        statuses = [r.status_code if not isinstance(r, BaseException) else type(r).__name__ for r in results]
+        flights = extraction_flights.stats()
+        # The cancelled call never completes; one waiter re-runs it
+        if statuses == [200] * 3 and model.calls == 1 and flights["takeovers"] > 0 and flights["in_flight"] == 0:
+            print(f"   ✅ waiting uploads: {statuses}, completed model calls: {model.calls}")
+        else:
+            print(f"   ❌ waiting uploads: {statuses}, completed model calls: {model.calls}, flights: {flights}")
+            passed = False
+
+    print("\n✨ All single-flight tests passed!" if passed else "\n❌ Some single-flight tests failed")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test single-flight coalescing of identical uploads")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent identical submissions")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(main(args.clients)) else 1)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test the /stats response cache (kyc_extractor/services/stats_cache.py).
+
+Concurrent dashboards for the same scope must run the rollup queries once;
+repeats within the TTL must not touch the database; users must only get
+their own figures; crud.create_extraction must invalidate the written row's
+user scope and the admin scope but leave other users cached; entries expire
+after the TTL; a recompute that overlapped a write must not be stored; an
+error reaches every waiting caller and is not cached; /stats/response-cache
+reports the hit ratio and recompute latency.
+
+Runs in-process against a throwaway SQLite database.
+
+Usage:
+    python scripts/test_stats_cache.py
+"""
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmark_common import setup_sqlite_app, make_client
+
+from sqlalchemy import event
+from kyc_extractor.main import app
+from kyc_extractor.api.deps import get_current_active_user
+from kyc_extractor.db import crud
+from kyc_extractor.db.database import engine
+from kyc_extractor.services.stats_cache import StatsCache, stats_cache
+
+def record(user_id) -> dict:
+    return {
+        "request_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "filename": "doc.png",
+        "document_type": "GST_CERTIFICATE",
+        "confidence": 0.9,
+        "data_quality_score": 80,
+        "processing_time_ms": 2500,
+        "uploaded_at": datetime.utcnow(),
+    }
+
+def as_user(user_id, role="user") -> None:
+    user = SimpleNamespace(id=user_id, role=role, is_active=True)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+class QueryCounter:
+    """Counts the statements sent to the database while active"""
+    def __enter__(self):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+async def dashboard_total(client) -> int:
+    return (await client.get("/stats/dashboard")).json()["summary"]["total_documents"]
+
+async def test_endpoints(SessionLocal) -> bool:
+    passed = True
+    db = SessionLocal()
+    for user_id in (1, 2, 2, 3, 3, 3):
+        crud.create_extraction(db, record(user_id))
+    db.close()
+    stats_cache.clear()
+
+    async with make_client(app) as client:
+        # 1. Ten admins open the dashboard at once
+        print("🧪 Test 1: ten concurrent admin dashboards")
+        as_user(None, role="admin")
+        before = stats_cache.stats()
+        with QueryCounter() as single:
+            await client.get("/stats/dashboard")
+        stats_cache.clear()
+        with QueryCounter() as concurrent:
+            responses = await asyncio.gather(*(client.get("/stats/dashboard") for _ in range(10)))
+        after = stats_cache.stats()
+        totals = {response.json()["summary"]["total_documents"] for response in responses}
+        misses = after["misses"] - before["misses"]
+        ok = totals == {6} and misses == 2 and len(concurrent.statements) == len(single.statements)
+        print(f"   {'✅' if ok else '❌'} totals={totals}, recomputes={misses - 1}, "
+              f"queries={len(concurrent.statements)} (one dashboard: {len(single.statements)})")
+        passed = passed and ok
+
+        # 2. Repeats within the TTL are served from memory
+        print("🧪 Test 2: repeated requests within the TTL")
+        paths = ("/stats/dashboard", "/stats/avg-processing-time", "/stats/usage?days=7", "/stats/usage?days=30")
+        with QueryCounter() as first:
+            for path in paths:
+                await client.get(path)
+        with QueryCounter() as cached:
+            for path in paths:
+                await client.get(path)
+        # The dashboard was cached by test 1
+        ok = len(first.statements) > 0 and cached.statements == []
+        print(f"   {'✅' if ok else '❌'} queries: {len(first.statements)} first, {len(cached.statements)} on repeat")
+        passed = passed and ok
+
+        # 3. Users only see their own scope
+        print("🧪 Test 3: per-user scope")
+        as_user(2)
+        user_2 = await dashboard_total(client)
+        as_user(3)
+        user_3 = await dashboard_total(client)
+        as_user(None, role="admin")
+        admin = await dashboard_total(client)
+        ok = (user_2, user_3, admin) == (2, 3, 6)
+        print(f"   {'✅' if ok else '❌'} user 2={user_2}, user 3={user_3}, admin={admin}")
+        passed = passed and ok
+
+        # 4. A write invalidates its own scope and the admin scope only
+        print("🧪 Test 4: create_extraction invalidates the written scope")
+        db = SessionLocal()
+        crud.create_extraction(db, record(2))
+        db.close()
+        as_user(2)
+        user_2 = await dashboard_total(client)
+        as_user(None, role="admin")
+        admin = await dashboard_total(client)
+        as_user(3)
+        with QueryCounter() as other:
+            user_3 = await dashboard_total(client)
+        ok = (user_2, admin, user_3) == (3, 7, 3) and other.statements == []
+        print(f"   {'✅' if ok else '❌'} user 2={user_2}, admin={admin}, user 3={user_3} "
+              f"(served from cache: {other.statements == []})")
+        passed = passed and ok
+
+        # 5. Hit ratio and recompute latency
+        print("🧪 Test 5: /stats/response-cache")
+        as_user(None, role="admin")
+        stats = (await client.get("/stats/response-cache")).json()
+        as_user(3)
+        forbidden = (await client.get("/stats/response-cache")).status_code
+        ok = 0 < stats["hit_ratio"] < 1 and stats["recompute"]["p95_ms"] is not None and stats["invalidations"] > 0 and forbidden == 403
+        print(f"   {'✅' if ok else '❌'} hit_ratio={stats['hit_ratio']}, hits={stats['hits']}, coalesced={stats['coalesced']}, "
+              f"misses={stats['misses']}, recompute={stats['recompute']}, non-admin status={forbidden}")
+        passed = passed and ok
+    return passed
+
+def test_cache_behaviour() -> bool:
+    passed = True
+
+    # 6. Stampede: one compute for many threads
+    print("🧪 Test 6: concurrent misses share one recompute")
+    cache = StatsCache(ttl_seconds=60)
+    calls = []
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": len(calls)}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("dashboard", None, "admin", slow))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ok = len(calls) == 1 and results == [{"value": 1}] * 8 and cache.coalesced + cache.hits == 7
+    print(f"   {'✅' if ok else '❌'} computes={len(calls)}, coalesced={cache.coalesced}, hits={cache.hits}")
+    passed = passed and ok
+
+    # 7. TTL expiry
+    print("🧪 Test 7: entries expire after the TTL")
+    cache = StatsCache(ttl_seconds=0.2)
+    counter = iter(range(100))
+    first = cache.get_or_compute("usage", 4, "user", lambda: next(counter), 30)
+    cached = cache.get_or_compute("usage", 4, "user", lambda: next(counter), 30)
+    other_params = cache.get_or_compute("usage", 4, "user", lambda: next(counter), 7)
+    time.sleep(0.25)
+    expired = cache.get_or_compute("usage", 4, "user", lambda: next(counter), 30)
+    ok = (first, cached, other_params, expired) == (0, 0, 1, 2)
+    print(f"   {'✅' if ok else '❌'} first={first}, within TTL={cached}, other params={other_params}, after TTL={expired}")
+    passed = passed and ok
+
+    # 8. A recompute that overlapped a write is not stored
+    print("🧪 Test 8: invalidation during a recompute")
+    cache = StatsCache(ttl_seconds=60)
+    def racing():
+        cache.invalidate(5)
+        return "stale"
+    returned = cache.get_or_compute("dashboard", 5, "user", racing)
+    fresh = cache.get_or_compute("dashboard", 5, "user", lambda: "fresh")
+    ok = returned == "stale" and fresh == "fresh"
+    print(f"   {'✅' if ok else '❌'} returned={returned}, next request={fresh}")
+    passed = passed and ok
+
+    # 9. Errors reach every waiter and are not cached
+    print("🧪 Test 9: failed recomputes")
+    cache = StatsCache(ttl_seconds=60)
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("database unavailable")
+    errors = []
+    def call():
+        try:
+            cache.get_or_compute("dashboard", None, "admin", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recovered = cache.get_or_compute("dashboard", None, "admin", lambda: "ok")
+    ok = errors == ["database unavailable"] * 4 and recovered == "ok" and cache.stats()["in_flight"] == 0
+    print(f"   {'✅' if ok else '❌'} errors={len(errors)}, next request={recovered}")
+    passed = passed and ok
+    return passed
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    passed = await test_endpoints(SessionLocal)
+    passed = test_cache_behaviour() and passed
+
+    print("\n✨ All stats cache tests passed!" if passed else "\n❌ Some stats cache tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test streaming upload ingestion: hashing Starlette's spooled file in place,
+per-file size limits, and the request body cap (declared or chunked).
+
+Runs in-process against a throwaway SQLite database with the full
+pipeline (model cascade, classify-first) and a two-tier fake model.
+
+Usage:
+    python scripts/test_uploads.py
+"""
+import asyncio
+import glob
+import io
+import os
+import tempfile
+from tempfile import SpooledTemporaryFile
+
+from benchmark_common import make_sample_image, setup_sqlite_app, make_client, use_production_pipeline
+
+from fastapi import UploadFile
+from starlette.formparsers import MultiPartParser
+from kyc_extractor import main as main_module
+from kyc_extractor.main import app, upload_body_limit, MULTIPART_OVERHEAD_BYTES
+from kyc_extractor.core.config import settings
+from kyc_extractor.services.cache import hash_content
+from kyc_extractor.services.uploads import read_upload, UploadTooLargeError
+
+def spooled_files() -> set:
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "kyc-upload-*")))
+
+def starlette_upload(payload: bytes, filename: str) -> UploadFile:
+    """An UploadFile spooled the way Starlette's multipart parser does it"""
+    spool = SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES)
+    spool.write(payload)
+    spool.seek(0)
+    return UploadFile(spool, size=len(payload), filename=filename)
+
+def multipart_body(parts: list) -> tuple:
+    boundary = "kyc-test-boundary"
+    body = b""
+    for name, filename, payload in parts:
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+                 f"Content-Type: image/png\r\n\r\n").encode() + payload + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def chunked(body: bytes, chunk_size: int = 64 * 1024):
+    """Streams the body without a Content-Length, counting the bytes handed out"""
+    sent = {"bytes": 0}
+    async def stream():
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            sent["bytes"] += len(chunk)
+            yield chunk
+    return stream(), sent
+
+async def main():
+    setup_sqlite_app(app)
+    use_production_pipeline()
+    small = make_sample_image(620, 877)
+    large = make_sample_image(1654, 2339)
+    settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES = (len(small) + len(large)) // 2
+    settings.MAX_UPLOAD_BYTES = len(large) * 2
+    # main.py applies the spool threshold to Starlette's parser at import
+    MultiPartParser.spool_max_size = settings.UPLOAD_SPOOL_MAX_MEMORY_BYTES
+    passed = True
+
+    # 1. Small files stay in memory, large ones are read from Starlette's own temp file; hash matches either way
+    print("🧪 Test 1: hashing the spooled upload in place")
+    for name, payload, expect_memory in (("small.png", small, True), ("large.png", large, False)):
+        file = starlette_upload(payload, name)
+        upload = await read_upload(file, chunk_size=4096)
+        ok = upload.in_memory == expect_memory and upload.sha256 == hash_content(payload) and upload.size == len(payload)
+        ok = ok and hash_content(upload.source) == upload.sha256
+        # On disk: the path names the spool's temp file instead of a copy of it
+        shared = upload.in_memory or os.stat(upload.path).st_ino == os.fstat(file.file.fileno()).st_ino
+        upload.close()
+        await file.close()
+        ok = ok and shared
+        print(f"   {'✅' if ok else '❌'} {name}: {'memory' if expect_memory else 'disk'}, {len(payload)} bytes, "
+              f"same file as the spool: {shared}")
+        passed = passed and ok
+
+    # 2. Oversized stream without a declared size stops at the limit
+    print("🧪 Test 2: size limit enforced while streaming")
+    source = io.BytesIO(large * 3)
+    try:
+        await read_upload(UploadFile(source, filename="huge.png"), chunk_size=4096)
+        print("   ❌ No error raised")
+        passed = False
+    except UploadTooLargeError:
+        read = source.tell()
+        ok = read <= settings.MAX_UPLOAD_BYTES + 4096
+        print(f"   {'✅' if ok else '❌'} Rejected after reading {read} of {len(large) * 3} bytes")
+        passed = passed and ok
+
+    async with make_client(app) as client:
+        # 3. End to end: an upload Starlette spooled to disk is processed from its temp file
+        print("🧪 Test 3: /extract with a spooled upload")
+        before = spooled_files()
+        opened = []
+        original_read_upload = main_module.read_upload
+        async def recording_read_upload(file, *args, **kwargs):
+            upload = await original_read_upload(file, *args, **kwargs)
+            opened.append(upload.path)
+            return upload
+        main_module.read_upload = recording_read_upload
+        response = await client.post("/extract", params={"use_cache": "false"}, files={"file": ("large.png", large, "image/png")})
+        main_module.read_upload = original_read_upload
+        leftover = spooled_files() - before
+        stats = response.json().get("payload_stats") or {}
+        if response.status_code == 200 and not leftover and opened[0] is not None and stats.get("original_bytes") == len(large):
+            print(f"   ✅ 200, read from {opened[0]}, {stats['original_bytes']} bytes uploaded, {stats['sent_bytes']} sent, no temp files left")
+        else:
+            print(f"   ❌ {response.status_code} {response.text[:100]} leftover={leftover}")
+            passed = False
+
+        # 4. Oversized uploads get 413 on /extract and /jobs
+        print("🧪 Test 4: oversized upload returns 413")
+        for path in ("/extract", "/jobs"):
+            response = await client.post(path, files={"file": ("huge.png", large * 3, "image/png")})
+            ok = response.status_code == 413
+            print(f"   {'✅' if ok else '❌'} {path}: {response.status_code}")
+            passed = passed and ok
+
+        # 5. One oversized file in a batch fails alone
+        print("🧪 Test 5: batch with one oversized file")
+        response = await client.post("/extract/batch", params={"use_cache": "false"}, files=[
+            ("files", ("ok.png", small, "image/png")),
+            ("files", ("huge.png", large * 3, "image/png")),
+        ])
+        batch = response.json()
+        if response.status_code == 200 and batch["successful"] == 1 and "maximum upload size" in batch["errors"][0]["error"]:
+            print("   ✅ 1 successful, 1 rejected")
+        else:
+            print(f"   ❌ {response.status_code} {batch}")
+            passed = False
+
+        # 6. A chunked body without Content-Length is cut off at the cap
+        print("🧪 Test 6: chunked oversized upload")
+        body, content_type = multipart_body([("file", "huge.png", large * 10)])
+        stream, sent = chunked(body)
+        response = await client.post("/extract", content=stream, headers={"Content-Type": content_type})
+        limit = settings.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        ok = response.status_code == 413 and sent["bytes"] <= limit + 64 * 1024 < len(body)
+        print(f"   {'✅' if ok else '❌'} {response.status_code}, read {sent['bytes']} of {len(body)} bytes (cap {limit})")
+        passed = passed and ok
+
+        # 7. The batch body has its own cap, not MAX_UPLOAD_BYTES * MAX_BATCH_SIZE
+        print("🧪 Test 7: batch request body cap")
+        settings.MAX_BATCH_UPLOAD_BYTES = len(small) * 3
+        files = [("files", (f"doc{i}.png", small, "image/png")) for i in range(4)]
+        declared = await client.post("/extract/batch", params={"use_cache": "false"}, files=files)
+        body, content_type = multipart_body([("files", f"doc{i}.png", small) for i in range(4)])
+        stream, sent = chunked(body)
+        streamed = await client.post("/extract/batch", content=stream, headers={"Content-Type": content_type})
+        settings.MAX_BATCH_UPLOAD_BYTES = len(small) * 5
+        within = await client.post("/extract/batch", params={"use_cache": "false"}, files=files)
+        ok = (declared.status_code, streamed.status_code, within.status_code) == (413, 413, 200)
+        ok = ok and within.json()["successful"] == 4
+        print(f"   {'✅' if ok else '❌'} over the cap: {declared.status_code} (Content-Length), "
+              f"{streamed.status_code} (chunked); within it: {within.status_code}")
+        passed = passed and ok
+
+        # 8. Other routes are not wrapped
+        print("🧪 Test 8: routes without a cap")
+        ok = upload_body_limit("/token") == 0 and upload_body_limit("/history") == 0
+        response = await client.get("/health")
+        ok = ok and response.status_code == 200
+        print(f"   {'✅' if ok else '❌'} /token and /history uncapped, /health {response.status_code}")
+        passed = passed and ok
+
+    print("\n✨ All upload tests passed!" if passed else "\n❌ Some upload tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
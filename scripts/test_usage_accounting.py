@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test per-extraction usage accounting and the /stats/usage aggregates.
+
+Checks that an extraction records prompt/output tokens, bytes sent, model
+name, upstream latency, retries and cost (from the usage metadata of every
+call, including classification and cascade escalation), that cache hits
+record zero usage, and that /stats/usage groups it per user, document type
+and day.
+
+Runs in-process against a throwaway SQLite database and fake models.
+
+Usage:
+    python scripts/test_usage_accounting.py
+"""
+import asyncio
+import copy
+
+from benchmark_common import FakeGeminiModel, SAMPLE_RESULT, make_sample_image, setup_sqlite_app, make_client
+
+from google.api_core import exceptions as google_exceptions
+from kyc_extractor.main import app
+from kyc_extractor.core.config import settings
+from kyc_extractor.core.gemini import gemini_client
+from kyc_extractor.db.models import Extraction
+from kyc_extractor.services.image_processor import image_processor
+
+class FlakyModel(FakeGeminiModel):
+    """Fails the first `failures` calls with a retryable 503"""
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    async def generate_content_async(self, contents, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise google_exceptions.ServiceUnavailable("503 Service Unavailable")
+        return await super().generate_content_async(contents, **kwargs)
+
+def expected_cost(usage: dict, input_price: float, output_price: float) -> float:
+    return round((usage["prompt_tokens"] * input_price + usage["output_tokens"] * output_price) / 1_000_000, 8)
+
+async def upload(client, name: str, image: bytes, use_cache: str = "false") -> dict:
+    response = await client.post("/extract", params={"use_cache": use_cache}, files={"file": (name, image, "image/png")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def main():
+    SessionLocal = setup_sqlite_app(app)
+    # Settings are changed at runtime below; keep the image stage in-process
+    image_processor._process_pool = None
+    gemini_client.guard.base_delay = 0.01
+    passed = True
+
+    async with make_client(app) as client:
+        # 1. Single call on the strong model
+        print("🧪 Test 1: single model call")
+        gemini_client.model = FakeGeminiModel(0.02)
+        body = await upload(client, "gst.png", make_sample_image(1240, 1754))
+        usage = body["usage"]
+        ok = (
+            usage["model_calls"] == 1 and usage["retries"] == 0 and usage["model_name"] == settings.GEMINI_MODEL_NAME
+            and usage["prompt_tokens"] > 258 and usage["output_tokens"] > 0
+            and usage["payload_bytes"] == body["payload_stats"]["sent_bytes"]
+            and usage["upstream_ms"] >= 20
+            and usage["cost_usd"] == expected_cost(usage, settings.GEMINI_INPUT_PRICE, settings.GEMINI_OUTPUT_PRICE)
+        )
+        print(f"   {'✅' if ok else '❌'} {usage}")
+        passed = passed and ok
+
+        # 2. Stored on the extraction
+        print("🧪 Test 2: persisted columns")
+        db = SessionLocal()
+        row = db.query(Extraction).filter(Extraction.request_id == body["request_id"]).first()
+        db.close()
+        ok = (
+            row.model_name == usage["model_name"] and row.prompt_tokens == usage["prompt_tokens"]
+            and row.output_tokens == usage["output_tokens"] and row.payload_bytes == usage["payload_bytes"]
+            and row.retry_count == 0 and row.upstream_latency_ms == round(usage["upstream_ms"])
+            and abs(row.cost_usd - usage["cost_usd"]) < 1e-8
+        )
+        print(f"   {'✅' if ok else '❌'} tokens={row.prompt_tokens}/{row.output_tokens} bytes={row.payload_bytes} "
+              f"latency={row.upstream_latency_ms} ms cost=${row.cost_usd:.6f}")
+        passed = passed and ok
+
+        # 3. Retries are counted and every attempt's payload is billed as sent
+        print("🧪 Test 3: retries")
+        gemini_client.model = FlakyModel(2, latency=0.01)
+        body = await upload(client, "retry.png", make_sample_image(1241, 1754))
+        usage = body["usage"]
+        ok = usage["retries"] == 2 and usage["model_calls"] == 3 and usage["payload_bytes"] == 3 * body["payload_stats"]["sent_bytes"]
+        print(f"   {'✅' if ok else '❌'} retries={usage['retries']} calls={usage['model_calls']} bytes={usage['payload_bytes']}")
+        passed = passed and ok
+
+        # 4. Classification + cascade escalation: every call is counted, each at its tier's price
+        print("🧪 Test 4: classification and escalation")
+        settings.GEMINI_CASCADE_ENABLED = True
+        settings.CLASSIFY_FIRST = True
+        low_confidence = copy.deepcopy(SAMPLE_RESULT)
+        low_confidence["confidence"] = 0.5
+        fast = gemini_client.fast_model = FakeGeminiModel(0.01, low_confidence)
+        strong = gemini_client.model = FakeGeminiModel(0.01)
+        body = await upload(client, "cascade.png", make_sample_image(1242, 1754))
+        usage = body["usage"]
+        ok = (
+            fast.classify_calls == 1 and fast.calls == 1 and strong.calls == 1
+            and usage["model_calls"] == 3 and usage["model_name"] == settings.GEMINI_MODEL_NAME
+            and body["model_tier"] == "strong"
+            and expected_cost(usage, settings.GEMINI_FAST_INPUT_PRICE, settings.GEMINI_FAST_OUTPUT_PRICE)
+            < usage["cost_usd"] < expected_cost(usage, settings.GEMINI_INPUT_PRICE, settings.GEMINI_OUTPUT_PRICE)
+        )
+        print(f"   {'✅' if ok else '❌'} calls={usage['model_calls']} model={usage['model_name']} cost=${usage['cost_usd']:.6f}")
+        passed = passed and ok
+        settings.GEMINI_CASCADE_ENABLED = False
+        settings.CLASSIFY_FIRST = False
+
+        # 5. Cache hits cost nothing
+        print("🧪 Test 5: cache hit")
+        body = await upload(client, "gst-again.png", make_sample_image(1240, 1754), use_cache="true")
+        usage = body["usage"]
+        ok = body["cache_hit"] and usage["model_calls"] == 0 and usage["cost_usd"] == 0 and usage["model_name"] is None
+        print(f"   {'✅' if ok else '❌'} cache_hit={body['cache_hit']} {usage}")
+        passed = passed and ok
+
+        # 6. Aggregates
+        print("🧪 Test 6: /stats/usage")
+        response = await client.get("/stats/usage", params={"days": 7})
+        stats = response.json()
+        totals = stats["totals"]
+        db = SessionLocal()
+        rows = db.query(Extraction).all()
+        db.close()
+        ok = (
+            response.status_code == 200 and totals["documents"] == 4 and totals["model_documents"] == 3
+            and totals["prompt_tokens"] == sum(row.prompt_tokens for row in rows)
+            and totals["retries"] == 2 and abs(totals["cost_usd"] - round(sum(row.cost_usd for row in rows), 6)) < 1e-6
+            and [entry["document_type"] for entry in stats["by_document_type"]] == ["GST_CERTIFICATE"]
+            and len(stats["by_day"]) == 1 and stats["by_day"][0]["documents"] == 4
+            and len(stats["by_user"]) == 1 and stats["by_user"][0]["cost_usd"] == totals["cost_usd"]
+        )
+        print(f"   {'✅' if ok else '❌'} totals={totals}")
+        print(f"      by_day={[(entry['date'], entry['documents']) for entry in stats['by_day']]} "
+              f"by_document_type={[(entry['document_type'], entry['cost_usd']) for entry in stats['by_document_type']]}")
+        passed = passed and ok
+
+    print("\n✨ All usage accounting tests passed!" if passed else "\n❌ Some usage accounting tests failed")
+    return passed
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -14,9 +14,11 @@ setup(
         "fastapi==0.109.0",
         "uvicorn==0.27.0",
         "python-multipart==0.0.6",
-        "google-generativeai==0.3.2",
+        "google-generativeai==0.8.6",
         "pillow==10.2.0",
+        "numpy==1.26.4",
         "pdf2image==1.17.0",
+        "pypdf==4.0.1",
         "python-dotenv==1.0.1",
     ],
     classifiers=[